@@ -0,0 +1,59 @@
+"""
+Benchmark: chấm lại điểm tin cậy cho toàn bộ báo cáo đang hoạt động.
+
+- loop: gọi calculate_credibility cho từng báo cáo (math.exp, dựng dict kết quả mỗi lần).
+- bulk: calculate_credibility_bulk trên mảng NumPy trong một lượt.
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_credibility
+"""
+import time
+
+import numpy as np
+
+from services.community_processing.credibility import ReportCredibilityCalculator
+
+N_REPORTS = 200_000
+
+
+class _ArrayReputation:
+    """Uy tín người dùng lấy từ mảng, theo chỉ số dạng chuỗi"""
+
+    def __init__(self, reputations):
+        self.reputations = reputations
+
+    def get_reputation(self, user_id):
+        return float(self.reputations[int(user_id)])
+
+
+def run():
+    rng = np.random.default_rng(0)
+    reputations = rng.random(N_REPORTS)
+    upvotes = rng.poisson(3, N_REPORTS)
+    downvotes = rng.poisson(1, N_REPORTS)
+
+    calculator = ReportCredibilityCalculator()
+    calculator.reputation_manager = _ArrayReputation(reputations)
+
+    start = time.perf_counter()
+    loop_results = [
+        calculator.calculate_credibility(str(i), int(upvotes[i]), int(downvotes[i]))
+        for i in range(N_REPORTS)
+    ]
+    loop_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores, levels = calculator.calculate_credibility_bulk(reputations, upvotes, downvotes)
+    bulk_elapsed = time.perf_counter() - start
+
+    loop_scores = np.array([result['credibility_score'] for result in loop_results])
+    assert np.allclose(loop_scores, scores, atol=1e-3), "Điểm tin cậy khác nhau"
+    assert [result['credibility_level'] for result in loop_results[:1000]] == list(levels[:1000])
+
+    print(f"{'mode':>6} | {'reports/s':>12} | {'total ms':>9}")
+    print("-" * 34)
+    for name, elapsed in (("loop", loop_elapsed), ("bulk", bulk_elapsed)):
+        print(f"{name:>6} | {N_REPORTS / elapsed:>12.0f} | {elapsed * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,72 @@
+"""
+Benchmark: độ trễ kiểm tra trùng lặp theo số sự kiện đang hoạt động.
+
+So sánh quét tuyến tính (cách cũ với MOCK_EXISTING_EVENTS) với chỉ mục lưới không gian
+(mỗi sự kiện là một sự cố của IncidentClusterer).
+Chạy từ thư mục gốc: python -m benchmarks.bench_duplicate_index
+"""
+import logging
+import random
+import time
+
+import numpy as np
+
+from services.community_report_service import CommunityReportService
+from utils.nlp_utils import nlp_processor
+
+# Khu vực Hà Nội mở rộng (nội thành + ngoại thành)
+LAT_RANGE = (20.75, 21.25)
+LON_RANGE = (105.55, 106.05)
+EVENT_COUNTS = [100, 1_000, 10_000, 50_000]
+QUERIES = 200
+EMBEDDING_DIM = 768
+
+
+def random_location(rng):
+    return {"lat": rng.uniform(*LAT_RANGE), "lon": rng.uniform(*LON_RANGE)}
+
+
+def linear_scan(events, new_embedding, location):
+    """Cách cũ: duyệt toàn bộ sự kiện và so hộp lat/lon"""
+    closest_event_id, highest_similarity = None, 0.0
+    for event in events:
+        if abs(event["location"]["lat"] - location["lat"]) < 0.02 and abs(event["location"]["lon"] - location["lon"]) < 0.02:
+            similarity = nlp_processor.calculate_cosine_similarity(new_embedding, event["embedding"])
+            if similarity > highest_similarity:
+                highest_similarity, closest_event_id = similarity, event["id"]
+    return closest_event_id, highest_similarity
+
+
+def run():
+    rng = random.Random(42)
+    embedding = np.random.rand(EMBEDDING_DIM)
+    normalized = nlp_processor.normalize_embedding(embedding)
+    print(f"{'events':>8} | {'linear (ms)':>12} | {'grid (ms)':>10} | {'speedup':>8}")
+    print("-" * 48)
+    for count in EVENT_COUNTS:
+        service = CommunityReportService()
+        events = []
+        for i in range(count):
+            loc = random_location(rng)
+            event = {"id": str(i), "embedding": embedding, "topic": "giao_thong", "location": loc}
+            events.append(event)
+            service.incident_clusterer.create("giao_thong", normalized, loc["lat"], loc["lon"], report_id=event["id"])
+
+        queries = [random_location(rng) for _ in range(QUERIES)]
+
+        start = time.perf_counter()
+        for loc in queries:
+            linear_scan(events, embedding, loc)
+        linear_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+        start = time.perf_counter()
+        for loc in queries:
+            service._check_for_duplicates(embedding, "giao_thong", loc)
+        grid_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+        print(f"{count:>8} | {linear_ms:>12.3f} | {grid_ms:>10.3f} | {linear_ms / grid_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    run()
@@ -0,0 +1,50 @@
+"""
+Benchmark: độ trễ tìm kiếm trong kho embedding theo topic (IVF) so với so sánh chính xác toàn bộ.
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_embedding_index
+"""
+import logging
+import time
+
+import numpy as np
+
+from services.community_processing.embedding_index import TopicEmbeddingStore
+from utils.vector_utils import normalize_embeddings
+
+EVENT_COUNTS = [10_000, 100_000, 300_000]
+QUERIES = 200
+EMBEDDING_DIM = 768
+TOPIC = "giao_thong"
+
+
+def run():
+    rng = np.random.default_rng(42)
+    print(f"{'events':>8} | {'exact (ms)':>10} | {'ivf (ms)':>8} | {'recall@1':>8}")
+    print("-" * 45)
+    for count in EVENT_COUNTS:
+        # Embedding thật có cấu trúc cụm (nhiều báo cáo về cùng loại sự việc)
+        centers = rng.standard_normal((count // 100, EMBEDDING_DIM))
+        vectors = normalize_embeddings(centers[rng.integers(0, len(centers), count)] + 0.8 * rng.standard_normal((count, EMBEDDING_DIM)))
+        store = TopicEmbeddingStore()
+        for i, vector in enumerate(vectors):
+            store.add(str(i), TOPIC, vector, normalized=True)
+
+        # Query là các báo cáo gần trùng với sự kiện đã có
+        targets = rng.choice(count, QUERIES, replace=False)
+        queries = normalize_embeddings(vectors[targets] + 0.05 * rng.standard_normal((QUERIES, EMBEDDING_DIM)))
+
+        start = time.perf_counter()
+        exact = [int(np.argmax(vectors @ query)) for query in queries]
+        exact_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+        start = time.perf_counter()
+        approx = [store.search(TOPIC, query, k=1, normalized=True) for query in queries]
+        ivf_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+        recall = np.mean([bool(result) and result[0][0] == str(expected) for result, expected in zip(approx, exact)])
+        print(f"{count:>8} | {exact_ms:>10.3f} | {ivf_ms:>8.3f} | {recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    run()
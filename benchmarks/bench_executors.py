@@ -0,0 +1,94 @@
+"""
+Benchmark: thông lượng nhận báo cáo khi đẩy phần việc tốn CPU ra khỏi event loop.
+
+- validation: lọc ngôn ngữ/độ dài/spam trên event loop ("inline") so với process pool 1..N worker (gom lô).
+- nlp: embedding + phân loại qua NLPRequestCoalescer với 1..N thread (model mock, hoặc --model-path).
+
+Mức tăng theo số core chỉ thấy được trên máy có nhiều core (xem dòng "cpus" ở đầu kết quả).
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_executors [--reports 20000] [--workers 1,2,4]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+from benchmarks.bench_spam_matcher import REPORTS
+from services.community_processing.types import CommunityReport
+
+
+def make_reports(count: int) -> list[CommunityReport]:
+    return [CommunityReport(user_id=f"user_{i % 500}", content=REPORTS[i % len(REPORTS)] + f" (báo cáo {i})",
+                            timestamp=datetime.now()) for i in range(count)]
+
+
+async def _drive(submit, items, concurrency: int) -> float:
+    """Gửi `items` với tối đa `concurrency` yêu cầu đang chờ (giống nhiều request HTTP đồng thời), trả về số giây"""
+    queue = iter(items)
+
+    async def client():
+        for item in queue:
+            await submit(item)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def bench_validation(count: int, workers_list: list[int], concurrency: int):
+    from services.community_processing.executors import ReportValidator
+
+    reports = make_reports(count)
+    print(f"{'validation':>16} | {'reports/s':>10} | {'speedup':>8}")
+    print("-" * 42)
+    inline = ReportValidator(mode="inline")
+    baseline = count / await _drive(inline.validate, reports, concurrency)
+    print(f"{'inline':>16} | {baseline:>10.0f} | {1.0:>7.2f}x")
+    for workers in workers_list:
+        validator = ReportValidator(mode="process", workers=workers)
+        await validator.warm_up()
+        rate = count / await _drive(validator.validate, reports, concurrency)
+        validator.shutdown()
+        print(f"{f'process x{workers}':>16} | {rate:>10.0f} | {rate / baseline:>7.2f}x")
+
+
+async def bench_nlp(count: int, threads_list: list[int], concurrency: int):
+    from services.community_processing.executors import create_nlp_executor
+    from services.community_processing.nlp_batcher import NLPRequestCoalescer
+    from utils.nlp_utils import nlp_processor
+
+    nlp_processor.embedding_cache = None # Đo model, không đo cache
+    texts = [report.content for report in make_reports(count)]
+    print(f"{'nlp':>16} | {'reports/s':>10} | {'speedup':>8}")
+    print("-" * 42)
+    baseline = None
+    for threads in threads_list:
+        coalescer = NLPRequestCoalescer(nlp_processor, executor=create_nlp_executor(threads))
+        await coalescer.warm_up()
+        rate = count / await _drive(coalescer.submit, texts, concurrency)
+        baseline = baseline or rate
+        print(f"{f'threads x{threads}':>16} | {rate:>10.0f} | {rate / baseline:>7.2f}x")
+
+
+def run(reports: int, nlp_reports: int, workers: list[int], concurrency: int):
+    logging.disable(logging.WARNING)
+    logging.getLogger().setLevel(logging.ERROR) # Process worker dùng mức log này
+    print(f"cpus: {os.cpu_count()}, concurrency: {concurrency}\n")
+    asyncio.run(bench_validation(reports, workers, concurrency))
+    print()
+    asyncio.run(bench_nlp(nlp_reports, workers, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", help="Thư mục model transformers cục bộ (mặc định: mock)")
+    parser.add_argument("--reports", type=int, default=20_000)
+    parser.add_argument("--nlp-reports", type=int, default=2_000)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--concurrency", type=int, default=256)
+    args = parser.parse_args()
+    if args.model_path:
+        os.environ["PHOBERT_MODEL_PATH"] = args.model_path
+    run(args.reports, args.nlp_reports, [int(w) for w in args.workers.split(",")], args.concurrency)
@@ -0,0 +1,45 @@
+"""
+Benchmark: geocoding offline bằng gazetteer.
+
+- find: tìm địa danh trong nội dung báo cáo (một lượt quét trie theo từ)
+- resolve: tra chuỗi địa điểm người dùng nhập, lần đầu (cache miss) và các lần sau (cache LRU)
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_gazetteer
+"""
+import time
+
+from benchmarks.workloads import ReportGenerator, STREETS
+from services.community_processing.gazetteer import Gazetteer
+
+N_REPORTS = 20_000
+
+
+def run():
+    gazetteer = Gazetteer.load()
+    texts = [report["description"] for report in ReportGenerator(0).report_data_batch(N_REPORTS)]
+    location_texts = [f"Ngã tư {a} - {b}" for a in STREETS for b in STREETS if a != b]
+
+    start = time.perf_counter()
+    found = sum(gazetteer.find(text) is not None for text in texts)
+    find_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in location_texts:
+        gazetteer.resolve(text)
+    miss_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(10):
+        for text in location_texts:
+            gazetteer.resolve(text)
+    hit_s = (time.perf_counter() - start) / 10
+
+    print(f"{gazetteer.size} place names, {found}/{N_REPORTS} reports located")
+    print(f"{'operation':>14} | {'us/op':>8}")
+    print("-" * 27)
+    print(f"{'find':>14} | {find_s / N_REPORTS * 1e6:>8.1f}")
+    print(f"{'resolve miss':>14} | {miss_s / len(location_texts) * 1e6:>8.1f}")
+    print(f"{'resolve hit':>14} | {hit_s / len(location_texts) * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    run()
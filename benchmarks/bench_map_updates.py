@@ -0,0 +1,92 @@
+"""
+Benchmark: cập nhật bản đồ real-time khi vote dồn vào vài báo cáo (độ nổi tiếng theo Zipf).
+
+So sánh gửi mỗi vote một message (không gộp) với MapUpdatePublisher gộp theo chu kỳ:
+số message PUBLISH, số delta subscriber phải áp, dung lượng payload (so với gửi cả hash báo cáo) và số vote/giây.
+Chạy trên MockRedis, một MapUpdateSubscriber phủ toàn bộ khu vực.
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_map_updates
+"""
+import asyncio
+import json
+import time
+
+from benchmarks.bench_pipeline import configure
+from benchmarks.workloads import HANOI_BOUNDS, ReportGenerator, VoteGenerator
+
+N_REPORTS = 300
+N_VOTES = 20_000
+INTERVAL_SECONDS = 0.5
+
+
+async def drain(subscriber, sizes: list) -> int:
+    applied = 0
+    while True:
+        message = await subscriber._pubsub.get_message(ignore_subscribe_messages=True, timeout=0.05)
+        if message is None:
+            return applied
+        sizes.append(len(message["data"].encode("utf-8")))
+        applied += subscriber.apply(message["data"])
+
+
+async def run_votes(service, votes, coalesce: bool) -> float:
+    publisher = service.map_publisher
+    flusher = asyncio.create_task(publisher.run_forever(INTERVAL_SECONDS)) if coalesce else None
+    started = time.perf_counter()
+    for report_id, voter_id, vote_type in votes:
+        try:
+            await service.update_report_status_after_vote(report_id, voter_id, vote_type)
+        except ValueError:
+            continue
+        if not coalesce:
+            await publisher.flush()
+        await asyncio.sleep(0) # Nhường event loop như khi vote đến từ nhiều request
+    elapsed = time.perf_counter() - started
+    if flusher is not None:
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+    return elapsed
+
+
+async def main():
+    from services.community_report_service import get_community_report_service
+    from services.community_processing.map_updates import MapUpdateSubscriber, MAP_UPDATE_MESSAGES
+
+    service = get_community_report_service()
+    accepted = []
+    for report_data in ReportGenerator(0).report_data_batch(N_REPORTS):
+        result = await service.process_new_report(report_data)
+        if "report_id" in result:
+            accepted.append((result["report_id"], report_data["user_id"]))
+    await service.map_publisher.flush()
+
+    redis_conn = await service.redis.get_client()
+    hash_sizes = [len(json.dumps(await redis_conn.hgetall(f"report:{report_id}"), ensure_ascii=False).encode("utf-8"))
+                  for report_id, _ in accepted]
+    full_hash_bytes = sum(hash_sizes) / len(hash_sizes)
+
+    subscriber = MapUpdateSubscriber()
+    await subscriber.set_viewport(*HANOI_BOUNDS)
+    print(f"{len(accepted)} reports, {N_VOTES} votes, {len(subscriber._channels)} cells subscribed, "
+          f"full report hash ~{full_hash_bytes:.0f} bytes")
+    print(f"{'mode':>10} | {'votes/s':>9} | {'messages':>9} | {'deltas':>8} | {'KB sent':>8} | {'KB full hash':>12}")
+    print("-" * 74)
+    for seed, coalesce in ((1, False), (2, True)):
+        votes = list(VoteGenerator(seed).votes(accepted, N_VOTES))
+        messages_before = MAP_UPDATE_MESSAGES.value()
+        sizes = []
+        elapsed = await run_votes(service, votes, coalesce)
+        applied = await drain(subscriber, sizes)
+        messages = MAP_UPDATE_MESSAGES.value() - messages_before
+        print(f"{'coalesced' if coalesce else 'per_vote':>10} | {len(votes) / elapsed:>9.0f} | {messages:>9.0f} | {applied:>8} | "
+              f"{sum(sizes) / 1024:>8.1f} | {applied * full_hash_bytes / 1024:>12.1f}")
+    await subscriber.close()
+
+
+def run():
+    configure(seed=0, real_rate_limits=False)
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run()
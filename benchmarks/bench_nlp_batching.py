@@ -0,0 +1,47 @@
+"""
+Benchmark: thông lượng tính embedding + phân loại topic, từng báo cáo so với theo lô.
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.bench_nlp_batching                              # model mock
+    python -m benchmarks.bench_nlp_batching --model-path models/phobert  # model thật (cần transformers)
+"""
+import argparse
+import os
+import time
+
+
+def run(texts_count: int, batch_sizes: list[int]):
+    # Import sau khi đã đặt PHOBERT_MODEL_PATH để Config và singleton nạp đúng model
+    from benchmarks.bench_spam_matcher import REPORTS
+    from utils.nlp_utils import nlp_processor
+
+    nlp_processor.embedding_cache = None # Đo model, không đo cache (các lượt sau sẽ chỉ đọc lại cache)
+    texts = [REPORTS[i % len(REPORTS)] + f" (báo cáo {i})" for i in range(texts_count)]
+    nlp_processor.get_embeddings(texts[:8]) # Warm-up
+
+    start = time.perf_counter()
+    for text in texts:
+        embedding = nlp_processor.get_embedding(text)
+        nlp_processor.classify_topic_and_urgency(embedding)
+    per_item_s = time.perf_counter() - start
+
+    print(f"{'mode':>14} | {'texts/s':>9} | {'speedup':>8}")
+    print("-" * 38)
+    print(f"{'per-item':>14} | {texts_count / per_item_s:>9.1f} | {1.0:>7.1f}x")
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        embeddings = nlp_processor.get_embeddings(texts, batch_size=batch_size)
+        nlp_processor.classify_topic_and_urgency_batch(embeddings)
+        batched_s = time.perf_counter() - start
+        print(f"{f'batch={batch_size}':>14} | {texts_count / batched_s:>9.1f} | {per_item_s / batched_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", help="Thư mục model transformers cục bộ (mặc định: mock)")
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-sizes", default="8,32,64")
+    args = parser.parse_args()
+    if args.model_path:
+        os.environ["PHOBERT_MODEL_PATH"] = args.model_path
+    run(args.texts, [int(b) for b in args.batch_sizes.split(",")])
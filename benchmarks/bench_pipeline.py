@@ -0,0 +1,164 @@
+"""
+Benchmark tổng hợp cho luồng nhận báo cáo và luồng vote, chạy trên MockRedis trong bộ nhớ (không cần Redis thật).
+
+Kịch bản:
+- processor: CommunityReportProcessor.process_report (lọc ngôn ngữ/độ dài/spam)
+- service_intake: CommunityReportService.process_new_report (rate limit, lọc, NLP, trùng lặp, lưu Redis)
+- votes: CommunityReportService.update_report_status_after_vote trên các báo cáo vừa nhận
+- credibility_loop / credibility_bulk: chấm điểm tin cậy từng báo cáo so với theo mảng
+
+Dữ liệu sinh bởi benchmarks.workloads với seed cố định. Kết quả ghi ra JSON; truyền --compare để so với
+lần chạy trước (exit code 1 nếu thông lượng giảm hoặc p99 tăng quá --threshold).
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.bench_pipeline --output baseline.json
+    python -m benchmarks.bench_pipeline --output current.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+from config import Config
+from benchmarks.harness import ScenarioResult, compare, load_results, measure_async, measure_sync, print_results, save_results
+from benchmarks.workloads import ReportGenerator, VoteGenerator
+
+SCENARIOS = ["processor", "service_intake", "votes", "credibility_loop", "credibility_bulk"]
+
+
+def configure(seed: int, real_rate_limits: bool):
+    """Cấu hình môi trường benchmark trước khi tạo service"""
+    logging.disable(logging.WARNING)
+    Config.REDIS_USE_MOCK = True
+    # Không nạp snapshot sự cố của lần chạy thật
+    Config.INCIDENT_SNAPSHOT_PATH = os.path.join(tempfile.mkdtemp(), "incidents.npz")
+    if not real_rate_limits:
+        # Người dùng Zipf gửi rất nhiều báo cáo: với giới hạn thật, phần lớn sẽ bị chặn ngay ở bước đầu
+        Config.RATE_LIMIT_REPORTS_BURST = Config.RATE_LIMIT_REPORTS_PER_MINUTE = 10 ** 9
+        Config.RATE_LIMIT_GEO_CELL_BURST = Config.RATE_LIMIT_GEO_CELL_REPORTS_PER_MINUTE = 10 ** 9
+    # Model và classifier mock dùng số ngẫu nhiên
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        import torch
+        torch.manual_seed(seed)
+    except ImportError:
+        pass
+
+
+def bench_processor(reports: int, seed: int) -> ScenarioResult:
+    from services.community_processing.core_processor import CommunityReportProcessor
+
+    processor = CommunityReportProcessor()
+    items = ReportGenerator(seed).community_reports(reports)
+    valid = sum(processor.process_report(report).is_valid for report in items[:1000]) # Warm-up
+    return measure_sync("processor", processor.process_report, items, valid_ratio=valid / min(len(items), 1000))
+
+
+async def bench_service(reports: int, votes: int, seed: int, concurrency: int, scenarios: list) -> list:
+    from services.community_report_service import get_community_report_service
+
+    service = get_community_report_service()
+    await service.warm_up()
+    results = []
+
+    accepted = []
+    outcomes = Counter()
+
+    async def submit(report_data):
+        result = await service.process_new_report(report_data)
+        outcomes[result.get("code", "ACCEPTED")] += 1
+        if "report_id" in result:
+            accepted.append((result["report_id"], report_data["user_id"]))
+
+    items = ReportGenerator(seed).report_data_batch(reports)
+    intake = await measure_async("service_intake", submit, items, concurrency=concurrency)
+    intake.extra["outcomes"] = dict(outcomes)
+    if "service_intake" in scenarios:
+        results.append(intake)
+
+    if "votes" in scenarios and accepted:
+        vote_outcomes = Counter()
+
+        async def vote(item):
+            try:
+                await service.update_report_status_after_vote(*item)
+                vote_outcomes["ok"] += 1
+            except ValueError:
+                vote_outcomes["rejected"] += 1
+
+        vote_stream = list(VoteGenerator(seed).votes(accepted, votes))
+        results.append(await measure_async("votes", vote, vote_stream, concurrency=concurrency))
+        results[-1].extra["outcomes"] = dict(vote_outcomes)
+    return results
+
+
+def bench_credibility(reports: int, seed: int) -> list:
+    from benchmarks.bench_credibility import _ArrayReputation
+    from services.community_processing.credibility import ReportCredibilityCalculator
+
+    rng = np.random.default_rng(seed)
+    reputations = rng.random(reports)
+    upvotes = rng.poisson(3, reports)
+    downvotes = rng.poisson(1, reports)
+    verified = rng.random(reports) < 0.05
+    # Uy tín lấy theo user_id = chỉ số dòng
+    calculator = ReportCredibilityCalculator(_ArrayReputation(reputations))
+    results = []
+    rows = list(zip(upvotes.tolist(), downvotes.tolist(), verified.tolist()))
+    results.append(measure_sync("credibility_loop",
+                                lambda i: calculator.calculate_credibility(str(i), *rows[i]),
+                                range(reports)))
+    bulk = measure_sync("credibility_bulk",
+                        lambda _: calculator.calculate_credibility_bulk(reputations, upvotes, downvotes, verified), range(20))
+    # Mỗi lần gọi chấm toàn bộ mảng: quy đổi thông lượng ra số báo cáo/giây để so với bản loop
+    bulk.extra["reports_per_call"] = reports
+    bulk.extra["reports_per_s"] = reports * bulk.throughput_per_s
+    results.append(bulk)
+    return results
+
+
+def run(reports: int, votes: int, seed: int, concurrency: int, scenarios: list, real_rate_limits: bool) -> list:
+    configure(seed, real_rate_limits)
+    results = []
+    if "processor" in scenarios:
+        results.append(bench_processor(reports, seed))
+    if "service_intake" in scenarios or "votes" in scenarios:
+        results.extend(asyncio.run(bench_service(reports, votes, seed, concurrency, scenarios)))
+    credibility = [name for name in scenarios if name.startswith("credibility")]
+    if credibility:
+        results.extend(r for r in bench_credibility(reports * 10, seed) if r.name in credibility)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--real-rate-limits", action="store_true", help="Giữ giới hạn tần suất của Config")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file này")
+    parser.add_argument("--compare", help="File JSON của lần chạy trước để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Tỉ lệ thay đổi tối đa trước khi coi là hồi quy")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    params = {"reports": args.reports, "votes": args.votes, "seed": args.seed, "concurrency": args.concurrency,
+              "real_rate_limits": args.real_rate_limits}
+    results = run(args.reports, args.votes, args.seed, args.concurrency, scenarios, args.real_rate_limits)
+    print_results(results)
+    if args.output:
+        save_results(args.output, results, params)
+    if args.compare:
+        regressions = compare(load_results(args.compare), results, args.threshold, params)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
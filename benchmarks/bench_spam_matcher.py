@@ -0,0 +1,82 @@
+"""
+Benchmark: thông lượng kiểm tra spam, vòng lặp `in` theo từng từ khóa (cách cũ) so với bộ khớp một lần quét.
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_spam_matcher
+"""
+import re
+import time
+
+from config import Config
+from services.community_processing.filtering import SpamDetector
+
+REPORTS = [
+    "Có một vụ va chạm giữa xe máy và ô tô tại ngã tư Láng Hạ - Thái Hà, giao thông ùn tắc kéo dài khoảng 500m.",
+    "Cây đổ chắn ngang đường Kim Mã sau cơn mưa lớn, các phương tiện phải đi vòng qua Liễu Giai.",
+    "Nước ngập sâu khoảng 40cm trên đường Nguyễn Trãi đoạn trước Đại học Hà Nội, xe máy chết máy nhiều.",
+    "Phát hiện khói bốc lên từ một căn nhà trong ngõ 12 Trần Duy Hưng, lực lượng cứu hỏa đang có mặt.",
+    "Đèn tín hiệu giao thông tại nút Kim Liên bị hỏng từ sáng, cảnh sát đang phân luồng thủ công.",
+    "Khuyến mãi cực sốc, mua ngay điện thoại giá rẻ, liên hệ zalo 0912345678 để được tư vấn.",
+    "Đường Giải Phóng lúc nào cũng tắc, đồ ngu mới đi giờ này.",
+    "Xe tải chở vật liệu xây dựng làm rơi đá xuống mặt đường Vành đai 3 trên cao, rất nguy hiểm cho xe máy.",
+]
+ITERATIONS = 20_000
+
+
+def legacy_check_spam(detector, content):
+    """Cách cũ: mỗi từ khóa một lần quét chuỗi con"""
+    content_lower = content.lower()
+    for kw in detector.spam_keywords:
+        if kw in content_lower:
+            return True, kw
+    for bad in detector.badwords:
+        if bad in content_lower:
+            return True, bad
+    return False, ''
+
+
+def legacy_check_spam_with_patterns(detector, content, compiled_patterns):
+    """Cách cũ + các regex trong Config (cùng khối lượng kiểm tra với bộ khớp mới)"""
+    is_spam, keyword = legacy_check_spam(detector, content)
+    if is_spam:
+        return is_spam, keyword
+    content_lower = content.lower()
+    for pattern in compiled_patterns:
+        match = pattern.search(content_lower)
+        if match:
+            return True, match.group(0)
+    return False, ''
+
+
+def run():
+    detector = SpamDetector()
+    corpus = [REPORTS[i % len(REPORTS)] for i in range(ITERATIONS)]
+
+    start = time.perf_counter()
+    for content in corpus:
+        legacy_check_spam(detector, content)
+    legacy_s = time.perf_counter() - start
+
+    compiled_patterns = [re.compile(rf"(?<!\w)(?:{p})(?!\w)") for p in Config.SPAM_KEYWORDS + Config.OFFENSIVE_KEYWORDS]
+    start = time.perf_counter()
+    for content in corpus:
+        legacy_check_spam_with_patterns(detector, content, compiled_patterns)
+    legacy_patterns_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for content in corpus:
+        detector.check_spam(content)
+    matcher_s = time.perf_counter() - start
+
+    print(f"{'method':>24} | {'reports/s':>10} | {'us/report':>9}")
+    print("-" * 50)
+    rows = (
+        ("legacy loop (keywords)", legacy_s),
+        ("legacy loop + regexes", legacy_patterns_s),
+        ("single-pass matcher", matcher_s),
+    )
+    for name, elapsed in rows:
+        print(f"{name:>24} | {ITERATIONS / elapsed:>10.0f} | {elapsed / ITERATIONS * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,74 @@
+"""
+Benchmark: thời gian khởi động worker (mỗi kịch bản chạy trong một process Python mới).
+
+- filter_only: import CommunityReportProcessor và kiểm tra một báo cáo (worker chỉ lọc, không cần torch/Redis).
+- service_import: import services.community_report_service (không kết nối Redis, không nạp model).
+- first_report: tạo service và xử lý báo cáo đầu tiên (nạp torch + model, kết nối Redis ở lần dùng đầu).
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_startup [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "filter_only": """
+from datetime import datetime
+from services.community_processing.core_processor import CommunityReportProcessor
+from services.community_processing.types import CommunityReport
+CommunityReportProcessor().process_report(CommunityReport(user_id="u", content="Có vụ va chạm ở cầu Chương Dương gây ùn tắc kéo dài", timestamp=datetime.now()))
+""",
+    "service_import": """
+import services.community_report_service
+""",
+    "first_report": """
+import asyncio
+from services.community_report_service import get_community_report_service
+asyncio.run(get_community_report_service().process_new_report(
+    {"user_id": "u", "description": "Có vụ va chạm ở cầu Chương Dương gây ùn tắc kéo dài", "latitude": 21.03, "longitude": 105.87}))
+""",
+}
+
+# Đo trong process con: thời gian từ trước khi import tới khi xong kịch bản, và torch đã bị import hay chưa
+_HARNESS = """
+import logging, sys, time
+logging.disable(logging.CRITICAL)
+started = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - started
+import json
+print(json.dumps({{"ms": elapsed * 1000, "torch": "torch" in sys.modules, "redis_connected": _redis_connected()}}))
+"""
+
+_REDIS_CHECK = """
+def _redis_connected():
+    module = sys.modules.get("utils.redis_utils")
+    return bool(module and (module.RedisClient._instance and module.RedisClient._instance.client is not None))
+"""
+
+
+def run_scenario(body: str) -> dict:
+    code = _REDIS_CHECK + _HARNESS.format(body=body)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.getcwd(),
+                            env={**os.environ, "PYTHONPATH": os.getcwd()})
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(repeat: int = 3):
+    print(f"{'scenario':>15} | {'median ms':>10} | {'torch':>5} | {'redis':>5}")
+    print("-" * 46)
+    for name, body in SCENARIOS.items():
+        runs = [run_scenario(body) for _ in range(repeat)]
+        median = statistics.median(r["ms"] for r in runs)
+        print(f"{name:>15} | {median:>10.1f} | {str(runs[0]['torch']):>5} | {str(runs[0]['redis_connected']):>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    run(parser.parse_args().repeat)
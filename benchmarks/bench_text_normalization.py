@@ -0,0 +1,70 @@
+"""
+Benchmark: chuẩn hóa văn bản trên đường nhận báo cáo.
+
+- legacy: mỗi bộ lọc tự chuyển chữ thường, clean_text chạy 5 lần re.sub với mẫu chưa biên dịch.
+- shared: NormalizedText tính các dạng chuẩn hóa một lần, regex biên dịch sẵn, dùng chung cho bộ lọc và NLP.
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_text_normalization
+"""
+import re
+import time
+
+from benchmarks.bench_spam_matcher import REPORTS
+from utils.text_utils import NormalizedText, tokenize_vietnamese
+
+CORPUS = REPORTS + [
+    "Tai nạn liên hoàn trên cầu Nhật Tân hướng đi Nội Bài, xem video tại https://facebook.com/watch/12345 nhé mọi người!!!",
+    "<p>Ngập nặng ở phố Hàng Bài</p> sau trận mưa chiều nay, nước tràn vào nhà dân 😢😢",
+    "CẢNH BÁO: có nhóm thanh niên đua xe lạng lách trên đại lộ Thăng Long lúc 23h đêm qua, rất nguy hiểm!!!",
+    "Sạt lở taluy dương trên đường Hồ Chí Minh đoạn qua Ba Vì, đất đá tràn xuống mặt đường khoảng 20m3.",
+]
+ITERATIONS = 50_000
+
+
+def legacy_clean_text(text):
+    text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
+    text = re.sub(r'<.*?>', '', text)
+    text = re.sub(r'[^a-zA-ZÀ-ỹ0-9\s.,?!]', '', text)
+    text = text.lower().strip()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_pipeline(content):
+    content = content.strip()
+    for char in 'ăâêôơưđ': # LanguageDetector
+        if char in content.lower():
+            break
+    len(content) # ContentValidator
+    content.lower() # SpamDetector
+    return tokenize_vietnamese(legacy_clean_text(content)) # NLPProcessor.get_embedding
+
+
+def shared_pipeline(content):
+    text = NormalizedText(content)
+    lower = text.lower
+    for char in 'ăâêôơưđ':
+        if char in lower:
+            break
+    len(text.stripped)
+    text.lower
+    return text.tokenized
+
+
+def run():
+    corpus = [CORPUS[i % len(CORPUS)] for i in range(ITERATIONS)]
+    results = {}
+    for name, pipeline in (("legacy", legacy_pipeline), ("shared", shared_pipeline)):
+        start = time.perf_counter()
+        outputs = [pipeline(content) for content in corpus]
+        results[name] = (time.perf_counter() - start, outputs)
+
+    assert results["legacy"][1] == results["shared"][1], "Kết quả chuẩn hóa khác nhau"
+    print(f"{'pipeline':>10} | {'reports/s':>10} | {'us/report':>9}")
+    print("-" * 36)
+    for name, (elapsed, _) in results.items():
+        print(f"{name:>10} | {ITERATIONS / elapsed:>10.0f} | {elapsed / ITERATIONS * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    run()
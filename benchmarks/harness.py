@@ -0,0 +1,129 @@
+"""
+Công cụ chung cho benchmark: đo độ trễ từng lời gọi, tóm tắt (thông lượng, p50/p90/p99),
+ghi kết quả JSON và so sánh với một lần chạy trước để phát hiện hồi quy.
+"""
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+import numpy as np
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    count: int
+    seconds: float
+    throughput_per_s: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    extra: Dict[str, Any] = field(default_factory=dict) # Thông tin riêng của kịch bản (vd. số báo cáo theo mã kết quả)
+
+    @classmethod
+    def from_latencies(cls, name: str, latencies: List[float], seconds: float, **extra) -> "ScenarioResult":
+        samples_ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+        p50, p90, p99 = np.percentile(samples_ms, [50, 90, 99])
+        return cls(name=name, count=len(latencies), seconds=seconds, throughput_per_s=len(latencies) / seconds if seconds else 0.0,
+                   p50_ms=float(p50), p90_ms=float(p90), p99_ms=float(p99), max_ms=float(samples_ms.max()), extra=extra)
+
+
+def measure_sync(name: str, fn: Callable[[Any], Any], items: Iterable[Any], **extra) -> ScenarioResult:
+    """Gọi fn(item) tuần tự, đo từng lời gọi"""
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    for item in items:
+        t0 = clock()
+        fn(item)
+        latencies.append(clock() - t0)
+    return ScenarioResult.from_latencies(name, latencies, clock() - started, **extra)
+
+
+async def measure_async(name: str, fn: Callable[[Any], Awaitable[Any]], items: Iterable[Any], concurrency: int = 1,
+                        **extra) -> ScenarioResult:
+    """
+    Gọi `await fn(item)` với tối đa `concurrency` lời gọi đồng thời (như nhiều request HTTP cùng lúc).
+    Độ trễ mỗi lời gọi tính cả thời gian chờ event loop, tức là độ trễ client thấy.
+    """
+    latencies = []
+    clock = time.perf_counter
+    queue = iter(items)
+
+    async def client():
+        for item in queue:
+            t0 = clock()
+            await fn(item)
+            latencies.append(clock() - t0)
+
+    started = clock()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return ScenarioResult.from_latencies(name, latencies, clock() - started, **extra)
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def save_results(path: str, results: List[ScenarioResult], params: Dict[str, Any]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "params": params, "scenarios": [asdict(r) for r in results]},
+                  f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict[str, Any], results: List[ScenarioResult], threshold: float, params: Dict[str, Any] = None) -> List[str]:
+    """
+    So sánh với kết quả cũ: hồi quy khi thông lượng giảm hoặc p99 tăng quá `threshold` (tỉ lệ, vd. 0.1 = 10%).
+    Trả về danh sách mô tả các hồi quy (rỗng nếu không có).
+    """
+    if params is not None and baseline.get("params") != params:
+        # Khác tham số (seed, số báo cáo...) thì dữ liệu khác nhau: vẫn so được nhưng nhiễu hơn
+        print(f"Warning: baseline params {baseline.get('params')} differ from current {params}.")
+    old = {s["name"]: s for s in baseline["scenarios"]}
+    regressions = []
+    print(f"\n{'scenario':>22} | {'throughput':>22} | {'p99 ms':>22}")
+    print("-" * 74)
+    for result in results:
+        before = old.get(result.name)
+        if before is None:
+            print(f"{result.name:>22} | {'(mới)':>22} | {'':>22}")
+            continue
+        throughput_change = _change(before["throughput_per_s"], result.throughput_per_s)
+        p99_change = _change(before["p99_ms"], result.p99_ms)
+        print(f"{result.name:>22} | {before['throughput_per_s']:>9.0f} -> {result.throughput_per_s:>9.0f} "
+              f"({throughput_change:+.0%}) | {before['p99_ms']:>8.2f} -> {result.p99_ms:>8.2f} ({p99_change:+.0%})")
+        if throughput_change < -threshold:
+            regressions.append(f"{result.name}: throughput {throughput_change:+.1%}")
+        if p99_change > threshold:
+            regressions.append(f"{result.name}: p99 {p99_change:+.1%}")
+    return regressions
+
+
+def print_results(results: List[ScenarioResult]):
+    print(f"{'scenario':>22} | {'count':>7} | {'ops/s':>10} | {'p50 ms':>8} | {'p90 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 90)
+    for r in results:
+        print(f"{r.name:>22} | {r.count:>7} | {r.throughput_per_s:>10.0f} | {r.p50_ms:>8.3f} | {r.p90_ms:>8.3f} | "
+              f"{r.p99_ms:>8.3f} | {r.max_ms:>8.3f}")
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
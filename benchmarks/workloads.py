@@ -0,0 +1,143 @@
+"""
+Sinh dữ liệu tổng hợp cho benchmark: báo cáo tiếng Việt, vị trí tập trung quanh các điểm nóng ở Hà Nội,
+luồng vote. Cùng seed cho cùng dữ liệu để kết quả giữa các lần chạy so sánh được.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import accumulate
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from services.community_processing.types import CommunityReport
+
+
+@dataclass(frozen=True)
+class Hotspot:
+    name: str
+    lat: float
+    lon: float
+    weight: float # Tỉ lệ báo cáo tương đối
+    spread_deg: float # Độ lệch chuẩn của vị trí quanh tâm (~0.01 độ = 1km)
+
+
+HANOI_HOTSPOTS = [
+    Hotspot("Hoàn Kiếm", 21.0285, 105.8542, 3.0, 0.006),
+    Hotspot("Láng Hạ", 21.0167, 105.8163, 2.5, 0.005),
+    Hotspot("Cầu Giấy", 21.0362, 105.7906, 2.0, 0.008),
+    Hotspot("Mỹ Đình", 21.0177, 105.7766, 1.5, 0.008),
+    Hotspot("Ngã Tư Sở", 21.0030, 105.8200, 1.5, 0.004),
+    Hotspot("Kim Liên", 21.0070, 105.8400, 1.0, 0.004),
+    Hotspot("Long Biên", 21.0450, 105.8800, 1.0, 0.012),
+    Hotspot("Hà Đông", 20.9714, 105.7788, 1.0, 0.015),
+]
+# Phần báo cáo rải đều trong khung nội thành (không thuộc điểm nóng nào)
+HANOI_BOUNDS = (20.95, 105.75, 21.08, 105.90)
+
+STREETS = ["Láng Hạ", "Thái Hà", "Kim Mã", "Nguyễn Trãi", "Giải Phóng", "Trần Duy Hưng", "Xuân Thủy", "Cầu Giấy",
+           "Phạm Hùng", "Nguyễn Chí Thanh", "Đê La Thành", "Tây Sơn", "Lê Duẩn", "Bạch Mai", "Minh Khai", "Nguyễn Văn Cừ"]
+VEHICLES = ["xe máy", "ô tô", "xe tải", "xe buýt", "taxi", "xe đạp", "xe container"]
+
+TEMPLATES = {
+    "giao_thong": [
+        "Có vụ va chạm giữa {vehicle} và {vehicle2} tại đường {street}, giao thông ùn tắc kéo dài khoảng {n}00m.",
+        "Đường {street} đang tắc nghẽn nghiêm trọng, các phương tiện di chuyển rất chậm, nên tránh khu vực này.",
+        "Đèn tín hiệu giao thông tại ngã tư {street} - {street2} bị hỏng, cảnh sát đang phân luồng thủ công.",
+        "Một chiếc {vehicle} bị hỏng nằm giữa đường {street}, gây cản trở giao thông hướng đi {street2}.",
+    ],
+    "ngap_lut": [
+        "Nước ngập sâu khoảng {n}0cm trên đường {street}, nhiều {vehicle} chết máy phải dắt bộ.",
+        "Mưa lớn làm ngập cục bộ đoạn đường {street} gần ngã tư {street2}, người dân nên đi đường khác.",
+    ],
+    "chay_no": [
+        "Phát hiện khói bốc lên từ một căn nhà trong ngõ {n} phố {street}, lực lượng cứu hỏa đang có mặt.",
+        "Cháy một cửa hàng trên đường {street}, khói đen bốc cao, giao thông khu vực bị phong tỏa.",
+    ],
+    "toi_pham": [
+        "Có đối tượng giật túi xách của người đi đường tại phố {street} rồi bỏ chạy về hướng {street2}.",
+        "Người dân phát hiện nhóm thanh niên mang hung khí tụ tập gần ngã tư {street}, đề nghị công an kiểm tra.",
+    ],
+    "cay_do": [
+        "Cây đổ chắn ngang đường {street} sau cơn mưa lớn, các phương tiện phải đi vòng qua {street2}.",
+    ],
+}
+SPAM = [
+    "Khuyến mãi cực sốc, mua ngay điện thoại giá rẻ, liên hệ zalo 09{n}2345678 để được tư vấn.",
+    "Đường {street} lúc nào cũng tắc, đồ ngu mới đi giờ này.",
+]
+NON_VIETNAMESE = ["Heavy traffic on {street} street right now, avoid the area.", "ok"]
+
+
+class ReportGenerator:
+    """
+    Sinh báo cáo mới: người dùng theo phân phối Zipf (ít người gửi rất nhiều), vị trí theo các điểm nóng,
+    một tỉ lệ spam/không phải tiếng Việt để các bộ lọc có việc thật để làm.
+    """
+
+    def __init__(self, seed: int = 0, n_users: int = 5000, spam_ratio: float = 0.1, invalid_ratio: float = 0.05,
+                 hotspot_ratio: float = 0.8):
+        self.rng = random.Random(seed)
+        self.n_users = n_users
+        self.spam_ratio = spam_ratio
+        self.invalid_ratio = invalid_ratio
+        self.hotspot_ratio = hotspot_ratio
+        self._topics = list(TEMPLATES)
+        self._hotspot_weights = [h.weight for h in HANOI_HOTSPOTS]
+        self._user_cum_weights = list(accumulate(1 / (rank + 1) for rank in range(n_users)))
+
+    def location(self) -> Tuple[float, float]:
+        if self.rng.random() < self.hotspot_ratio:
+            hotspot = self.rng.choices(HANOI_HOTSPOTS, self._hotspot_weights)[0]
+            return self.rng.gauss(hotspot.lat, hotspot.spread_deg), self.rng.gauss(hotspot.lon, hotspot.spread_deg)
+        min_lat, min_lon, max_lat, max_lon = HANOI_BOUNDS
+        return self.rng.uniform(min_lat, max_lat), self.rng.uniform(min_lon, max_lon)
+
+    def text(self) -> str:
+        roll = self.rng.random()
+        if roll < self.spam_ratio:
+            template = self.rng.choice(SPAM)
+        elif roll < self.spam_ratio + self.invalid_ratio:
+            template = self.rng.choice(NON_VIETNAMESE)
+        else:
+            template = self.rng.choice(TEMPLATES[self.rng.choice(self._topics)])
+        street, street2 = self.rng.sample(STREETS, 2)
+        vehicle, vehicle2 = self.rng.sample(VEHICLES, 2)
+        return template.format(street=street, street2=street2, vehicle=vehicle, vehicle2=vehicle2, n=self.rng.randint(1, 9))
+
+    def user_id(self) -> str:
+        return f"user_{self.rng.choices(range(self.n_users), cum_weights=self._user_cum_weights)[0]}"
+
+    def report_data(self) -> Dict:
+        """Dữ liệu đầu vào cho CommunityReportService.process_new_report"""
+        lat, lon = self.location()
+        return {"user_id": self.user_id(), "description": self.text(), "latitude": round(lat, 6), "longitude": round(lon, 6)}
+
+    def report_data_batch(self, n: int) -> List[Dict]:
+        return [self.report_data() for _ in range(n)]
+
+    def community_reports(self, n: int) -> List[CommunityReport]:
+        """Đầu vào cho CommunityReportProcessor.process_report"""
+        reports = []
+        for data in self.report_data_batch(n):
+            reports.append(CommunityReport(user_id=data["user_id"], content=data["description"], latitude=data["latitude"],
+                                           longitude=data["longitude"], timestamp=datetime.now()))
+        return reports
+
+
+class VoteGenerator:
+    """
+    Sinh luồng vote trên các báo cáo đã có: độ nổi tiếng của báo cáo theo Zipf (vài báo cáo nhận phần lớn vote),
+    đa số là upvote, một phần nhỏ vote trùng/tự vote để đi qua các nhánh từ chối.
+    """
+
+    def __init__(self, seed: int = 0, n_voters: int = 20000, upvote_ratio: float = 0.75):
+        self.rng = random.Random(seed + 1)
+        self.n_voters = n_voters
+        self.upvote_ratio = upvote_ratio
+
+    def votes(self, reports: Sequence[Tuple[str, str]], n: int) -> Iterator[Tuple[str, str, str]]:
+        """`reports`: danh sách (report_id, owner_id). Sinh (report_id, voter_id, vote_type)"""
+        cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(reports))))
+        for _ in range(n):
+            report_id, owner_id = self.rng.choices(reports, cum_weights=cum_weights)[0]
+            voter_id = owner_id if self.rng.random() < 0.01 else f"voter_{self.rng.randrange(self.n_voters)}"
+            yield report_id, voter_id, "up" if self.rng.random() < self.upvote_ratio else "down"
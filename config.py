@@ -7,12 +7,19 @@ class Config:
     REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
     REDIS_DB = int(os.getenv("REDIS_DB", 0))
+    REDIS_USE_MOCK = os.getenv("REDIS_USE_MOCK", "false").lower() == "true" # Luôn dùng MockRedis trong bộ nhớ (chạy local, benchmark)
+    REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", 50)) # Số kết nối tối đa của client async
+    REDIS_POOL_TIMEOUT_SECONDS = 5 # Chờ tối đa khi pool đã hết kết nối
+    REDIS_SOCKET_TIMEOUT_SECONDS = 2
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS = 30
 
     # --- Configs tối thiểu cho Filtering ---
     SPAM_KEYWORDS = [
         r'mua\s*ngay', r'giảm\s*giá', r'khuyến\s*mãi', r'liên\s*hệ', r'09\d{8}' # Thêm mẫu số điện thoại đơn giản
     ]
     OFFENSIVE_KEYWORDS = [r'đ[mđ]', r'c[cặ]c', r'l[oồ]n']
+    SPAM_KEYWORDS_FILE = os.getenv("SPAM_KEYWORDS_FILE") # JSON {"spam": [...], "offensive": [...]}, nạp lại khi file thay đổi
+    SPAM_KEYWORDS_RELOAD_INTERVAL_SECONDS = 30
     PHONE_PATTERN = r'(?:0|\+84)(?:[\s\-\.]?\d{2,3}[\s\-\.]?\d{3}[\s\-\.]?\d{3,4}|\d{9,10})'
     URL_PATTERN = r'https?://[^\s]+|www\.[^\s]+'
     MAX_ALLOWED_LINKS = 2
@@ -27,6 +34,8 @@ class Config:
     DATE_PATTERNS = [r'hôm\s*(?:nay|qua)']
     TIME_PATTERNS = [r'\d{1,2}(?::|h)']
     LOCATION_PATTERNS = [r'ngã\s*tư\s*\S+', r'quận\s*\S+'] # Rất đơn giản hóa
+    GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "data/gazetteer_hanoi.tsv") # Địa danh + tọa độ cho geocoding offline
+    GAZETTEER_CACHE_SIZE = 10000 # Số chuỗi địa điểm (location_text) đã tra được giữ trong cache LRU
 
     # --- Configs tối thiểu cho Credibility ---
     REPUTATION_WEIGHT_W1 = 0.4
@@ -43,6 +52,20 @@ class Config:
     CREDIBILITY_THRESHOLD_MEDIUM_REMOVE = 0.5 
     DAYS_THRESHOLD_MEDIUM_REMOVE = 14 
 
+    # --- Configs cho chỉ mục phụ của báo cáo (sorted set theo thời gian) ---
+    REPORT_INDEX_BUCKET_SECONDS = 3600 # Mỗi key chỉ mục chứa báo cáo của một giờ
+    REPORT_INDEX_CELL_SIZE_DEG = 0.02
+    REPORT_INDEX_DEFAULT_WINDOW_SECONDS = 24 * 3600 # Khoảng thời gian mặc định của truy vấn
+    REPORT_INDEX_MAX_QUERY_KEYS = 5000 # Số (cell x giờ) tối đa của một truy vấn
+    REPORT_INDEX_MAX_PAGE_SIZE = 200
+
+    # --- Configs cho tiến trình dọn báo cáo (sweeper) ---
+    REPORT_SWEEPER_INTERVAL_SECONDS = 600 # Nghỉ giữa hai lượt quét toàn bộ
+    REPORT_SWEEPER_BATCH_SIZE = 200 # COUNT của mỗi lệnh SCAN
+    REPORT_SWEEPER_MAX_KEYS_PER_SECOND = 2000 # Giới hạn tốc độ để không làm tăng độ trễ Redis
+    REPORT_SWEEPER_ARCHIVE = os.getenv("REPORT_SWEEPER_ARCHIVE", "true").lower() == "true" # Lưu trữ thay vì xóa hẳn
+    REPORT_ARCHIVE_TTL_SECONDS = 30 * 24 * 3600
+
     # --- Configs tối thiểu cho Rewards ---
     HIGH_CREDIBILITY_THRESHOLD = 0.9
     MIN_POSTS_FOR_REWARD = 10
@@ -54,19 +77,86 @@ class Config:
     BAN_LEVEL_2_THRESHOLD = 5
     BAN_LEVEL_3_THRESHOLD = 10
 
-    FAKE_SOS_BAN_DURATION = {1: 90, 2: 180, 3: -1}
+    FAKE_SOS_BAN_DURATION = {1: 90, 2: 180, 3: -1} # Số ngày bị cấm theo mức, -1 = vĩnh viễn
+
+    # --- Configs cho uy tín người dùng ---
+    REPUTATION_DEFAULT = 0.5 # Uy tín của người dùng mới
+    REPUTATION_STEP_CORRECT = 0.05 # Cộng khi báo cáo được cộng đồng xác thực
+    REPUTATION_STEP_INCORRECT = 0.1 # Trừ khi báo cáo bị đánh giá sai / điểm thấp
+    REPUTATION_CACHE_MAX_USERS = 100000 # Số người dùng giữ trong cache của process
+    REPUTATION_CACHE_TTL_SECONDS = 60 # Đọc lại từ Redis sau khoảng này (thấy cập nhật của worker khác)
+    REPUTATION_FLUSH_INTERVAL_SECONDS = 1.0 # Chu kỳ ghi dồn các thay đổi uy tín xuống Redis
+    REPUTATION_FLUSH_MAX_PENDING = 500 # Ghi ngay khi có nhiều người dùng chờ ghi
 
     # --- Configs tối thiểu cho NLP (mock) ---
-    PHOBERT_MODEL_PATH = "mock_path/phobert_base" # Chỉ là đường dẫn giả
+    PHOBERT_MODEL_PATH = os.getenv("PHOBERT_MODEL_PATH", "mock_path/phobert_base") # Đường dẫn giả -> dùng mock
     SPAM_CLASSIFIER_PATH = "mock_path/spam_classifier.pkl"
     TOPIC_CLASSIFIER_PATH = "mock_path/topic_classifier.pkl"
+    NLP_MAX_BATCH_SIZE = int(os.getenv("NLP_MAX_BATCH_SIZE", 32)) # Số văn bản tối đa mỗi lần chạy model
+    NLP_MAX_SEQ_LENGTH = 256 # Số token tối đa mỗi văn bản (cắt bớt phần thừa)
+    NLP_COALESCE_MAX_WAIT_MS = 5 # Thời gian tối đa chờ gom báo cáo đồng thời thành lô
+    NLP_COALESCE_MAX_BATCH_SIZE = 32 # Đủ số báo cáo này thì chạy lô ngay
+    NLP_PRELOAD = os.getenv("NLP_PRELOAD", "false").lower() == "true" # Nạp model khi khởi động thay vì ở báo cáo đầu tiên
+
+    # --- Executor cho phần việc tốn CPU (ngoài event loop) ---
+    NLP_EXECUTOR_THREADS = int(os.getenv("NLP_EXECUTOR_THREADS", 1)) # Số lô NLP chạy song song (torch/NumPy nhả GIL)
+    VALIDATION_EXECUTOR = os.getenv("VALIDATION_EXECUTOR", "inline").lower() # "inline" (trên event loop) hoặc "process"
+    VALIDATION_PROCESS_WORKERS = int(os.getenv("VALIDATION_PROCESS_WORKERS", 0)) # 0 = số CPU
+    VALIDATION_COALESCE_MAX_WAIT_MS = 2 # Gom báo cáo đồng thời thành lô trước khi gửi sang process
+    VALIDATION_COALESCE_MAX_BATCH_SIZE = 64 # Đủ số báo cáo này thì gửi lô ngay
+
+    # --- Metrics / profiling ---
+    METRICS_LATENCY_BUCKETS_SECONDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true" # Profiler lấy mẫu thread event loop
+    PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", 10))
+    PROFILER_MAX_STACKS = 5000 # Số stack khác nhau tối đa được giữ
+
+    # --- Configs cho cache embedding ---
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_MAX_BYTES = 64 * 1024 * 1024 # ~20k embedding 768 chiều float32
+    EMBEDDING_CACHE_TTL_SECONDS = 6 * 3600
+    EMBEDDING_CACHE_USE_REDIS = os.getenv("EMBEDDING_CACHE_USE_REDIS", "false").lower() == "true" # Tầng cache dùng chung giữa các worker
     
+    EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32") # float32 | float16 | int8
+
     # --- Configs tối thiểu cho Rate Limiting ---
-    RATE_LIMIT_REPORTS_PER_MINUTE = 5
+    RATE_LIMIT_REPORTS_PER_MINUTE = 5 # Tốc độ nạp lại token của mỗi người dùng
+    RATE_LIMIT_REPORTS_BURST = 5 # Số báo cáo tối đa gửi liên tiếp (dung lượng bucket)
+    RATE_LIMIT_GEO_CELL_SIZE_DEG = 0.01 # ~1km
+    RATE_LIMIT_GEO_CELL_REPORTS_PER_MINUTE = 60 # Giới hạn chung cho mọi người dùng trong một cell
+    RATE_LIMIT_GEO_CELL_BURST = 60
+    RATE_LIMIT_LOCAL_BLOCKLIST_SIZE = 10000 # Số key bị chặn được nhớ trong process (chặn sớm, không gọi Redis)
 
     # --- Configs tối thiểu cho Report Expiration ---
-    REPORT_EXPIRE_SECONDS_FOR_UNVERIFIED = 7 * 24 * 3600 # 7 days
+    # TTL của hash báo cáo chỉ là lưới an toàn: dài hơn ngưỡng dọn dài nhất (DAYS_THRESHOLD_*_REMOVE)
+    # để ReportSweeper (should_remove_report) là nơi quyết định xóa/lưu trữ báo cáo điểm thấp
+    REPORT_EXPIRE_SECONDS_FOR_UNVERIFIED = (DAYS_THRESHOLD_MEDIUM_REMOVE + 7) * 24 * 3600 # 21 days
 
     # --- Configs tối thiểu cho Duplicate Checking ---
     COSINE_SIMILARITY_THRESHOLD_DUPLICATE = 0.85
-    COSINE_SIMILARITY_THRESHOLD_REFERENCE = 0.70
\ No newline at end of file
+    COSINE_SIMILARITY_THRESHOLD_REFERENCE = 0.70
+    DUPLICATE_SEARCH_RADIUS_DEG = 0.02 # Giả định khoảng cách ~2km
+
+    # --- Configs cho chỉ mục không gian (lưới đều) ---
+    SPATIAL_GRID_CELL_SIZE_DEG = 0.02
+
+    # --- Configs cho chỉ mục embedding (ANN, IVF theo topic) ---
+    ANN_IVF_MAX_LISTS = 1024 # Số cụm (inverted list) tối đa mỗi topic, thực tế ~ sqrt(số vector)
+    ANN_IVF_PROBES = 8 # Số cụm được duyệt khi tìm kiếm xấp xỉ
+    ANN_TRAIN_MIN_VECTORS = 4096 # Chỉ huấn luyện IVF khi topic có đủ vector
+    ANN_RETRAIN_GROWTH_FACTOR = 8 # Huấn luyện lại khi số vector tăng gấp N lần
+    ANN_EXACT_SEARCH_MAX_CANDIDATES = 2048 # Dưới ngưỡng này so sánh chính xác toàn bộ ứng viên
+
+    # --- Configs cho gom cụm sự cố (nhiều báo cáo về cùng một sự việc) ---
+    INCIDENT_EXPIRE_SECONDS = 7 * 24 * 3600 # Sự cố hết hạn khi không có báo cáo mới trong khoảng này
+    INCIDENT_MERGE_SIMILARITY = 0.85 # Hai sự cố gần nhau có tâm cụm giống hơn ngưỡng này thì được gộp
+    INCIDENT_MERGE_RADIUS_DEG = 0.01 # ~1km
+    INCIDENT_INDEX_CELL_SIZE_DEG = 0.02
+    INCIDENT_SNAPSHOT_PATH = os.getenv("INCIDENT_SNAPSHOT_PATH", "data/incidents.npz")
+    INCIDENT_SNAPSHOT_INTERVAL_SECONDS = 300 # Chu kỳ ghi snapshot (và ghi lần cuối khi dừng service)
+
+    # --- Configs cho cập nhật bản đồ real-time (Redis pub/sub theo cell) ---
+    MAP_UPDATES_ENABLED = os.getenv("MAP_UPDATES_ENABLED", "true").lower() == "true"
+    MAP_UPDATES_CELL_SIZE_DEG = 0.02 # Mỗi cell một kênh; client đăng ký các cell phủ khung nhìn
+    MAP_UPDATES_INTERVAL_SECONDS = float(os.getenv("MAP_UPDATES_INTERVAL_SECONDS", 0.5)) # Mỗi báo cáo/sự cố tối đa một cập nhật mỗi chu kỳ
+    MAP_UPDATES_MAX_PENDING = 5000 # Gửi ngay khi có nhiều mục chờ gửi
\ No newline at end of file
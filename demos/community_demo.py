@@ -77,9 +77,8 @@ def demo_filtering():
         
         if result.extracted_info:
             logger.info(f"Thông tin trích xuất từ nội dung:")
-            logger.info(f"  - Ngày: {result.extracted_info['datetime']['date']}")
-            logger.info(f"  - Giờ: {result.extracted_info['datetime']['time']}")
-            logger.info(f"  - Địa điểm: {result.extracted_info['location']}")
+            logger.info(f"  - Địa điểm: {result.extracted_info['location']} ({result.extracted_info['location_kind']})")
+            logger.info(f"  - Tọa độ: {result.extracted_info['latitude']}, {result.extracted_info['longitude']}")
         
         print("-" * 80)
 
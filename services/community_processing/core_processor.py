@@ -1,6 +1,9 @@
 import logging
+from typing import Dict, Iterable, Iterator, List, Optional
 from services.community_processing.types import CommunityReport, ValidationResult
 from services.community_processing.filtering import SpamDetector, ContentValidator, LanguageDetector
+from services.community_processing.gazetteer import Gazetteer
+from utils.text_utils import NormalizedText
 
 logger = logging.getLogger(__name__)
 
@@ -10,33 +13,71 @@ class CommunityReportProcessor:
         self.spam_detector = SpamDetector()
         self.content_validator = ContentValidator()
         self.language_detector = LanguageDetector()
+        # Geocoding offline cho báo cáo không có tọa độ GPS
+        self.gazetteer = Gazetteer.load()
 
     def process_report(self, report: CommunityReport) -> ValidationResult:
-        content = report.content.strip()
+        return self._validate(report, reload_keywords=True, log_info=logger.isEnabledFor(logging.INFO))
+
+    def process_reports(self, reports: Iterable[CommunityReport]) -> List[ValidationResult]:
+        """Kiểm tra một lô báo cáo, trả về ValidationResult theo đúng thứ tự đầu vào"""
+        return list(self.iter_process_reports(reports))
+
+    def iter_process_reports(self, reports: Iterable[CommunityReport], chunk_size: int = 1000) -> Iterator[ValidationResult]:
+        """
+        Dạng generator của process_reports cho các đợt nhập dữ liệu lớn: không giữ toàn bộ kết quả trong bộ nhớ.
+        Danh sách từ khóa chỉ được kiểm tra reload mỗi `chunk_size` báo cáo thay vì mỗi báo cáo.
+        """
+        validate = self._validate
+        maybe_reload_keywords = self.spam_detector.maybe_reload_keywords
+        # Log "Hợp lệ" theo từng báo cáo rất tốn khi nhập hàng triệu dòng, chỉ bật khi cấu hình ở mức DEBUG
+        log_info = logger.isEnabledFor(logging.DEBUG)
+        for i, report in enumerate(reports):
+            if i % chunk_size == 0:
+                maybe_reload_keywords()
+            yield validate(report, reload_keywords=False, log_info=log_info)
+
+    def _validate(self, report: CommunityReport, reload_keywords: bool, log_info: bool) -> ValidationResult:
+        # Chuẩn hóa một lần (strip, chữ thường, làm sạch) và dùng chung cho mọi bộ lọc và bước NLP
+        text = NormalizedText(report.content)
 
         # 1. Kiểm tra ngôn ngữ
-        is_vietnamese, reason = self.language_detector.is_vietnamese(content)
+        is_vietnamese, reason = self.language_detector.is_vietnamese(text)
         if not is_vietnamese:
-            logger.warning(f"Report {report.user_id}: Ngôn ngữ không hợp lệ - {reason}")
+            logger.warning("Report %s: Ngôn ngữ không hợp lệ - %s", report.user_id, reason)
             return ValidationResult(is_valid=False, reason=f"Ngôn ngữ không hợp lệ: {reason}")
 
         # 2. Kiểm tra độ dài
-        is_valid_length, reason = self.content_validator.check_content_length(content)
+        is_valid_length, reason = self.content_validator.check_content_length(text)
         if not is_valid_length:
-            logger.warning(f"Report {report.user_id}: Độ dài không hợp lệ - {reason}")
+            logger.warning("Report %s: Độ dài không hợp lệ - %s", report.user_id, reason)
             return ValidationResult(is_valid=False, reason=reason)
 
         # 3. Kiểm tra spam
-        is_spam, reason = self.spam_detector.check_spam(content)
+        is_spam, reason = self.spam_detector.check_spam(text, reload_keywords=reload_keywords)
         if is_spam:
-            logger.warning(f"Report {report.user_id}: Spam - {reason}")
+            logger.warning("Report %s: Spam - %s", report.user_id, reason)
             return ValidationResult(is_valid=False, reason=f"Spam: {reason}")
 
         # Nếu pass tất cả các bước
-        logger.info(f"Report {report.user_id}: Hợp lệ")
+        if log_info:
+            logger.info("Report %s: Hợp lệ", report.user_id)
+        extracted_info = None
+        if report.latitude is None or report.longitude is None:
+            extracted_info = self._extract_location(report, text)
         return ValidationResult(
             is_valid=True,
             reason="Báo cáo hợp lệ",
-            filtered_content=content,
-            extracted_info=None
+            filtered_content=text.stripped,
+            extracted_info=extracted_info,
+            normalized_text=text
         )
+
+    def _extract_location(self, report: CommunityReport, text: NormalizedText) -> Optional[Dict]:
+        """Tọa độ từ địa điểm người dùng nhập (có cache) hoặc từ địa danh nhắc trong nội dung"""
+        place = self.gazetteer.resolve(report.location) if report.location else None
+        if place is None:
+            place = self.gazetteer.find(text.stripped)
+        if place is None:
+            return None
+        return {"location": place.name, "location_kind": place.kind, "latitude": place.latitude, "longitude": place.longitude}
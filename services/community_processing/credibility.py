@@ -1,14 +1,21 @@
 import logging
 import math
-from typing import Dict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 class ReportCredibilityCalculator:
     """Tính toán độ tin cậy của báo cáo"""
+
+    CREDIBILITY_LEVELS = np.array(["Thấp", "Trung bình", "Cao"], dtype=object)
     
-    def __init__(self):
+    def __init__(self, reputation_manager=None):
+        # Cần có get_reputation(user_id) -> float; gọi đồng bộ nên nên là ReputationManager đã load() sẵn người dùng
+        self.reputation_manager = reputation_manager
         self.w1 = Config.REPUTATION_WEIGHT_W1 # Trọng số uy tín người đăng
         self.w2 = Config.AGREE_VOTE_WEIGHT_W2 # Trọng số lượt đồng ý
         self.w3 = Config.DISAGREE_VOTE_WEIGHT_W3 # Trọng số lượt không đồng ý (âm)
@@ -28,10 +35,12 @@ class ReportCredibilityCalculator:
         user_id: str,
         upvotes: int,
         downvotes: int,
-        is_verified_by_news: bool = False
+        is_verified_by_news: bool = False,
+        include_details: bool = False
     ) -> Dict:
         """
         Tính điểm tin cậy của báo cáo
+        `calculation_details` (chuỗi công thức để debug) chỉ được tạo khi include_details=True
         """
         if is_verified_by_news:
             return {
@@ -71,26 +80,61 @@ class ReportCredibilityCalculator:
         else:
             status = "Đã đánh giá bởi cộng đồng"
         
-        return {
+        result = {
             'credibility_score': round(credibility_score, 3),
             'credibility_level': credibility_level,
             'status': status,
             'user_reputation': round(x, 3),
             'upvotes': upvotes,
             'downvotes': downvotes,
-            'total_votes': total_votes,
-            'calculation_details': {
+            'total_votes': total_votes
+        }
+        if include_details:
+            result['calculation_details'] = {
                 'x_user_reputation': round(x, 3),
                 'y_upvotes_normalized': round(y_normalized, 3),
                 'z_downvotes_normalized': round(z_normalized, 3),
                 'formula': f"({self.w1}*{round(x,3)} + {self.w2}*{round(y_normalized,3)} + {self.w3}*{round(z_normalized,3)}) / {round(sum_of_weights,3)}"
             }
-        }
+        return result
+
+    def calculate_credibility_bulk(
+        self,
+        reputations: np.ndarray,
+        upvotes: np.ndarray,
+        downvotes: np.ndarray,
+        is_verified_by_news: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Tính điểm tin cậy cho nhiều báo cáo trong một lượt vector hóa (vd. chấm lại toàn bộ báo cáo
+        sau khi đổi trọng số). Trả về (điểm đã làm tròn 3 chữ số, mức độ) cùng thứ tự đầu vào.
+        """
+        x = np.asarray(reputations, dtype=np.float64)
+        y_normalized = self._sigmoid_normalize_array(upvotes, self.sigmoid_k)
+        z_normalized = self._sigmoid_normalize_array(downvotes, self.sigmoid_k)
+
+        scores = self.w1 * x + self.w2 * y_normalized + self.w3 * z_normalized
+        sum_of_weights = self.w1 + abs(self.w2) + abs(self.w3)
+        if sum_of_weights > 0:
+            scores /= sum_of_weights
+        np.clip(scores, 0.0, 1.0, out=scores)
+        if is_verified_by_news is not None:
+            scores[np.asarray(is_verified_by_news, dtype=bool)] = 1.0
+
+        return np.round(scores, 3), self._get_credibility_levels(scores)
     
     def _sigmoid_normalize(self, value: int, k: float) -> float:
         """Chuẩn hóa giá trị bằng hàm sigmoid"""
         return 1 / (1 + math.exp(-k * value))
     
+    def _sigmoid_normalize_array(self, values: np.ndarray, k: float) -> np.ndarray:
+        return 1 / (1 + np.exp(-k * np.asarray(values, dtype=np.float64)))
+
+    def _get_credibility_levels(self, scores: np.ndarray) -> np.ndarray:
+        """Bản vector hóa của _get_credibility_level"""
+        level_index = (scores >= self.credibility_threshold_medium).astype(np.intp) + (scores >= self.credibility_threshold_high)
+        return self.CREDIBILITY_LEVELS[level_index]
+
     def _get_credibility_level(self, score: float) -> str:
         """Chuyển điểm tin cậy thành mức độ"""
         if score >= self.credibility_threshold_high: return "Cao"
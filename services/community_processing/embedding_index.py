@@ -0,0 +1,246 @@
+import heapq
+import logging
+import math
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from utils.vector_utils import EMBEDDING_DTYPE, normalize_embedding, normalize_embeddings
+
+logger = logging.getLogger(__name__)
+
+_INITIAL_CAPACITY = 1024
+_KMEANS_ITERATIONS = 8
+_TRAIN_SAMPLE_PER_LIST = 32
+_REASSIGN_CHUNK = 16384
+
+
+class _TopicPartition:
+    """
+    Ma trận embedding liên tục của một topic, kèm chỉ mục IVF (inverted file).
+    Khi chưa đủ vector để huấn luyện, tìm kiếm là so sánh chính xác toàn bộ.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.vectors = np.zeros((_INITIAL_CAPACITY, dim), dtype=EMBEDDING_DTYPE)
+        self.assign = np.full(_INITIAL_CAPACITY, -1, dtype=np.int32)
+        self.ids: List[Optional[str]] = []
+        self.row_of: Dict[str, int] = {}
+        self.free_rows: List[int] = []
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_count = 0
+        self._lists: List[Dict[int, None]] = []
+        self._list_cache: List[Optional[np.ndarray]] = []
+        self._live_cache: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def add(self, item_id: str, vector: np.ndarray):
+        if self.free_rows:
+            row = self.free_rows.pop()
+            self.ids[row] = item_id
+        else:
+            row = len(self.ids)
+            if row == len(self.vectors):
+                self._grow()
+            self.ids.append(item_id)
+        self.vectors[row] = vector
+        self.row_of[item_id] = row
+        self._live_cache = None
+        if self.centroids is not None:
+            self._assign_rows(np.array([row]))
+        self._maybe_train()
+
+    def remove(self, item_id: str) -> bool:
+        row = self.row_of.pop(item_id, None)
+        if row is None:
+            return False
+        list_no = self.assign[row]
+        if list_no >= 0:
+            self._lists[list_no].pop(row, None)
+            self._list_cache[list_no] = None
+            self.assign[row] = -1
+        self.ids[row] = None
+        self.free_rows.append(row)
+        self._live_cache = None
+        return True
+
+    def live_rows(self) -> np.ndarray:
+        if self._live_cache is None:
+            self._live_cache = np.fromiter(self.row_of.values(), dtype=np.int64, count=len(self.row_of))
+        return self._live_cache
+
+    def search_rows(self, query: np.ndarray, rows: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """So sánh chính xác với các hàng cho trước (một phép nhân ma trận-vector)"""
+        if len(rows) == 0:
+            return []
+        scores = self.vectors[rows] @ query
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return [(self.ids[rows[i]], float(scores[i])) for i in top]
+
+    def search(self, query: np.ndarray, k: int, n_probe: int) -> List[Tuple[str, float]]:
+        """Tìm kiếm xấp xỉ: chỉ duyệt `n_probe` cụm gần query nhất"""
+        if self.centroids is None:
+            return self.search_rows(query, self.live_rows(), k)
+        n_probe = min(n_probe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        rows = np.concatenate([self._list_rows(int(list_no)) for list_no in probes])
+        return self.search_rows(query, rows, k)
+
+    def _list_rows(self, list_no: int) -> np.ndarray:
+        cached = self._list_cache[list_no]
+        if cached is None:
+            members = self._lists[list_no]
+            cached = np.fromiter(members, dtype=np.int64, count=len(members))
+            self._list_cache[list_no] = cached
+        return cached
+
+    def _grow(self):
+        capacity = len(self.vectors) * 2
+        vectors = np.zeros((capacity, self.dim), dtype=EMBEDDING_DTYPE)
+        vectors[:len(self.vectors)] = self.vectors
+        assign = np.full(capacity, -1, dtype=np.int32)
+        assign[:len(self.assign)] = self.assign
+        self.vectors, self.assign = vectors, assign
+
+    def _maybe_train(self):
+        count = len(self.row_of)
+        if count < Config.ANN_TRAIN_MIN_VECTORS:
+            return
+        if self.centroids is not None and count < self.trained_count * Config.ANN_RETRAIN_GROWTH_FACTOR:
+            return
+        self.train()
+
+    def train(self, rng: np.random.Generator = None):
+        """Huấn luyện spherical k-means trên một mẫu và gán lại toàn bộ vector"""
+        rng = rng or np.random.default_rng(0)
+        rows = self.live_rows()
+        n_lists = min(Config.ANN_IVF_MAX_LISTS, int(math.sqrt(len(rows))))
+        if n_lists == 0:
+            return
+        sample_size = min(len(rows), n_lists * _TRAIN_SAMPLE_PER_LIST)
+        sample = self.vectors[rng.choice(rows, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty] # Giữ nguyên tâm cụm rỗng
+            centroids = normalize_embeddings(sums)
+
+        self.centroids = centroids
+        self.trained_count = len(rows)
+        self._lists = [{} for _ in range(n_lists)]
+        self._list_cache = [None] * n_lists
+        self.assign[:] = -1
+        for start in range(0, len(rows), _REASSIGN_CHUNK):
+            self._assign_rows(rows[start:start + _REASSIGN_CHUNK])
+        logger.info(f"Embedding index: trained IVF with {n_lists} lists over {len(rows)} vectors.")
+
+    def _assign_rows(self, rows: np.ndarray):
+        labels = np.argmax(self.vectors[rows] @ self.centroids.T, axis=1)
+        for row, list_no in zip(rows.tolist(), labels.tolist()):
+            self.assign[row] = list_no
+            self._lists[list_no][row] = None
+            self._list_cache[list_no] = None
+
+
+class TopicEmbeddingStore:
+    """
+    Kho embedding trong tiến trình, phân vùng theo topic, hỗ trợ tìm kiếm láng giềng gần xấp xỉ (IVF).
+    Vòng đời gắn với báo cáo: add khi tạo, remove khi xóa, expire theo TTL.
+    Có thể ghi snapshot ra đĩa và nạp lại khi khởi động.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds
+        self._partitions: Dict[str, _TopicPartition] = {}
+        self._meta: Dict[str, Tuple[str, Optional[float], Optional[float], float]] = {} # id -> (topic, lat, lon, expires_at)
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._meta
+
+    def add(self, item_id: str, topic: str, embedding: np.ndarray, lat: float = None, lon: float = None,
+            now: float = None, expires_at: float = None, normalized: bool = False):
+        if item_id in self._meta:
+            self.remove(item_id)
+        vector = embedding if normalized else normalize_embedding(embedding)
+        partition = self._partitions.get(topic)
+        if partition is None:
+            partition = self._partitions[topic] = _TopicPartition(len(vector))
+        partition.add(item_id, vector)
+
+        if expires_at is None:
+            now = time.time() if now is None else now
+            expires_at = now + self.ttl_seconds if self.ttl_seconds else math.inf
+        self._meta[item_id] = (topic, lat, lon, expires_at)
+        if expires_at != math.inf:
+            heapq.heappush(self._expiry_heap, (expires_at, item_id))
+
+    def remove(self, item_id: str) -> bool:
+        meta = self._meta.pop(item_id, None)
+        if meta is None:
+            return False
+        self._partitions[meta[0]].remove(item_id)
+        return True
+
+    def expire(self, now: float = None) -> List[str]:
+        """Xóa các embedding đã hết hạn, trả về danh sách id bị xóa"""
+        now = time.time() if now is None else now
+        expired = []
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, item_id = heapq.heappop(self._expiry_heap)
+            meta = self._meta.get(item_id)
+            if meta is not None and meta[3] == expires_at:
+                self.remove(item_id)
+                expired.append(item_id)
+        return expired
+
+    def get(self, item_id: str) -> Optional[np.ndarray]:
+        """Embedding đã chuẩn hóa của một mục (view, không sao chép)"""
+        meta = self._meta.get(item_id)
+        if meta is None:
+            return None
+        partition = self._partitions[meta[0]]
+        return partition.vectors[partition.row_of[item_id]]
+
+    def search(self, topic: str, embedding: np.ndarray, k: int = 1,
+               candidate_ids: Iterable[str] = None, normalized: bool = False) -> List[Tuple[str, float]]:
+        """
+        Tìm k embedding gần nhất trong cùng topic, trả về [(id, cosine similarity)] giảm dần.
+        Nếu có `candidate_ids` (ví dụ các sự kiện gần về địa lý), chỉ xét các id đó:
+        so sánh chính xác khi số ứng viên nhỏ, tìm kiếm IVF rồi lọc khi số ứng viên lớn.
+        """
+        partition = self._partitions.get(topic)
+        if partition is None or len(partition) == 0:
+            return []
+        query = embedding if normalized else normalize_embedding(embedding)
+        if candidate_ids is None:
+            return partition.search(query, k, Config.ANN_IVF_PROBES)
+
+        rows = [partition.row_of[item_id] for item_id in candidate_ids if item_id in partition.row_of]
+        if len(rows) <= Config.ANN_EXACT_SEARCH_MAX_CANDIDATES or partition.centroids is None:
+            return partition.search_rows(query, np.array(rows, dtype=np.int64), k)
+
+        allowed = set(partition.ids[row] for row in rows)
+        results = partition.search(query, max(k, Config.ANN_EXACT_SEARCH_MAX_CANDIDATES), Config.ANN_IVF_PROBES)
+        return [result for result in results if result[0] in allowed][:k]
+
+    def items(self) -> Iterator[Tuple[str, str, Optional[float], Optional[float]]]:
+        """Duyệt (id, topic, lat, lon) của các mục còn hiệu lực"""
+        for item_id, (topic, lat, lon, _) in self._meta.items():
+            yield item_id, topic, lat, lon
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from config import Config
+from services.community_processing.types import CommunityReport, ValidationResult
+from services.community_processing.core_processor import CommunityReportProcessor
+from services.community_processing.nlp_batcher import BatchCoalescer
+
+logger = logging.getLogger(__name__)
+
+# Bộ lọc của process worker, dựng một lần khi process khởi động (xem _init_validation_worker)
+_worker_processor: Optional[CommunityReportProcessor] = None
+
+
+def _init_validation_worker(log_level: int):
+    global _worker_processor
+    # Process spawn không kế thừa cấu hình logging của process chính
+    logging.basicConfig(level=log_level)
+    _worker_processor = CommunityReportProcessor()
+
+
+def _validate_batch(reports: List[CommunityReport]) -> List[ValidationResult]:
+    # Chạy trong process worker. NormalizedText trong kết quả mang theo các dạng đã chuẩn hóa,
+    # nên bước NLP ở process chính không phải làm sạch lại văn bản
+    return _worker_processor.process_reports(reports)
+
+
+def create_nlp_executor(threads: int = None) -> ThreadPoolExecutor:
+    """Thread pool cho embedding/phân loại: torch và NumPy nhả GIL nên nhiều lô chạy song song được"""
+    return ThreadPoolExecutor(max_workers=threads or Config.NLP_EXECUTOR_THREADS, thread_name_prefix="nlp-batch")
+
+
+class ReportValidator:
+    """
+    Kiểm tra ngôn ngữ/độ dài/spam của báo cáo mới.
+
+    - "inline": chạy thẳng trên event loop (mặc định; rẻ khi tải thấp, khoảng vài chục micro giây mỗi báo cáo).
+    - "process": các báo cáo đến đồng thời được gom lô và kiểm tra trong process pool, nên phần lọc
+      (Python thuần, giữ GIL) dùng được nhiều core. Gửi từng báo cáo sang process tốn hơn chính việc kiểm tra,
+      vì vậy luôn gửi theo lô. Mỗi process dựng bộ lọc một lần và không import torch.
+      Process được tạo bằng spawn: script chạy trực tiếp cần gọi service trong khối `if __name__ == "__main__":`.
+    """
+
+    def __init__(self, mode: str = None, workers: int = None, max_wait_ms: float = None, max_batch_size: int = None):
+        self.mode = mode or Config.VALIDATION_EXECUTOR
+        self.workers = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._coalescer: Optional[BatchCoalescer] = None
+        self._processor: Optional[CommunityReportProcessor] = None
+        if self.mode == "process":
+            self.workers = workers or Config.VALIDATION_PROCESS_WORKERS or os.cpu_count() or 1
+            # spawn thay vì fork: process chính có thể đã có thread (torch, executor) khi pool mở thêm worker
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_validation_worker,
+                                             initargs=(logger.getEffectiveLevel(),))
+            self._coalescer = BatchCoalescer(
+                _validate_batch, self._pool,
+                Config.VALIDATION_COALESCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms,
+                max_batch_size or Config.VALIDATION_COALESCE_MAX_BATCH_SIZE,
+                name="Validation"
+            )
+            logger.info(f"Report validation runs in {self.workers} worker processes.")
+        elif self.mode == "inline":
+            self._processor = CommunityReportProcessor()
+        else:
+            raise ValueError(f"Unknown validation executor mode: {self.mode!r}")
+
+    async def validate(self, report: CommunityReport) -> ValidationResult:
+        if self._coalescer is None:
+            return self._processor.process_report(report)
+        return await self._coalescer.submit(report)
+
+    async def warm_up(self):
+        """Khởi động trước các process worker (mỗi process dựng bộ lọc trong initializer)"""
+        if self._pool is not None:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self._pool, _validate_batch, []) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
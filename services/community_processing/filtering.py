@@ -1,4 +1,19 @@
 # filtering.py - Lọc báo cáo cộng đồng
+import json
+import logging
+import os
+import time
+
+from config import Config
+from services.community_processing.keyword_matcher import KeywordMatcher
+from utils.text_utils import NormalizedText
+
+logger = logging.getLogger(__name__)
+
+SPAM_REASONS = {
+    'spam': 'Nội dung chứa spam/bán hàng: "{}"',
+    'offensive': 'Nội dung chứa từ ngữ tục tĩu/chửi bậy: "{}"',
+}
 
 # Mock class: kiểm tra spam (giả lập)
 class SpamDetector:
@@ -10,22 +25,64 @@ class SpamDetector:
         self.badwords = [
             'địt', 'cặc', 'lồn', 'đéo', 'mẹ mày', 'vcl', 'dm', 'cc', 'shit', 'fuck', 'bitch', 'ngu', 'chó', 'đụ', 'phò', 'dâm', 'dốt', 'khốn nạn', 'con mẹ', 'con chó', 'cút', 'đồ ngu', 'đồ chó', 'đồ khốn', 'đồ rác', 'rác rưởi', 'bố láo', 'bố đời', 'bố mày', 'mẹ kiếp', 'vãi lồn', 'vãi cặc', 'vãi đái', 'vãi cả lồn', 'vãi cả cặc', 'vãi cả đái'
         ]
+        # Toàn bộ từ khóa + regex trong Config được biên dịch thành một bộ khớp, quét nội dung một lần
+        self.matcher = KeywordMatcher()
+        self._keywords_file_mtime = None
+        self._next_reload_check = 0.0
+        self._rebuild_matcher()
+        self.maybe_reload_keywords()
+
+    def _rebuild_matcher(self):
+        self.matcher.reload(
+            keywords={'spam': self.spam_keywords, 'offensive': self.badwords},
+            patterns={'spam': Config.SPAM_KEYWORDS, 'offensive': Config.OFFENSIVE_KEYWORDS},
+        )
 
-    def check_spam(self, content):
-        content_lower = content.lower()
-        # Kiểm tra spam bán hàng
-        for kw in self.spam_keywords:
-            if kw in content_lower:
-                return True, f'Nội dung chứa spam/bán hàng: "{kw}"'
-        # Kiểm tra từ ngữ tục tĩu/chửi bậy
-        for bad in self.badwords:
-            if bad in content_lower:
-                return True, f'Nội dung chứa từ ngữ tục tĩu/chửi bậy: "{bad}"'
-        return False, ''
+    def reload_keywords(self, spam_keywords=None, badwords=None):
+        """Thay danh sách từ khóa khi đang chạy (không cần khởi động lại worker)"""
+        if spam_keywords is not None:
+            self.spam_keywords = list(spam_keywords)
+        if badwords is not None:
+            self.badwords = list(badwords)
+        self._rebuild_matcher()
+
+    def maybe_reload_keywords(self):
+        """Nạp lại từ file SPAM_KEYWORDS_FILE (JSON {"spam": [...], "offensive": [...]}) nếu file đã thay đổi"""
+        path = Config.SPAM_KEYWORDS_FILE
+        if not path:
+            return
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + Config.SPAM_KEYWORDS_RELOAD_INTERVAL_SECONDS
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime == self._keywords_file_mtime:
+                return
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not reload spam keywords from {path}: {e}. Keeping current lists.")
+            return
+        self._keywords_file_mtime = mtime
+        self.reload_keywords(data.get('spam'), data.get('offensive'))
+        logger.info(f"Reloaded spam keywords from {path}.")
+
+    def check_spam(self, content, reload_keywords=True):
+        # Xử lý theo lô có thể tắt reload_keywords và tự gọi maybe_reload_keywords() một lần mỗi lô
+        if reload_keywords:
+            self.maybe_reload_keywords()
+        match = self.matcher.search(_lowered(content))
+        if match is None:
+            return False, ''
+        keyword, category = match
+        return True, SPAM_REASONS[category].format(keyword)
 
 # Mock class: kiểm tra độ dài nội dung
 class ContentValidator:
     def check_content_length(self, content, min_length=10):
+        if isinstance(content, NormalizedText):
+            content = content.stripped
         if len(content) < min_length:
             return False, f'Nội dung quá ngắn (<{min_length} ký tự)'
         return True, ''
@@ -34,10 +91,15 @@ class ContentValidator:
 class LanguageDetector:
     def is_vietnamese(self, content):
         # Giả lập: nếu có ký tự tiếng Việt phổ biến thì coi là tiếng Việt
+        content_lower = _lowered(content)
         for char in 'ăâêôơưđ':
-            if char in content.lower():
+            if char in content_lower:
                 return True, ''
         return False, 'Không phát hiện tiếng Việt'
 
+def _lowered(content):
+    # Các bộ lọc nhận str hoặc NormalizedText (dạng chữ thường đã tính sẵn, dùng chung)
+    return content.lower if isinstance(content, NormalizedText) else content.lower()
+
 def filter_reports(reports, min_length=10):
     return [r for r in reports if len(r.content) >= min_length]
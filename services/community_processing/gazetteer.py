@@ -0,0 +1,171 @@
+import logging
+import string
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_END = "" # Khóa đánh dấu cuối một tên trong trie (không trùng từ nào)
+
+# Độ chính xác của tọa độ theo loại địa danh: số nhỏ hơn được ưu tiên khi nội dung nhắc nhiều địa danh
+KIND_PRECISION = {"landmark": 0, "ward": 1, "street": 2, "district": 3}
+# Từ đứng trước tên cho biết loại địa danh (vd. "quận Cầu Giấy" khác "đường Cầu Giấy")
+KIND_HINTS = {"quan": "district", "q": "district", "phuong": "ward", "p": "ward", "duong": "street", "pho": "street"}
+
+
+def _build_fold_table() -> Dict[int, str]:
+    # Mỗi ký tự chữ hoa/có dấu ánh xạ sang đúng một ký tự thường không dấu, nên độ dài chuỗi không đổi
+    # và vị trí trong chuỗi đã bỏ dấu trùng với vị trí trong chuỗi gốc
+    table = {}
+    for code in list(range(0x41, 0x5B)) + list(range(0xC0, 0x250)) + list(range(0x1E00, 0x1F00)):
+        char = chr(code)
+        base = unicodedata.normalize("NFD", char)[0].lower()
+        if len(base) == 1 and base != char:
+            table[code] = base
+    table[ord("đ")] = table[ord("Đ")] = "d"
+    # Dấu câu thành khoảng trắng để tách từ chỉ cần str.split()
+    for char in string.punctuation + "–—…“”‘’«»·":
+        table[ord(char)] = " "
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def fold_text(text: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt, dấu câu thành khoảng trắng ("Láng Hạ-Thái Hà" -> "lang ha thai ha"), giữ nguyên độ dài"""
+    return text.translate(_FOLD_TABLE)
+
+
+def _normalize_name(name: str) -> str:
+    # Các từ của tên cách nhau đúng một khoảng trắng; dấu câu (vd. "-") coi như khoảng trắng
+    return " ".join("".join(c if c.isalnum() else " " for c in name.lower()).split())
+
+
+@dataclass(frozen=True)
+class Place:
+    """Một địa danh trong gazetteer"""
+    name: str
+    kind: str # landmark | ward | street | district
+    latitude: float
+    longitude: float
+
+
+class Gazetteer:
+    """
+    Tra cứu địa danh offline (không gọi API geocoding): tên đường/phường/quận/địa điểm kèm tọa độ, nạp từ file TSV.
+
+    Tên được xếp vào một trie theo từng từ ở dạng bỏ dấu, nên `find()` quét nội dung một lượt (mỗi từ một lần tra dict)
+    và nhận cả văn bản gõ không dấu ("lang ha"). Khi văn bản có dấu, dấu phải khớp đúng ("Lăng" không khớp "Láng").
+    Dấu câu giữa các từ được bỏ qua ("Láng Hạ - Thái Hà" khớp "láng hạ thái hà").
+    `resolve()` dùng cho chuỗi địa điểm ngắn do người dùng nhập, kết quả được giữ trong cache LRU.
+    """
+
+    def __init__(self, places: List[Tuple[Place, List[str]]] = (), cache_size: int = None):
+        self._trie: dict = {}
+        self.size = 0
+        for place, aliases in places:
+            self.add(place, aliases)
+        self.resolve = lru_cache(maxsize=cache_size or Config.GAZETTEER_CACHE_SIZE)(self.find)
+
+    @classmethod
+    def load(cls, path: str = None, cache_size: int = None) -> "Gazetteer":
+        """Nạp từ file TSV (tên, loại, vĩ độ, kinh độ, tên khác phân tách bằng |). Lỗi thì trả gazetteer rỗng"""
+        path = path or Config.GAZETTEER_PATH
+        places = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.rstrip("\n")
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    fields = line.split("\t")
+                    try:
+                        name, kind, lat, lon = fields[:4]
+                        place = Place(name, kind, float(lat), float(lon))
+                    except ValueError:
+                        logger.warning(f"Gazetteer {path}:{line_no}: malformed line skipped.")
+                        continue
+                    aliases = [alias for alias in fields[4].split("|") if alias] if len(fields) > 4 else []
+                    places.append((place, aliases))
+        except OSError as e:
+            logger.error(f"Could not load gazetteer {path}: {e}. Text locations will not be resolved.")
+        gazetteer = cls(places, cache_size=cache_size)
+        logger.info(f"Loaded {gazetteer.size} place names from {path}.")
+        return gazetteer
+
+    def add(self, place: Place, aliases: List[str] = ()):
+        if place.kind not in KIND_PRECISION:
+            raise ValueError(f"Unknown place kind: {place.kind!r}")
+        for name in (place.name, *aliases):
+            exact = _normalize_name(name)
+            node = self._trie
+            for word in fold_text(exact).split():
+                node = node.setdefault(word, {})
+            # Nhiều địa danh có thể cùng tên bỏ dấu (vd. đường và quận Cầu Giấy): giữ tất cả kèm tên có dấu
+            node.setdefault(_END, []).append((exact, place))
+            self.size += 1
+
+    def find(self, text: str) -> Optional[Place]:
+        """Địa danh cụ thể nhất được nhắc trong văn bản (ưu tiên theo KIND_PRECISION rồi tên dài hơn), hoặc None"""
+        best = None
+        for start, end, place in self.find_all(text):
+            key = (KIND_PRECISION[place.kind], -(end - start), start)
+            if best is None or key < best[0]:
+                best = (key, place)
+        return best[1] if best else None
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Place]]:
+        """Mọi địa danh trong văn bản: (vị trí bắt đầu, vị trí kết thúc, Place), khớp dài nhất, không chồng nhau"""
+        folded = fold_text(text)
+        words = folded.split()
+        spans = []
+        position = 0
+        for word in words:
+            position = folded.find(word, position)
+            spans.append((position, position + len(word)))
+            position += len(word)
+        root = self._trie
+        matches = []
+        k = 0
+        while k < len(words):
+            node = root.get(words[k])
+            terminals = []
+            m = k
+            while node is not None:
+                m += 1
+                if _END in node:
+                    terminals.append((m, node[_END]))
+                node = node.get(words[m]) if m < len(words) else None
+            # Thử tên dài nhất trước; nếu sai dấu thì lùi về tên ngắn hơn cùng tiền tố
+            for m, candidates in reversed(terminals):
+                start, end = spans[k][0], spans[m - 1][1]
+                place = self._pick(text, folded, start, end, candidates)
+                if place is not None:
+                    matches.append((start, end, place))
+                    k = m
+                    break
+            else:
+                k += 1
+        return matches
+
+    def _pick(self, text: str, folded: str, start: int, end: int, candidates: list) -> Optional[Place]:
+        span = _normalize_name(text[start:end])
+        if not span.isascii():
+            # Văn bản có dấu: chỉ nhận tên có cùng dấu
+            candidates = [c for c in candidates if c[0] == span]
+        if not candidates:
+            return None
+        if len(candidates) > 1:
+            # Từ đứng trước ("quận", "phường", "đường"...) chọn loại địa danh khi trùng tên
+            words = folded[max(0, start - 8):start].split()
+            hinted = KIND_HINTS.get(words[-1]) if words else None
+            for _, place in candidates:
+                if place.kind == hinted:
+                    return place
+            return min(candidates, key=lambda c: KIND_PRECISION[c[1].kind])[1]
+        return candidates[0][1]
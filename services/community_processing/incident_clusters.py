@@ -0,0 +1,277 @@
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from utils.vector_utils import EMBEDDING_DTYPE, normalize_embedding
+from services.community_processing.embedding_index import TopicEmbeddingStore
+from services.community_processing.spatial_index import SpatialGridIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Incident:
+    """Một sự cố: cụm các báo cáo cùng topic, gần nhau về vị trí và nội dung"""
+    id: str
+    topic: str
+    embedding_sum: np.ndarray # Tổng các embedding đã chuẩn hóa của báo cáo; tâm cụm = tổng chuẩn hóa lại
+    latitude: float # Trung bình vị trí các báo cáo
+    longitude: float
+    report_count: int # Số báo cáo đã gộp vào, kể cả báo cáo trùng không được lưu riêng
+    first_seen: float
+    last_seen: float
+    report_ids: List[str] = field(default_factory=list) # Các báo cáo được lưu trong Redis thuộc sự cố này
+
+    @property
+    def centroid(self) -> np.ndarray:
+        return normalize_embedding(self.embedding_sum)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dạng dict cho Redis/API (không gồm embedding)"""
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "report_count": self.report_count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+
+
+@dataclass
+class IncidentUpdate:
+    """Kết quả khi gộp một báo cáo vào cụm, đủ để ghi thay đổi xuống Redis"""
+    incident: Incident # Sự cố chứa báo cáo (sự cố còn lại nếu vừa gộp hai sự cố)
+    created: bool
+    previous_location: Optional[Tuple[float, float]] = None # Vị trí trước khi tâm cụm dịch chuyển
+    merged: List[Incident] = field(default_factory=list) # Các sự cố đã bị gộp vào `incident`
+
+
+@dataclass
+class IncidentRemoval:
+    """Kết quả khi gỡ các báo cáo đã bị xóa khỏi sự cố, đủ để cập nhật Redis"""
+    updated: List[Incident] = field(default_factory=list) # Sự cố còn báo cáo, số báo cáo đã giảm
+    removed: List[Incident] = field(default_factory=list) # Sự cố không còn báo cáo nào, đã bị xóa
+    unknown_reports: List[str] = field(default_factory=list) # Báo cáo không có trong bộ nhớ (vd. khởi động lại không có snapshot)
+
+
+class IncidentClusterer:
+    """
+    Gom cụm báo cáo thành sự cố theo từng báo cáo đến (incremental), không cần chạy lại thuật toán gom cụm.
+
+    Báo cáo mới được so với tâm cụm của các sự cố cùng topic gần đó (lưới không gian + kho embedding của tâm cụm):
+    giống hơn `attach_threshold` thì gộp vào sự cố giống nhất, nếu không thì tạo sự cố mới.
+    Khi gộp, tâm embedding và vị trí được cập nhật theo trung bình chạy; nếu tâm cụm dịch lại gần một sự cố khác
+    (giống hơn `merge_threshold`, trong `merge_radius_deg`) thì hai sự cố được gộp làm một.
+    Sự cố hết hạn sau `ttl_seconds` kể từ báo cáo gần nhất. Kiểm tra trùng lặp vì vậy chỉ so với một tâm cụm
+    cho mỗi sự cố thay vì với từng báo cáo.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, search_radius_deg: float = None,
+                 attach_threshold: float = None, merge_threshold: float = None, merge_radius_deg: float = None):
+        self.ttl_seconds = Config.INCIDENT_EXPIRE_SECONDS if ttl_seconds is None else ttl_seconds
+        self.search_radius_deg = search_radius_deg or Config.DUPLICATE_SEARCH_RADIUS_DEG
+        self.attach_threshold = attach_threshold or Config.COSINE_SIMILARITY_THRESHOLD_REFERENCE
+        self.merge_threshold = merge_threshold or Config.INCIDENT_MERGE_SIMILARITY
+        self.merge_radius_deg = merge_radius_deg or Config.INCIDENT_MERGE_RADIUS_DEG
+        self._incidents: Dict[str, Incident] = {}
+        self._incident_of: Dict[str, str] = {} # report_id -> incident_id
+        self._spatial = SpatialGridIndex(ttl_seconds=self.ttl_seconds)
+        self._centroids = TopicEmbeddingStore(ttl_seconds=self.ttl_seconds)
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+    def __contains__(self, incident_id: str) -> bool:
+        return incident_id in self._incidents
+
+    def get(self, incident_id: str) -> Optional[Incident]:
+        return self._incidents.get(incident_id)
+
+    def incident_of(self, report_id: str) -> Optional[str]:
+        return self._incident_of.get(report_id)
+
+    def match(self, embedding: np.ndarray, topic: str, lat: float, lon: float) -> Tuple[Optional[str], float]:
+        """Sự cố cùng topic gần đó có tâm cụm giống báo cáo nhất: (incident_id, cosine similarity), hoặc (None, 0.0)"""
+        self.expire()
+        matches = self._nearest(normalize_embedding(embedding), topic, lat, lon, self.search_radius_deg, k=1)
+        if matches and matches[0][1] >= self.attach_threshold:
+            return matches[0]
+        return None, 0.0
+
+    def create(self, topic: str, embedding: np.ndarray, lat: float, lon: float, report_id: str = None,
+               now: float = None) -> IncidentUpdate:
+        now = time.time() if now is None else now
+        incident = Incident(id=str(uuid.uuid4()), topic=topic, embedding_sum=normalize_embedding(embedding).copy(),
+                            latitude=lat, longitude=lon, report_count=1, first_seen=now, last_seen=now)
+        if report_id is not None:
+            incident.report_ids.append(report_id)
+            self._incident_of[report_id] = incident.id
+        self._incidents[incident.id] = incident
+        self._index(incident)
+        return IncidentUpdate(incident, created=True)
+
+    def attach(self, incident_id: str, embedding: np.ndarray, lat: float, lon: float, report_id: str = None,
+               now: float = None) -> IncidentUpdate:
+        """Gộp một báo cáo vào sự cố đã có (`report_id` là None với báo cáo trùng không được lưu riêng)"""
+        incident = self._incidents.get(incident_id)
+        if incident is None:
+            raise KeyError(f"Incident {incident_id} not found")
+        previous_location = (incident.latitude, incident.longitude)
+        n = incident.report_count
+        incident.embedding_sum += normalize_embedding(embedding)
+        incident.latitude = (incident.latitude * n + lat) / (n + 1)
+        incident.longitude = (incident.longitude * n + lon) / (n + 1)
+        incident.report_count = n + 1
+        incident.last_seen = max(incident.last_seen, time.time() if now is None else now)
+        if report_id is not None:
+            incident.report_ids.append(report_id)
+            self._incident_of[report_id] = incident.id
+        self._index(incident)
+
+        update = IncidentUpdate(incident, created=False, previous_location=previous_location)
+        # Tâm cụm vừa dịch chuyển: gộp với sự cố gần đó nếu giờ hai sự cố gần như trùng nhau
+        centroid = incident.centroid
+        for other_id, similarity in self._nearest(centroid, incident.topic, incident.latitude, incident.longitude,
+                                                  self.merge_radius_deg, k=2):
+            if other_id != incident.id and similarity >= self.merge_threshold:
+                update = self._merge(update, self._incidents[other_id])
+                break
+        return update
+
+    def remove_reports(self, report_ids: Iterable[str]) -> IncidentRemoval:
+        """
+        Gỡ các báo cáo đã bị xóa khỏi sự cố của chúng. Sự cố không còn báo cáo nào được lưu thì bị xóa theo.
+        Tâm cụm giữ nguyên (không lưu embedding từng báo cáo). Trả về các sự cố đã đổi số báo cáo và các sự cố bị xóa.
+        """
+        updated: Dict[str, Incident] = {}
+        removed, unknown = [], []
+        for report_id in report_ids:
+            incident = self._incidents.get(self._incident_of.pop(report_id, None))
+            if incident is None:
+                unknown.append(report_id)
+                continue
+            incident.report_ids.remove(report_id)
+            incident.report_count = max(0, incident.report_count - 1)
+            if incident.report_ids:
+                updated[incident.id] = incident
+            else:
+                updated.pop(incident.id, None)
+                self._drop(incident.id)
+                removed.append(incident)
+        return IncidentRemoval(updated=list(updated.values()), removed=removed, unknown_reports=unknown)
+
+    def expire(self, now: float = None) -> List[str]:
+        """Xóa các sự cố không có báo cáo mới trong `ttl_seconds`, trả về danh sách id bị xóa"""
+        expired = set(self._spatial.expire(now)) | set(self._centroids.expire(now))
+        for incident_id in expired:
+            self._drop(incident_id)
+        return list(expired)
+
+    def _nearest(self, centroid: np.ndarray, topic: str, lat: float, lon: float, radius_deg: float,
+                 k: int) -> List[Tuple[str, float]]:
+        nearby_ids = [incident_id for incident_id, incident_topic in self._spatial.query(lat, lon, radius_deg)
+                      if incident_topic == topic]
+        if not nearby_ids:
+            return []
+        return self._centroids.search(topic, centroid, k=k, candidate_ids=nearby_ids, normalized=True)
+
+    def _merge(self, update: IncidentUpdate, other: Incident) -> IncidentUpdate:
+        """Gộp hai sự cố: sự cố nhiều báo cáo hơn được giữ lại"""
+        keep, absorbed = update.incident, other
+        previous_location = update.previous_location
+        if absorbed.report_count > keep.report_count:
+            keep, absorbed = absorbed, keep
+            previous_location = (keep.latitude, keep.longitude)
+        total = keep.report_count + absorbed.report_count
+        keep.embedding_sum += absorbed.embedding_sum
+        keep.latitude = (keep.latitude * keep.report_count + absorbed.latitude * absorbed.report_count) / total
+        keep.longitude = (keep.longitude * keep.report_count + absorbed.longitude * absorbed.report_count) / total
+        keep.report_count = total
+        keep.first_seen = min(keep.first_seen, absorbed.first_seen)
+        keep.last_seen = max(keep.last_seen, absorbed.last_seen)
+        keep.report_ids.extend(absorbed.report_ids)
+        for report_id in absorbed.report_ids:
+            self._incident_of[report_id] = keep.id
+        self._drop(absorbed.id, keep_reports=True)
+        self._index(keep)
+        logger.info("Incident %s merged into %s (%d reports).", absorbed.id, keep.id, keep.report_count)
+        return IncidentUpdate(keep, created=False, previous_location=previous_location,
+                              merged=update.merged + [absorbed])
+
+    def _index(self, incident: Incident):
+        # Hạn dùng tính từ báo cáo gần nhất; hai chỉ mục dùng cùng mốc nên hết hạn cùng lúc
+        self._spatial.insert(incident.id, incident.latitude, incident.longitude, incident.topic, now=incident.last_seen)
+        self._centroids.add(incident.id, incident.topic, incident.centroid, incident.latitude, incident.longitude,
+                            now=incident.last_seen, normalized=True)
+
+    def _drop(self, incident_id: str, keep_reports: bool = False):
+        incident = self._incidents.pop(incident_id, None)
+        if incident is None:
+            return
+        self._spatial.remove(incident_id)
+        self._centroids.remove(incident_id)
+        if not keep_reports:
+            for report_id in incident.report_ids:
+                self._incident_of.pop(report_id, None)
+
+    def save_snapshot(self, path: str = None):
+        """Ghi snapshot các sự cố ra đĩa (ghi file tạm rồi đổi tên để không để lại file hỏng)"""
+        write_snapshot(path or Config.INCIDENT_SNAPSHOT_PATH, self.snapshot_arrays())
+
+    def snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Bản sao trạng thái dạng mảng numpy cho snapshot. Tách khỏi bước ghi file để caller async
+        có thể sao chép trên event loop rồi ghi đĩa trong worker thread.
+        """
+        incidents = list(self._incidents.values())
+        dim = len(incidents[0].embedding_sum) if incidents else 0
+        return {
+            "ids": np.array([incident.id for incident in incidents], dtype=str),
+            "topics": np.array([incident.topic for incident in incidents], dtype=str),
+            "sums": np.array([incident.embedding_sum for incident in incidents], dtype=EMBEDDING_DTYPE).reshape(-1, dim),
+            "geo": np.array([(incident.latitude, incident.longitude) for incident in incidents], dtype=np.float64).reshape(-1, 2),
+            "counts": np.array([incident.report_count for incident in incidents], dtype=np.int64),
+            "times": np.array([(incident.first_seen, incident.last_seen) for incident in incidents], dtype=np.float64).reshape(-1, 2),
+            "reports": np.array([",".join(incident.report_ids) for incident in incidents], dtype=str),
+        }
+
+    @classmethod
+    def load_snapshot(cls, path: str = None, **kwargs) -> "IncidentClusterer":
+        """Nạp snapshot, bỏ qua các sự cố đã hết hạn"""
+        path = path or Config.INCIDENT_SNAPSHOT_PATH
+        clusterer = cls(**kwargs)
+        now = time.time()
+        with np.load(path, allow_pickle=False) as data:
+            rows = zip(data["ids"].tolist(), data["topics"].tolist(), data["sums"], data["geo"].tolist(),
+                       data["counts"].tolist(), data["times"].tolist(), data["reports"].tolist())
+            for incident_id, topic, embedding_sum, (lat, lon), count, (first_seen, last_seen), reports in rows:
+                if clusterer.ttl_seconds and last_seen + clusterer.ttl_seconds <= now:
+                    continue
+                incident = Incident(incident_id, topic, embedding_sum.copy(), lat, lon, count, first_seen, last_seen,
+                                    reports.split(",") if reports else [])
+                clusterer._incidents[incident_id] = incident
+                for report_id in incident.report_ids:
+                    clusterer._incident_of[report_id] = incident_id
+                clusterer._index(incident)
+        logger.info(f"Incident clusters: loaded {len(clusterer)} incidents from {path}.")
+        return clusterer
+
+
+def write_snapshot(path: str, arrays: Dict[str, np.ndarray]):
+    """Ghi mảng của snapshot_arrays() ra file tạm rồi đổi tên (không để lại file hỏng nếu bị ngắt giữa chừng)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    logger.info(f"Incident clusters: saved {len(arrays['ids'])} incidents to {path}.")
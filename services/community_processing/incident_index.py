@@ -0,0 +1,155 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from utils.redis_utils import AsyncRedisClient
+from services.community_processing.incident_clusters import Incident, IncidentUpdate
+from services.community_processing.spatial_index import SpatialGridIndex
+
+_MAX_MERGE_HOPS = 8
+
+
+class IncidentIndex:
+    """
+    Sự cố trong Redis cho các truy vấn bản đồ: mỗi sự cố là một mục thay vì hàng trăm báo cáo gần giống nhau.
+
+    - incident:{id}: hash thông tin sự cố (topic, vị trí tâm, số báo cáo, thời điểm báo cáo đầu/cuối)
+    - incident_index:geo:{cell}: sorted set các sự cố có tâm trong cell, score = thời điểm báo cáo gần nhất
+
+    Key hết hạn sau INCIDENT_EXPIRE_SECONDS không có báo cáo mới, cùng lúc với sự cố trong IncidentClusterer.
+    Sự cố bị gộp giữ lại hash với trường merged_into trỏ tới sự cố còn lại.
+    Hàm ghi nhận pipeline của caller để gộp vào cùng round trip với lệnh ghi báo cáo.
+    """
+
+    PREFIX = "incident_index"
+
+    def __init__(self, redis_client: AsyncRedisClient = None):
+        self.redis = redis_client or AsyncRedisClient()
+        self._grid = SpatialGridIndex(cell_size_deg=Config.INCIDENT_INDEX_CELL_SIZE_DEG)
+
+    def save(self, pipe, update: IncidentUpdate):
+        incident = update.incident
+        ttl = Config.INCIDENT_EXPIRE_SECONDS
+        key = self._incident_key(incident.id)
+        pipe.hset(key, mapping={k: str(v) for k, v in incident.to_dict().items()})
+        pipe.expire(key, ttl)
+
+        cell = self._grid.cell_id(incident.latitude, incident.longitude)
+        if update.previous_location is not None:
+            # Tâm cụm dịch sang cell khác: gỡ khỏi cell cũ
+            previous_cell = self._grid.cell_id(*update.previous_location)
+            if previous_cell != cell:
+                pipe.zrem(self._geo_key(previous_cell), incident.id)
+        geo_key = self._geo_key(cell)
+        pipe.zadd(geo_key, {incident.id: incident.last_seen})
+        pipe.zremrangebyscore(geo_key, "-inf", time.time() - ttl) # Dọn các sự cố đã hết hạn trong cell
+        pipe.expire(geo_key, ttl)
+
+        for absorbed in update.merged:
+            pipe.zrem(self._geo_key(self._grid.cell_id(absorbed.latitude, absorbed.longitude)), absorbed.id)
+            pipe.hset(self._incident_key(absorbed.id), "merged_into", incident.id)
+
+    def remove(self, pipe, incident: Incident):
+        """Xóa sự cố không còn báo cáo nào (hash và mục trong cell chứa tâm cụm)"""
+        pipe.delete(self._incident_key(incident.id))
+        pipe.zrem(self._geo_key(self._grid.cell_id(incident.latitude, incident.longitude)), incident.id)
+
+    async def remove_reports(self, pipe, counts: Dict[str, int]):
+        """
+        Trừ số báo cáo của các sự cố ngay trên Redis ({incident_id: số báo cáo bị xóa}), xóa sự cố về 0 báo cáo.
+        Dùng cho báo cáo mà IncidentClusterer trong bộ nhớ không biết (worker khởi động lại không có snapshot,
+        sự cố do worker khác tạo); đọc trước rồi ghi vào pipeline của caller.
+        """
+        redis_conn = await self.redis.get_client()
+        remaining: Dict[str, Tuple[int, float, float]] = {} # id -> (số báo cáo còn lại, vĩ độ, kinh độ)
+        for _ in range(_MAX_MERGE_HOPS):
+            if not counts:
+                break
+            read = redis_conn.pipeline(transaction=False)
+            for incident_id in counts:
+                read.hmget(self._incident_key(incident_id), ["merged_into", "report_count", "latitude", "longitude"])
+            merged: Dict[str, int] = {}
+            for (incident_id, count), (merged_into, report_count, lat, lon) in zip(counts.items(), await read.execute()):
+                if merged_into:
+                    # Sự cố đã bị gộp: báo cáo được tính ở sự cố còn lại
+                    merged[merged_into] = merged.get(merged_into, 0) + count
+                elif report_count is not None:
+                    remaining[incident_id] = (int(report_count) - count, float(lat), float(lon))
+            counts = merged
+
+        for incident_id, (report_count, lat, lon) in remaining.items():
+            if report_count > 0:
+                pipe.hset(self._incident_key(incident_id), "report_count", report_count)
+            else:
+                pipe.delete(self._incident_key(incident_id))
+                pipe.zrem(self._geo_key(self._grid.cell_id(lat, lon)), incident_id)
+
+    async def get(self, incident_id: str) -> Optional[Dict[str, Any]]:
+        """Thông tin một sự cố (theo merged_into nếu sự cố đã bị gộp), hoặc None nếu không có/đã hết hạn"""
+        redis_conn = await self.redis.get_client()
+        for _ in range(_MAX_MERGE_HOPS):
+            row = await redis_conn.hgetall(self._incident_key(incident_id))
+            if not row:
+                return None
+            if "merged_into" not in row:
+                return self._decode(row)
+            incident_id = row["merged_into"]
+        return None
+
+    async def query_area(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                         topics: Optional[Iterable[str]] = None, since: float = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Sự cố trong khung nhìn bản đồ có báo cáo từ `since` (mặc định: mọi sự cố còn hiệu lực),
+        nhiều báo cáo nhất trước, có thể lọc theo topic.
+        """
+        limit = max(1, min(limit, Config.REPORT_INDEX_MAX_PAGE_SIZE))
+        since = time.time() - Config.INCIDENT_EXPIRE_SECONDS if since is None else since
+        cells = self._grid.cells_in_box(min_lat, min_lon, max_lat, max_lon)
+        if len(cells) > Config.REPORT_INDEX_MAX_QUERY_KEYS:
+            raise ValueError(f"Query spans {len(cells)} index keys (max {Config.REPORT_INDEX_MAX_QUERY_KEYS}); narrow the area")
+
+        redis_conn = await self.redis.get_client()
+        pipe = redis_conn.pipeline(transaction=False)
+        for i, j in cells:
+            pipe.zrevrangebyscore(self._geo_key(f"{i}:{j}"), "+inf", since)
+        # Một sự cố có thể còn sót ở cell cũ khi tâm cụm vừa dịch chuyển: bỏ trùng
+        incident_ids = list(dict.fromkeys(incident_id for members in await pipe.execute() for incident_id in members))
+        if not incident_ids:
+            return []
+
+        pipe = redis_conn.pipeline(transaction=False)
+        for incident_id in incident_ids:
+            pipe.hgetall(self._incident_key(incident_id))
+        rows = await pipe.execute()
+
+        topics = set(topics) if topics is not None else None
+        incidents = []
+        for row in rows:
+            # Bỏ qua sự cố đã hết hạn/đã bị gộp mà chỉ mục chưa kịp dọn
+            if not row or "merged_into" in row:
+                continue
+            incident = self._decode(row)
+            if ((topics is None or incident["topic"] in topics)
+                    and min_lat <= incident["latitude"] <= max_lat and min_lon <= incident["longitude"] <= max_lon):
+                incidents.append(incident)
+        incidents.sort(key=lambda incident: (-incident["report_count"], -incident["last_seen"]))
+        return incidents[:limit]
+
+    @staticmethod
+    def _decode(row: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "topic": row["topic"],
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+            "report_count": int(row["report_count"]),
+            "first_seen": float(row["first_seen"]),
+            "last_seen": float(row["last_seen"]),
+        }
+
+    @staticmethod
+    def _incident_key(incident_id: str) -> str:
+        return f"incident:{incident_id}"
+
+    def _geo_key(self, cell: str) -> str:
+        return f"{self.PREFIX}:geo:{cell}"
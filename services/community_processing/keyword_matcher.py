@@ -0,0 +1,152 @@
+import logging
+import re
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse # Python 3.11+
+except ImportError: # pragma: no cover
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+# Giới hạn số ký tự khi mở rộng một khoảng [a-z] thành tập ký tự đầu
+_MAX_RANGE_EXPANSION = 256
+
+
+class KeywordMatcher:
+    """
+    Gộp mọi danh sách từ khóa (chuỗi thường) và mẫu regex thành một regex duy nhất,
+    quét nội dung một lần và trả về từ khóa khớp đầu tiên cùng nhóm (category) của nó.
+
+    - Từ khóa thường được xếp thành trie rồi sinh regex (tiền tố chung chỉ so một lần),
+      khớp như phép `in` (chuỗi con) của cách cũ.
+    - Mẫu regex chỉ khớp trọn từ để tránh bắt nhầm (vd. l[oồ]n trong "long biên").
+    - Toàn bộ được đặt sau một lookahead tập ký tự đầu, nên vị trí không thể bắt đầu từ khóa nào bị bỏ qua ngay.
+
+    Nội dung phải được chuyển về chữ thường trước khi gọi search().
+    Bản biên dịch được thay thế nguyên khối khi reload nên an toàn khi dùng đồng thời.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]] = None, patterns: Dict[str, Iterable[str]] = None):
+        self._compiled = self._compile(keywords or {}, patterns or {})
+
+    def reload(self, keywords: Dict[str, Iterable[str]] = None, patterns: Dict[str, Iterable[str]] = None):
+        # Biên dịch xong mới gán, luồng khác vẫn dùng bản cũ trong lúc biên dịch
+        self._compiled = self._compile(keywords or {}, patterns or {})
+
+    @classmethod
+    def _compile(cls, keywords: Dict[str, Iterable[str]], patterns: Dict[str, Iterable[str]]):
+        keyword_categories: Dict[str, str] = {}
+        for category, words in keywords.items():
+            for word in words:
+                if word:
+                    keyword_categories.setdefault(word.lower(), category)
+
+        alternatives = []
+        first_chars: Optional[Set[str]] = set()
+        if keyword_categories:
+            alternatives.append(f"(?P<kw>{_trie_regex(keyword_categories)})")
+            first_chars.update(word[0] for word in keyword_categories)
+
+        pattern_groups: Dict[str, Tuple[str, str]] = {} # tên group -> (mẫu, category)
+        pattern_alternatives = []
+        for category, category_patterns in patterns.items():
+            for pattern in category_patterns:
+                name = f"p{len(pattern_groups)}"
+                pattern_alternatives.append(f"(?P<{name}>{pattern})")
+                pattern_groups[name] = (pattern, category)
+                chars = _pattern_first_chars(pattern)
+                if chars is None or first_chars is None:
+                    first_chars = None
+                else:
+                    first_chars.update(chars)
+        if pattern_alternatives:
+            alternatives.append(f"(?<!\\w)(?:{'|'.join(pattern_alternatives)})(?!\\w)")
+
+        if not alternatives:
+            return None, keyword_categories, pattern_groups
+        regex = "|".join(alternatives)
+        if first_chars:
+            regex = f"(?=[{''.join(re.escape(c) for c in sorted(first_chars))}])(?:{regex})"
+        return re.compile(regex), keyword_categories, pattern_groups
+
+    def search(self, text: str) -> Optional[Tuple[str, str]]:
+        """Trả về (đoạn văn bản khớp, category) của lần khớp đầu tiên, hoặc None"""
+        regex, keyword_categories, pattern_groups = self._compiled
+        if regex is None:
+            return None
+        match = regex.search(text)
+        if match is None:
+            return None
+        matched = match.group(match.lastgroup)
+        if match.lastgroup == "kw":
+            return matched, keyword_categories[matched]
+        # Mã nguồn regex chỉ ghi log, không đưa vào lý do trả cho người dùng
+        pattern, category = pattern_groups[match.lastgroup]
+        logger.debug(f"Keyword pattern {pattern!r} ({category}) matched {matched!r}")
+        return matched, category
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """Sinh regex dạng trie từ danh sách từ, vd. ['con mẹ', 'con chó'] -> 'con\\ (?:chó|mẹ)'"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        is_terminal = "" in node
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_terminal:
+            return branches[0]
+        group = f"(?:{'|'.join(branches)})"
+        # Tham lam: ưu tiên từ dài hơn, lùi về từ ngắn nếu không khớp
+        return f"{group}?" if is_terminal else group
+
+    return build(trie)
+
+
+def _pattern_first_chars(pattern: str) -> Optional[Set[str]]:
+    """Tập ký tự có thể đứng đầu một lần khớp của `pattern`; None nếu không xác định được"""
+    try:
+        return _first_chars(list(sre_parse.parse(pattern)))
+    except Exception:
+        return None
+
+
+def _first_chars(items) -> Optional[Set[str]]:
+    for op, av in items:
+        name = str(op)
+        if name == "AT": # \b, ^ ... không tiêu thụ ký tự
+            continue
+        if name == "LITERAL":
+            return {chr(av)}
+        if name == "IN":
+            chars = set()
+            for item_op, item_av in av:
+                item_name = str(item_op)
+                if item_name == "LITERAL":
+                    chars.add(chr(item_av))
+                elif item_name == "RANGE" and item_av[1] - item_av[0] < _MAX_RANGE_EXPANSION:
+                    chars.update(chr(c) for c in range(item_av[0], item_av[1] + 1))
+                else: # NEGATE, CATEGORY (\d, \w), khoảng quá lớn
+                    return None
+            return chars
+        if name == "SUBPATTERN":
+            return _first_chars(list(av[-1]))
+        if name == "BRANCH":
+            chars = set()
+            for branch in av[1]:
+                branch_chars = _first_chars(list(branch))
+                if branch_chars is None:
+                    return None
+                chars.update(branch_chars)
+            return chars
+        if name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") and av[0] > 0:
+            return _first_chars(list(av[2]))
+        return None
+    return None
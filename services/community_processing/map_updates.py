@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from config import Config
+from utils.metrics import metrics
+from utils.redis_utils import AsyncRedisClient
+from services.community_processing.spatial_index import SpatialGridIndex
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "map_updates"
+
+MAP_UPDATES = metrics.counter("map_updates_total", "Cập nhật bản đồ: published = mục đã gửi, coalesced = gộp vào mục đang chờ",
+                              ["result"])
+MAP_UPDATE_MESSAGES = metrics.counter("map_update_messages_total", "Số message PUBLISH cập nhật bản đồ đã gửi")
+
+# Nhận (loại, id, trạng thái sau cập nhật hoặc None nếu mục bị xóa, delta vừa nhận)
+UpdateCallback = Callable[[str, str, Optional[Dict[str, Any]], Dict[str, Any]], None]
+
+
+def map_update_channel(cell: str) -> str:
+    return f"{CHANNEL_PREFIX}:{cell}"
+
+
+class MapUpdatePublisher:
+    """
+    Đẩy cập nhật báo cáo/sự cố cho client bản đồ qua Redis pub/sub, mỗi cell địa lý một kênh (map_updates:{cell}).
+
+    Cập nhật được giữ lại và gửi theo chu kỳ `interval_seconds`: các cập nhật của cùng một mục trong một chu kỳ
+    được gộp (giá trị mới nhất của mỗi trường), nên một báo cáo nhận hàng nghìn vote mỗi giây vẫn chỉ sinh
+    tối đa một cập nhật mỗi chu kỳ. Mỗi cập nhật chỉ chứa các trường thay đổi (delta), không phải toàn bộ hash;
+    các mục cùng cell được gửi chung một message, mọi message của một chu kỳ đi trong một pipeline.
+    Khi một mục (tâm sự cố) dịch sang cell khác, cell cũ nhận delta gỡ mục ({"moved_to": cell mới}) và cell mới
+    nhận toàn bộ trường của mục, vì subscriber của cell mới chưa có trạng thái của nó.
+    Cập nhật là tức thời, không lưu lại: client mới hoặc bị mất kết nối nạp lại trạng thái bằng truy vấn khu vực.
+    """
+
+    def __init__(self, redis_client: AsyncRedisClient = None, interval_seconds: float = None, cell_size_deg: float = None):
+        self.redis = redis_client or AsyncRedisClient()
+        self.interval_seconds = Config.MAP_UPDATES_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self._grid = SpatialGridIndex(cell_size_deg=cell_size_deg or Config.MAP_UPDATES_CELL_SIZE_DEG)
+        self._pending: Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]] = {} # (loại, id) -> (cell, delta)
+        self._moved_from: Dict[Tuple[str, str], Set[str]] = {} # (loại, id) -> các cell cũ cần gỡ mục trong chu kỳ này
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def channel_for(self, lat: float, lon: float) -> str:
+        return map_update_channel(self._grid.cell_id(lat, lon))
+
+    def publish(self, kind: str, item_id: str, lat: float, lon: float, fields: Dict[str, Any],
+                previous_location: Optional[Tuple[float, float]] = None, full_fields: Optional[Dict[str, Any]] = None):
+        """
+        Xếp một delta (vd. kind="report", fields={"votes_up": 12}) vào chu kỳ gửi tiếp theo.
+        `previous_location`: vị trí trước cập nhật của mục có thể di chuyển (tâm sự cố); nếu nó thuộc cell khác,
+        mục được gỡ khỏi cell cũ và cell mới nhận `full_fields` (toàn bộ trường của mục) cùng delta.
+        """
+        key = (kind, item_id)
+        cell = self._grid.cell_id(lat, lon)
+        if previous_location is not None:
+            previous_cell = self._grid.cell_id(*previous_location)
+            if previous_cell != cell:
+                self._moved_from.setdefault(key, set()).add(previous_cell)
+                fields = {**(full_fields or {}), **fields}
+        entry = self._pending.get(key)
+        if entry is None:
+            self._pending[key] = (cell, dict(fields))
+        else:
+            entry[1].update(fields)
+            self._pending[key] = (cell, entry[1])
+            MAP_UPDATES.inc("coalesced")
+        if len(self._pending) >= Config.MAP_UPDATES_MAX_PENDING:
+            self._schedule_flush()
+
+    async def flush(self) -> int:
+        """Gửi mọi delta đang chờ, mỗi cell một message. Trả về số message đã gửi"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        moved_from, self._moved_from = self._moved_from, {}
+        by_cell: Dict[str, list] = {}
+        for (kind, item_id), (cell, fields) in pending.items():
+            by_cell.setdefault(cell, []).append({"type": kind, "id": item_id, **fields})
+        for (kind, item_id), previous_cells in moved_from.items():
+            # Mục có thể dịch nhiều lần trong chu kỳ (hoặc quay lại cell cũ): chỉ gỡ khỏi các cell nó đã rời
+            cell = pending[(kind, item_id)][0]
+            for previous_cell in previous_cells - {cell}:
+                by_cell.setdefault(previous_cell, []).append({"type": kind, "id": item_id, "moved_to": cell})
+
+        now = round(time.time(), 3)
+        try:
+            redis_conn = await self.redis.get_client()
+            pipe = redis_conn.pipeline(transaction=False)
+            for cell, updates in by_cell.items():
+                payload = {"cell": cell, "ts": now, "updates": updates}
+                pipe.publish(map_update_channel(cell), json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+            await pipe.execute()
+        except Exception as e:
+            # Không gửi lại: client sẽ thấy trạng thái mới ở cập nhật sau hoặc khi truy vấn lại
+            logger.error(f"Map update publish of {len(pending)} updates failed: {e}.")
+            return 0
+        MAP_UPDATES.inc("published", amount=len(pending))
+        MAP_UPDATE_MESSAGES.inc(amount=len(by_cell))
+        return len(by_cell)
+
+    async def run_forever(self, interval_seconds: float = None):
+        interval = self.interval_seconds if interval_seconds is None else interval_seconds
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+    def _schedule_flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            pass # Không có event loop: để run_forever/flush() gửi sau
+
+
+class MapUpdateSubscriber:
+    """
+    Client tham chiếu phía nhận (vd. gateway WebSocket của một phiên bản đồ).
+
+    Đăng ký kênh của các cell phủ khung nhìn, áp từng delta vào trạng thái cục bộ `items` và gọi `on_update`.
+    Trạng thái ban đầu nạp bằng `load()` từ truy vấn khu vực (query_incidents_in_area / query_reports_in_area);
+    sau đó chỉ cần delta. Sự cố bị gộp (delta có merged_into) hoặc bị xóa (deleted) bị bỏ khỏi trạng thái, sự cố dịch ra khỏi
+    khung nhìn (delta có moved_to là cell không đăng ký) cũng vậy.
+    """
+
+    def __init__(self, redis_client: AsyncRedisClient = None, on_update: Optional[UpdateCallback] = None,
+                 cell_size_deg: float = None):
+        self.redis = redis_client or AsyncRedisClient()
+        self.on_update = on_update
+        self.items: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._grid = SpatialGridIndex(cell_size_deg=cell_size_deg or Config.MAP_UPDATES_CELL_SIZE_DEG)
+        self._channels: Set[str] = set()
+        self._pubsub = None
+
+    def load(self, kind: str, items: Iterable[Dict[str, Any]]):
+        for item in items:
+            self.items[(kind, item["id"])] = dict(item)
+
+    async def set_viewport(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+        """Đăng ký các cell của khung nhìn mới, hủy các cell không còn nằm trong khung nhìn"""
+        cells = self._grid.cells_in_box(min_lat, min_lon, max_lat, max_lon)
+        if len(cells) > Config.REPORT_INDEX_MAX_QUERY_KEYS:
+            raise ValueError(f"Viewport spans {len(cells)} cells (max {Config.REPORT_INDEX_MAX_QUERY_KEYS}); narrow the area")
+        channels = {map_update_channel(f"{i}:{j}") for i, j in cells}
+        if self._pubsub is None:
+            self._pubsub = (await self.redis.get_client()).pubsub(ignore_subscribe_messages=True)
+        removed, added = self._channels - channels, channels - self._channels
+        if removed:
+            await self._pubsub.unsubscribe(*removed)
+        if added:
+            await self._pubsub.subscribe(*added)
+        self._channels = channels
+
+    def apply(self, data) -> int:
+        """Áp một message (payload JSON) vào trạng thái, trả về số mục thay đổi"""
+        payload = json.loads(data)
+        changed = 0
+        for update in payload["updates"]:
+            delta = dict(update)
+            kind, item_id = delta.pop("type"), delta.pop("id")
+            key = (kind, item_id)
+            if "moved_to" in delta and map_update_channel(delta["moved_to"]) in self._channels:
+                # Mục chỉ chuyển sang cell khác vẫn trong khung nhìn: trạng thái đầy đủ đến từ kênh của cell mới
+                # (message của hai kênh có thể đến theo thứ tự bất kỳ)
+                continue
+            if "merged_into" in delta or "deleted" in delta or "moved_to" in delta:
+                self.items.pop(key, None)
+                state = None
+            else:
+                state = self.items.setdefault(key, {"id": item_id})
+                state.update(delta)
+            changed += 1
+            if self.on_update is not None:
+                self.on_update(kind, item_id, state, delta)
+        return changed
+
+    async def poll(self, timeout: float = 1.0) -> int:
+        """Chờ tối đa `timeout` giây một message và áp nó; trả về số mục thay đổi"""
+        if not self._channels:
+            await asyncio.sleep(timeout)
+            return 0
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return 0
+        try:
+            return self.apply(message["data"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Malformed map update on {message.get('channel')}: {e}")
+            return 0
+
+    async def run(self):
+        while True:
+            await self.poll()
+
+    async def close(self):
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._channels = set()
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import Config
+from utils.text_utils import NormalizedText
+
+logger = logging.getLogger(__name__)
+
+NLPResult = Tuple[np.ndarray, str, str] # (embedding, topic, urgency)
+
+
+class BatchCoalescer:
+    """
+    Gom các yêu cầu đến đồng thời trong vài mili giây (hoặc tới tối đa N yêu cầu) thành một lô,
+    chạy `batch_fn` cho cả lô trong executor, rồi trả kết quả về future của từng caller.
+    Nhiều lô có thể chạy cùng lúc nếu executor có nhiều worker.
+    Với ProcessPoolExecutor, `batch_fn` phải là hàm cấp module (pickle được).
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], executor: Executor,
+                 max_wait_ms: float, max_batch_size: int, name: str = "batch"):
+        self.batch_fn = batch_fn
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.name = name
+        self._executor = executor
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        # Giữ tham chiếu để task không bị thu gom khi đang chạy
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self.batch_fn, items)
+        except Exception as e:
+            logger.error(f"{self.name} batch of {len(batch)} items failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done(): # Caller có thể đã hủy
+                future.set_result(result)
+
+
+class NLPRequestCoalescer(BatchCoalescer):
+    """
+    Gom các báo cáo đến đồng thời thành lô, tính embedding + phân loại topic cho cả lô trong worker thread
+    (torch/NumPy nhả GIL nên các lô chạy song song được khi có nhiều thread). Event loop không bị chặn bởi model.
+    """
+
+    def __init__(self, processor, max_wait_ms: float = None, max_batch_size: int = None, executor: Executor = None):
+        super().__init__(
+            self._infer,
+            executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="nlp-batch"),
+            Config.NLP_COALESCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms,
+            max_batch_size or Config.NLP_COALESCE_MAX_BATCH_SIZE,
+            name="NLP"
+        )
+        self.processor = processor
+
+    async def warm_up(self):
+        """Nạp model trong executor của bộ gom lô (nơi sẽ chạy các lô sau này)"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.processor.warm_up)
+
+    async def submit(self, text: str | NormalizedText) -> NLPResult:
+        return await super().submit(text)
+
+    def _infer(self, texts: List[str | NormalizedText]) -> List[NLPResult]:
+        embeddings = self.processor.get_embeddings(texts)
+        labels = self.processor.classify_topic_and_urgency_batch(embeddings)
+        return [(embeddings[i], topic, urgency) for i, (topic, urgency) in enumerate(labels)]
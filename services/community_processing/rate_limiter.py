@@ -0,0 +1,96 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from config import Config
+from utils.redis_utils import AsyncRedisClient
+from utils.redis_scripts import TOKEN_BUCKET_SCRIPT
+from services.community_processing.types import RateLimitResult
+from services.community_processing.spatial_index import SpatialGridIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Một token bucket: `capacity` lượt gửi liên tiếp, nạp lại `refill_per_minute` lượt mỗi phút"""
+    name: str
+    capacity: float
+    refill_per_minute: float
+
+    @property
+    def refill_per_ms(self) -> float:
+        return self.refill_per_minute / 60000
+
+
+class ReportRateLimiter:
+    """
+    Giới hạn tần suất gửi báo cáo bằng token bucket trong Redis: theo người dùng và theo cell địa lý.
+    Mọi bucket của một lần kiểm tra được đọc, nạp lại và trừ trong một Lua script (một round trip, nguyên tử).
+    Key bị chặn được nhớ trong process tới khi hết thời gian chờ, nên các lần thử lại liên tục bị từ chối
+    ngay mà không gọi Redis.
+    """
+
+    USER_KEY = "rate_limit:community_report:user:{}"
+    CELL_KEY = "rate_limit:community_report:cell:{}"
+
+    def __init__(self, redis_client: AsyncRedisClient = None, user_rule: RateLimitRule = None,
+                 cell_rule: RateLimitRule = None, local_blocklist_size: int = None):
+        self.redis = redis_client or AsyncRedisClient()
+        self.user_rule = user_rule or RateLimitRule("user", Config.RATE_LIMIT_REPORTS_BURST, Config.RATE_LIMIT_REPORTS_PER_MINUTE)
+        self.cell_rule = cell_rule or RateLimitRule("geo_cell", Config.RATE_LIMIT_GEO_CELL_BURST, Config.RATE_LIMIT_GEO_CELL_REPORTS_PER_MINUTE)
+        self._grid = SpatialGridIndex(cell_size_deg=Config.RATE_LIMIT_GEO_CELL_SIZE_DEG)
+        self._blocklist_size = local_blocklist_size or Config.RATE_LIMIT_LOCAL_BLOCKLIST_SIZE
+        self._blocked_until: OrderedDict[str, Tuple[float, str]] = OrderedDict() # key -> (thời điểm hết chặn, tên bucket)
+        self._script = None
+
+    async def check_report(self, user_id: str, lat: Optional[float] = None, lon: Optional[float] = None) -> RateLimitResult:
+        """Trừ một lượt của người dùng và (nếu đã biết tọa độ) của cell chứa báo cáo"""
+        buckets = [(self.USER_KEY.format(user_id), self.user_rule)]
+        if lat is not None and lon is not None:
+            buckets.append((self.CELL_KEY.format(self._grid.cell_id(lat, lon)), self.cell_rule))
+        return await self.acquire(buckets)
+
+    async def check_cell(self, lat: float, lon: float) -> RateLimitResult:
+        """Chỉ kiểm tra cell địa lý (dùng khi tọa độ được xác định sau bước kiểm tra người dùng)"""
+        return await self.acquire([(self.CELL_KEY.format(self._grid.cell_id(lat, lon)), self.cell_rule)])
+
+    async def acquire(self, buckets: List[Tuple[str, RateLimitRule]], cost: int = 1) -> RateLimitResult:
+        blocked = self._check_local(buckets)
+        if blocked is not None:
+            return blocked
+
+        if self._script is None:
+            self._script = TOKEN_BUCKET_SCRIPT.bind(await self.redis.get_client())
+        keys = [key for key, _ in buckets]
+        args = [cost]
+        for _, rule in buckets:
+            args.extend((rule.capacity, rule.refill_per_ms))
+        denied, remaining, retry_ms = await self._script(keys, args)
+
+        if not denied:
+            return RateLimitResult(allowed=True, remaining=int(remaining))
+        key, rule = buckets[int(denied) - 1]
+        retry_after = int(retry_ms) / 1000
+        self._remember_block(key, rule.name, retry_after)
+        return RateLimitResult(allowed=False, remaining=0, retry_after_seconds=retry_after, limited_by=rule.name)
+
+    def _check_local(self, buckets: List[Tuple[str, RateLimitRule]]) -> Optional[RateLimitResult]:
+        now = time.monotonic()
+        for key, _ in buckets:
+            entry = self._blocked_until.get(key)
+            if entry is None:
+                continue
+            until, name = entry
+            if until > now:
+                return RateLimitResult(allowed=False, remaining=0, retry_after_seconds=round(until - now, 3), limited_by=name)
+            del self._blocked_until[key]
+        return None
+
+    def _remember_block(self, key: str, name: str, retry_after: float):
+        self._blocked_until[key] = (time.monotonic() + retry_after, name)
+        self._blocked_until.move_to_end(key)
+        while len(self._blocked_until) > self._blocklist_size:
+            self._blocked_until.popitem(last=False)
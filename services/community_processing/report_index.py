@@ -0,0 +1,217 @@
+import heapq
+import logging
+import math
+import time
+from itertools import islice
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from config import Config
+from utils.redis_utils import AsyncRedisClient
+from services.community_processing.types import ReportPage
+from services.community_processing.spatial_index import SpatialGridIndex
+
+logger = logging.getLogger(__name__)
+
+
+class ReportIndex:
+    """
+    Chỉ mục phụ của báo cáo trong Redis, cập nhật lúc ghi: sorted set (score = thời điểm tạo) chia theo giờ.
+
+    - report_index:geo:{cell}:{giờ}:{topic}:{status}: báo cáo trong một cell địa lý, theo topic và trạng thái
+    - report_index:geo_keys:{cell}:{giờ}: tập các cặp "topic:status" đang có trong cell/giờ đó
+    - report_index:topic:{topic}:{giờ}, report_index:status:{status}:{giờ}: không theo vị trí
+
+    Mỗi key chỉ chứa báo cáo khớp đúng bộ lọc nên một trang k kết quả tốn O(số key * log N + k),
+    thay vì quét toàn bộ report:*. Key hết hạn cùng lúc với báo cáo cuối cùng của giờ đó.
+    Các hàm ghi nhận pipeline của caller để gộp vào cùng round trip với lệnh ghi báo cáo.
+    """
+
+    PREFIX = "report_index"
+
+    def __init__(self, redis_client: AsyncRedisClient = None):
+        self.redis = redis_client or AsyncRedisClient()
+        self.bucket_seconds = Config.REPORT_INDEX_BUCKET_SECONDS
+        self._grid = SpatialGridIndex(cell_size_deg=Config.REPORT_INDEX_CELL_SIZE_DEG)
+
+    # --- Ghi ---
+
+    def add(self, pipe, report_id: str, topic: str, status: str, lat: float, lon: float, created_ts: float):
+        bucket = self._bucket(created_ts)
+        cell = self._grid.cell_id(lat, lon)
+        ttl = self._ttl(bucket)
+        for key in (self._geo_key(cell, bucket, topic, status), self._topic_key(topic, bucket), self._status_key(status, bucket)):
+            pipe.zadd(key, {report_id: created_ts})
+            pipe.expire(key, ttl)
+        combos_key = self._combos_key(cell, bucket)
+        pipe.sadd(combos_key, f"{topic}:{status}")
+        pipe.expire(combos_key, ttl)
+
+    def remove(self, pipe, report_id: str, topic: str, status: str, lat: float, lon: float, created_ts: float):
+        bucket = self._bucket(created_ts)
+        cell = self._grid.cell_id(lat, lon)
+        pipe.zrem(self._geo_key(cell, bucket, topic, status), report_id)
+        pipe.zrem(self._topic_key(topic, bucket), report_id)
+        pipe.zrem(self._status_key(status, bucket), report_id)
+
+    def change_status(self, pipe, report_id: str, topic: str, old_status: str, new_status: str,
+                      lat: float, lon: float, created_ts: float):
+        bucket = self._bucket(created_ts)
+        cell = self._grid.cell_id(lat, lon)
+        ttl = self._ttl(bucket)
+        pipe.zrem(self._geo_key(cell, bucket, topic, old_status), report_id)
+        pipe.zrem(self._status_key(old_status, bucket), report_id)
+        for key in (self._geo_key(cell, bucket, topic, new_status), self._status_key(new_status, bucket)):
+            pipe.zadd(key, {report_id: created_ts})
+            pipe.expire(key, ttl)
+        combos_key = self._combos_key(cell, bucket)
+        pipe.sadd(combos_key, f"{topic}:{new_status}")
+        pipe.expire(combos_key, ttl)
+
+    # --- Truy vấn ---
+
+    async def query_area(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                         topics: Optional[Iterable[str]] = None, statuses: Optional[Iterable[str]] = None,
+                         since: float = None, until: float = None, limit: int = 50, cursor: str = None) -> ReportPage:
+        """
+        Báo cáo trong khung nhìn bản đồ, mới nhất trước, có thể lọc theo topic/trạng thái và khoảng thời gian.
+        Các cell phủ khung nhìn rộng hơn khung nhìn, nên kết quả được lọc lại theo đúng tọa độ của báo cáo.
+        Ví dụ "báo cáo giao thông đã xác thực quanh tôi trong 1 giờ qua":
+        query_area(..., topics=["giao_thong"], statuses=["verified_community"], since=time.time() - 3600)
+        """
+        since, until = self._time_range(since, until)
+        buckets = self._buckets(since, until)
+        cells = self._grid.cells_in_box(min_lat, min_lon, max_lat, max_lon)
+        self._check_query_size(len(cells) * len(buckets))
+
+        redis_conn = await self.redis.get_client()
+        combo_keys = [(f"{i}:{j}", bucket) for i, j in cells for bucket in buckets]
+        pipe = redis_conn.pipeline(transaction=False)
+        for cell, bucket in combo_keys:
+            pipe.smembers(self._combos_key(cell, bucket))
+        combos_per_key = await pipe.execute()
+
+        topics = set(topics) if topics is not None else None
+        statuses = set(statuses) if statuses is not None else None
+        keys = []
+        for (cell, bucket), combos in zip(combo_keys, combos_per_key):
+            for combo in combos:
+                topic, status = combo.rsplit(":", 1)
+                if (topics is None or topic in topics) and (statuses is None or status in statuses):
+                    keys.append(self._geo_key(cell, bucket, topic, status))
+        return await self._page(redis_conn, keys, since, until, limit, cursor, box=(min_lat, min_lon, max_lat, max_lon))
+
+    async def query_recent(self, topic: str = None, status: str = None, since: float = None, until: float = None,
+                           limit: int = 50, cursor: str = None) -> ReportPage:
+        """Báo cáo mới nhất theo một topic hoặc một trạng thái (không lọc vị trí)"""
+        if (topic is None) == (status is None):
+            raise ValueError("query_recent needs exactly one of topic or status")
+        since, until = self._time_range(since, until)
+        buckets = self._buckets(since, until)
+        self._check_query_size(len(buckets))
+        key_of = (lambda b: self._topic_key(topic, b)) if topic is not None else (lambda b: self._status_key(status, b))
+        redis_conn = await self.redis.get_client()
+        return await self._page(redis_conn, [key_of(bucket) for bucket in buckets], since, until, limit, cursor)
+
+    async def _page(self, redis_conn, keys: Sequence[str], since: float, until: float, limit: int, cursor: Optional[str],
+                    box: Optional[Tuple[float, float, float, float]] = None) -> ReportPage:
+        limit = max(1, min(limit, Config.REPORT_INDEX_MAX_PAGE_SIZE))
+        if not keys:
+            return ReportPage()
+
+        # Trang tiếp theo bắt đầu ngay sau (score, id) cuối cùng đã xét ở trang trước (kể cả mục bị lọc bỏ)
+        after = self._decode_cursor(cursor) if cursor else None
+        reports, has_more = [], True
+        while len(reports) < limit and has_more:
+            candidates = await self._candidates(redis_conn, keys, since, until, limit, after)
+            batch = candidates[:limit]
+            pipe = redis_conn.pipeline(transaction=False)
+            for _, report_id in batch:
+                pipe.hgetall(f"report:{report_id}")
+            rows = await pipe.execute()
+
+            has_more = len(candidates) > limit
+            for entry, row in zip(batch, rows):
+                if len(reports) == limit:
+                    has_more = True
+                    break
+                after = entry
+                # Báo cáo đã hết hạn/bị xóa nhưng chỉ mục chưa kịp dọn, hoặc nằm ngoài khung nhìn thì bỏ qua
+                if row and (box is None or self._in_box(row, box)):
+                    reports.append(row)
+
+        next_cursor = self._encode_cursor(*after) if has_more and after else None
+        return ReportPage(reports=reports, next_cursor=next_cursor)
+
+    async def _candidates(self, redis_conn, keys: Sequence[str], since: float, until: float, limit: int,
+                          after: Optional[Tuple[float, str]]) -> List[Tuple[float, str]]:
+        """Tối đa limit + 1 mục (score, id) mới nhất ngay sau `after` trên mọi key (để biết còn trang sau)"""
+        max_score = min(until, after[0]) if after else until
+        # Lấy thêm một phần tử khi có cursor: chính phần tử ở cursor (cùng score) sẽ bị lọc bỏ
+        num = limit + 2 if after else limit + 1
+        pipe = redis_conn.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrevrangebyscore(key, max_score, since, start=0, num=num, withscores=True)
+        per_key = await pipe.execute()
+
+        streams = []
+        for entries in per_key:
+            entries = [(score, member) for member, score in entries]
+            if after:
+                entries = [entry for entry in entries if entry < after]
+            streams.append(entries)
+        # Mỗi key đã sắp xếp giảm dần: trộn k danh sách, chỉ lấy limit + 1 phần tử
+        return list(islice(heapq.merge(*streams, reverse=True), limit + 1))
+
+    @staticmethod
+    def _in_box(row: dict, box: Tuple[float, float, float, float]) -> bool:
+        min_lat, min_lon, max_lat, max_lon = box
+        try:
+            lat, lon = float(row["latitude"]), float(row["longitude"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+    # --- Tiện ích ---
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds)
+
+    def _buckets(self, since: float, until: float) -> List[int]:
+        return list(range(self._bucket(since), self._bucket(until) + 1))
+
+    def _ttl(self, bucket: int) -> int:
+        # Giữ key tới khi báo cáo cuối cùng của giờ đó hết hạn
+        bucket_end = (bucket + 1) * self.bucket_seconds
+        return max(1, math.ceil(bucket_end - time.time())) + Config.REPORT_EXPIRE_SECONDS_FOR_UNVERIFIED
+
+    def _time_range(self, since: Optional[float], until: Optional[float]) -> Tuple[float, float]:
+        until = time.time() if until is None else until
+        since = until - Config.REPORT_INDEX_DEFAULT_WINDOW_SECONDS if since is None else since
+        if since > until:
+            raise ValueError("since must not be after until")
+        return since, until
+
+    def _check_query_size(self, n_keys: int):
+        if n_keys > Config.REPORT_INDEX_MAX_QUERY_KEYS:
+            raise ValueError(f"Query spans {n_keys} index keys (max {Config.REPORT_INDEX_MAX_QUERY_KEYS}); narrow the area or time range")
+
+    @staticmethod
+    def _encode_cursor(score: float, report_id: str) -> str:
+        return f"{score!r}:{report_id}"
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[float, str]:
+        score, report_id = cursor.split(":", 1)
+        return float(score), report_id
+
+    def _geo_key(self, cell: str, bucket: int, topic: str, status: str) -> str:
+        return f"{self.PREFIX}:geo:{cell}:{bucket}:{topic}:{status}"
+
+    def _combos_key(self, cell: str, bucket: int) -> str:
+        return f"{self.PREFIX}:geo_keys:{cell}:{bucket}"
+
+    def _topic_key(self, topic: str, bucket: int) -> str:
+        return f"{self.PREFIX}:topic:{topic}:{bucket}"
+
+    def _status_key(self, status: str, bucket: int) -> str:
+        return f"{self.PREFIX}:status:{status}:{bucket}"
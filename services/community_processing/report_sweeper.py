@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from utils.redis_utils import AsyncRedisClient
+from services.community_processing.credibility import ReportCredibilityCalculator
+from services.community_processing.incident_clusters import IncidentRemoval, IncidentUpdate
+from services.community_processing.incident_index import IncidentIndex
+from services.community_processing.report_index import ReportIndex
+
+logger = logging.getLogger(__name__)
+
+# Nhận danh sách report_id sắp bị xóa, để gỡ khỏi các chỉ mục trong bộ nhớ; trả về các sự cố bị ảnh hưởng (nếu có)
+RemovedCallback = Callable[[List[str]], Optional[IncidentRemoval]]
+
+
+class ReportSweeper:
+    """
+    Dọn các báo cáo cũ có điểm tin cậy thấp theo should_remove_report, chạy nền.
+    Duyệt keyspace từng lô bằng SCAN (không chặn Redis như KEYS), đọc các trường cần thiết của cả lô
+    trong một pipeline, rồi xóa (hoặc lưu trữ) các báo cáo bị loại cùng embedding của chúng.
+    Trong cùng pipeline, sự cố mất hết báo cáo bị xóa khỏi IncidentIndex, sự cố mất một phần được ghi lại số báo cáo:
+    theo IncidentClusterer trong bộ nhớ (qua on_removed) nếu nó biết báo cáo, nếu không thì trực tiếp trên Redis.
+    Tốc độ duyệt bị giới hạn theo số key/giây; cursor SCAN được lưu vào Redis sau mỗi lô
+    nên lượt quét tiếp tục từ chỗ dừng khi worker khởi động lại.
+    """
+
+    CHECKPOINT_KEY = "report_sweeper:cursor"
+    LAST_COMPLETED_KEY = "report_sweeper:last_completed"
+    REPORT_FIELDS = ["created_at", "reliability_score", "status", "official_sources", "topic", "latitude", "longitude",
+                     "incident_id"]
+
+    def __init__(self, calculator: ReportCredibilityCalculator, redis_client: AsyncRedisClient = None,
+                 on_removed: Optional[RemovedCallback] = None, batch_size: int = None,
+                 max_keys_per_second: float = None, archive: bool = None, report_index: Optional[ReportIndex] = None,
+                 incident_index: Optional[IncidentIndex] = None):
+        self.calculator = calculator
+        self.redis = redis_client or AsyncRedisClient()
+        self.on_removed = on_removed
+        self.batch_size = batch_size or Config.REPORT_SWEEPER_BATCH_SIZE
+        self.max_keys_per_second = max_keys_per_second or Config.REPORT_SWEEPER_MAX_KEYS_PER_SECOND
+        self.archive = Config.REPORT_SWEEPER_ARCHIVE if archive is None else archive
+        self.report_index = report_index
+        self.incident_index = incident_index
+
+    async def run_forever(self, interval_seconds: float = None):
+        interval = Config.REPORT_SWEEPER_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Report sweeper failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def sweep(self, max_batches: int = None) -> int:
+        """
+        Quét tiếp từ checkpoint tới hết keyspace (hoặc tối đa `max_batches` lô).
+        Trả về số báo cáo đã bị loại.
+        """
+        redis_conn = await self.redis.get_client()
+        cursor = int(await redis_conn.get(self.CHECKPOINT_KEY) or 0)
+        removed_total = 0
+        batches = 0
+        while True:
+            started = time.monotonic()
+            cursor, keys = await redis_conn.scan(cursor, match="report:*", count=self.batch_size)
+            if keys:
+                removed_total += await self._process_batch(redis_conn, keys)
+            batches += 1
+            if cursor == 0:
+                await redis_conn.delete(self.CHECKPOINT_KEY)
+                await redis_conn.set(self.LAST_COMPLETED_KEY, datetime.now().isoformat())
+                logger.info(f"Report sweep completed: {removed_total} reports removed.")
+                break
+            await redis_conn.set(self.CHECKPOINT_KEY, cursor)
+            if max_batches is not None and batches >= max_batches:
+                break
+            # Giới hạn tốc độ: mỗi lô tối thiểu batch_size / max_keys_per_second giây
+            await asyncio.sleep(max(0.0, self.batch_size / self.max_keys_per_second - (time.monotonic() - started)))
+        return removed_total
+
+    async def _process_batch(self, redis_conn, keys: List[str]) -> int:
+        pipe = redis_conn.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, self.REPORT_FIELDS)
+        rows = await pipe.execute()
+
+        now = datetime.now()
+        removals = [(key, dict(zip(self.REPORT_FIELDS, row))) for key, row in zip(keys, rows)]
+        removals = [(key, fields) for key, fields in removals if self._should_remove(fields, now)]
+        if not removals:
+            return 0
+        to_remove = [key for key, _ in removals]
+
+        if self.archive:
+            pipe = redis_conn.pipeline(transaction=False)
+            for key in to_remove:
+                pipe.hgetall(key)
+            snapshots = await pipe.execute()
+
+        report_ids = [key.split(":", 1)[1] for key in to_remove]
+        changes = self.on_removed(report_ids) if self.on_removed is not None else None
+        pipe = redis_conn.pipeline(transaction=False)
+        for i, (key, report_id) in enumerate(zip(to_remove, report_ids)):
+            if self.archive and snapshots[i]:
+                archive_key = f"report_archive:{report_id}"
+                pipe.hset(archive_key, mapping={**snapshots[i], "status": "archived", "archived_at": now.isoformat()})
+                pipe.expire(archive_key, Config.REPORT_ARCHIVE_TTL_SECONDS)
+            pipe.delete(key, f"report_embedding:{report_id}")
+            if self.report_index is not None:
+                self._remove_from_report_index(pipe, report_id, removals[i][1])
+        if self.incident_index is not None:
+            await self._remove_from_incident_index(pipe, changes, report_ids, [fields for _, fields in removals])
+        await pipe.execute()
+
+        logger.info(f"Report sweeper removed {len(report_ids)} reports.")
+        return len(report_ids)
+
+    async def _remove_from_incident_index(self, pipe, changes: Optional[IncidentRemoval], report_ids: List[str],
+                                          fields: List[dict]):
+        if changes is not None:
+            for incident in changes.updated:
+                self.incident_index.save(pipe, IncidentUpdate(incident, created=False))
+            for incident in changes.removed:
+                self.incident_index.remove(pipe, incident)
+        # Báo cáo mà bộ nhớ không biết: trừ số báo cáo của sự cố (trường incident_id của báo cáo) trên Redis
+        unknown = set(report_ids) if changes is None else set(changes.unknown_reports)
+        counts: Dict[str, int] = {}
+        for report_id, report_fields in zip(report_ids, fields):
+            incident_id = report_fields["incident_id"]
+            if report_id in unknown and incident_id:
+                counts[incident_id] = counts.get(incident_id, 0) + 1
+        if counts:
+            await self.incident_index.remove_reports(pipe, counts)
+
+    def _remove_from_report_index(self, pipe, report_id: str, fields: dict):
+        try:
+            self.report_index.remove(pipe, report_id, fields["topic"], fields["status"], float(fields["latitude"]),
+                                     float(fields["longitude"]), datetime.fromisoformat(fields["created_at"]).timestamp())
+        except (TypeError, ValueError):
+            pass # Thiếu tọa độ/topic: báo cáo chưa từng được đưa vào chỉ mục
+
+    def _should_remove(self, fields: dict, now: datetime) -> bool:
+        created_at, score = fields["created_at"], fields["reliability_score"]
+        status, official_sources = fields["status"], fields["official_sources"]
+        if created_at is None or score is None or status == "deleted":
+            return False
+        try:
+            days_since_posted = (now - datetime.fromisoformat(created_at)).days
+            credibility_score = float(score)
+            is_verified_by_news = bool(json.loads(official_sources or "[]"))
+        except ValueError:
+            logger.warning(f"Report sweeper: skipping report with malformed fields ({created_at!r}, {score!r}, {official_sources!r}).")
+            return False
+        return self.calculator.should_remove_report(credibility_score, days_since_posted, is_verified_by_news)
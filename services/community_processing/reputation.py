@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+from utils.redis_utils import AsyncRedisClient
+from utils.redis_scripts import REPUTATION_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+PERMANENT_BAN = -1
+
+
+@dataclass
+class UserReputation:
+    """Uy tín và trạng thái cấm của một người dùng (bản trong cache)"""
+    score: float
+    strikes: int = 0 # Số báo cáo bị đánh giá điểm thấp (tính mức cấm)
+    ban_level: int = 0
+    banned_until: float = 0 # Unix time; PERMANENT_BAN = vĩnh viễn
+    loaded_at: float = 0
+
+    def is_banned(self, now: float) -> bool:
+        return self.ban_level > 0 and (self.banned_until == PERMANENT_BAN or self.banned_until > now)
+
+
+class ReputationManager:
+    """
+    Uy tín người dùng lưu trong Redis (hash user_reputation:{user_id}).
+
+    - Đọc: cache LRU có giới hạn trong process. Các luồng async gọi `load()` (một pipeline cho cả lô người dùng)
+      trước, sau đó `get_reputation()` đồng bộ chỉ đọc cache, không có round trip Redis nào trên đường nhận báo cáo/vote.
+    - Ghi: `update_reputation()` cập nhật cache ngay và cộng dồn thay đổi trong bộ nhớ; các thay đổi được ghi xuống
+      Redis theo lô (write-behind) trong một Lua script, mỗi REPUTATION_FLUSH_INTERVAL_SECONDS hoặc khi đủ nhiều.
+      Thay đổi chưa ghi sẽ mất nếu process dừng đột ngột (tối đa một chu kỳ).
+    - Phạt: báo cáo có điểm tin cậy dưới LOW_CREDIBILITY_THRESHOLD_PENALTY sau ít nhất MIN_VOTES_THRESHOLD lượt vote
+      tính là một lần vi phạm; đạt BAN_LEVEL_*_THRESHOLD thì bị cấm gửi báo cáo theo FAKE_SOS_BAN_DURATION.
+      Vi phạm được quyết định ở đây trước khi cộng dồn, nên Lua script và hàm fallback chỉ nhận số vi phạm đã lọc.
+    """
+
+    KEY = "user_reputation:{}"
+    FIELDS = ["score", "strikes", "ban_level", "banned_until"]
+
+    def __init__(self, redis_client: AsyncRedisClient = None, cache_size: int = None, cache_ttl_seconds: float = None):
+        self.redis = redis_client or AsyncRedisClient()
+        self.cache_size = cache_size or Config.REPUTATION_CACHE_MAX_USERS
+        self.cache_ttl = Config.REPUTATION_CACHE_TTL_SECONDS if cache_ttl_seconds is None else cache_ttl_seconds
+        self._cache: OrderedDict[str, UserReputation] = OrderedDict()
+        self._pending: Dict[str, List[float]] = {} # user_id -> [score_delta, correct, incorrect, strikes]
+        self._script = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    # --- Đọc ---
+
+    async def load(self, user_ids: Iterable[str]):
+        """Nạp vào cache các người dùng chưa có hoặc đã cũ (một pipeline)"""
+        now = time.time()
+        missing = [user_id for user_id in dict.fromkeys(user_ids) if not self._is_fresh(user_id, now)]
+        if not missing:
+            return
+        redis_conn = await self.redis.get_client()
+        pipe = redis_conn.pipeline(transaction=False)
+        for user_id in missing:
+            pipe.hmget(self.KEY.format(user_id), self.FIELDS)
+        rows = await pipe.execute()
+        for user_id, (score, strikes, ban_level, banned_until) in zip(missing, rows):
+            record = UserReputation(
+                score=Config.REPUTATION_DEFAULT if score is None else float(score),
+                strikes=int(strikes or 0),
+                ban_level=int(ban_level or 0),
+                banned_until=float(banned_until or 0),
+                loaded_at=now
+            )
+            self._apply_pending(record, self._pending.get(user_id))
+            self._put(user_id, record)
+
+    def get_reputation(self, user_id: str) -> float:
+        record = self._cache.get(user_id)
+        if record is None:
+            # Chưa load(): dùng uy tín mặc định thay vì chặn event loop bằng một lệnh Redis đồng bộ
+            logger.debug(f"Reputation cache miss for {user_id}, using default.")
+            return Config.REPUTATION_DEFAULT
+        self._cache.move_to_end(user_id)
+        return record.score
+
+    def get_ban(self, user_id: str) -> Optional[UserReputation]:
+        """Bản ghi của người dùng nếu đang bị cấm (cần load() trước)"""
+        record = self._cache.get(user_id)
+        return record if record is not None and record.is_banned(time.time()) else None
+
+    # --- Ghi ---
+
+    def update_reputation(self, user_id: str, is_correct: bool, credibility_score: float = None, total_votes: int = 0):
+        """
+        Ghi nhận kết quả một báo cáo của người dùng: cộng/trừ uy tín, tính vi phạm nếu điểm tin cậy quá thấp.
+        Chỉ tính vi phạm khi báo cáo đã có đủ MIN_VOTES_THRESHOLD lượt vote: báo cáo mới có điểm sát ngưỡng phạt,
+        nếu không thì vài lượt downvote của bất kỳ ai cũng đủ khiến người đăng bị cấm.
+        """
+        is_strike = (credibility_score is not None and credibility_score < Config.LOW_CREDIBILITY_THRESHOLD_PENALTY
+                     and total_votes >= Config.MIN_VOTES_THRESHOLD)
+        delta = [
+            Config.REPUTATION_STEP_CORRECT if is_correct else -Config.REPUTATION_STEP_INCORRECT,
+            int(is_correct),
+            int(not is_correct),
+            int(is_strike)
+        ]
+        pending = self._pending.setdefault(user_id, [0.0, 0, 0, 0])
+        for i, value in enumerate(delta):
+            pending[i] += value
+
+        record = self._cache.get(user_id)
+        if record is not None:
+            self._apply_pending(record, delta)
+        if len(self._pending) >= Config.REPUTATION_FLUSH_MAX_PENDING:
+            self._schedule_flush()
+
+    async def flush(self):
+        """Ghi toàn bộ thay đổi đang chờ xuống Redis trong một lần gọi script"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        user_ids = list(pending)
+        args = [int(time.time()), Config.REPUTATION_DEFAULT]
+        args += [Config.BAN_LEVEL_1_THRESHOLD, Config.BAN_LEVEL_2_THRESHOLD, Config.BAN_LEVEL_3_THRESHOLD]
+        args += [self._ban_duration_seconds(level) for level in (1, 2, 3)]
+        for user_id in user_ids:
+            args.extend(pending[user_id])
+        try:
+            if self._script is None:
+                self._script = REPUTATION_SCRIPT.bind(await self.redis.get_client())
+            scores = await self._script([self.KEY.format(user_id) for user_id in user_ids], args)
+        except Exception as e:
+            logger.error(f"Reputation flush of {len(user_ids)} users failed: {e}. Will retry.")
+            for user_id, delta in pending.items():
+                merged = self._pending.setdefault(user_id, [0.0, 0, 0, 0])
+                for i, value in enumerate(delta):
+                    merged[i] += value
+            return
+        for user_id, score in zip(user_ids, scores):
+            record = self._cache.get(user_id)
+            if record is None:
+                continue
+            if pending[user_id][3]:
+                # Trạng thái cấm do script quyết định: đánh dấu cũ để load() lần sau đọc lại từ Redis
+                record.loaded_at = 0
+            elif user_id not in self._pending:
+                record.score = float(score)
+
+    async def run_flusher(self, interval_seconds: float = None):
+        interval = Config.REPUTATION_FLUSH_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush()
+        finally:
+            # Khi service dừng: ghi nốt phần còn lại
+            await self.flush()
+
+    # --- Nội bộ ---
+
+    def _is_fresh(self, user_id: str, now: float) -> bool:
+        record = self._cache.get(user_id)
+        return record is not None and now - record.loaded_at < self.cache_ttl
+
+    def _put(self, user_id: str, record: UserReputation):
+        self._cache[user_id] = record
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _apply_pending(self, record: UserReputation, delta: Optional[List[float]]):
+        """Áp thay đổi chưa ghi lên bản cache để process này thấy ngay cập nhật của chính nó"""
+        if not delta:
+            return
+        record.score = max(0.0, min(1.0, record.score + delta[0]))
+        record.strikes += int(delta[3])
+        for level in range(3, record.ban_level, -1):
+            if record.strikes >= getattr(Config, f"BAN_LEVEL_{level}_THRESHOLD"):
+                duration = self._ban_duration_seconds(level)
+                record.ban_level = level
+                record.banned_until = time.time() + duration if duration >= 0 else PERMANENT_BAN
+                break
+
+    def _schedule_flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            pass # Không có event loop (vd. script đồng bộ): để run_flusher/flush() ghi sau
+
+    @staticmethod
+    def _ban_duration_seconds(level: int) -> int:
+        days = Config.FAKE_SOS_BAN_DURATION[level]
+        return PERMANENT_BAN if days < 0 else int(days * 86400)
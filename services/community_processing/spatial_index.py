@@ -0,0 +1,93 @@
+import heapq
+import math
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+
+Cell = Tuple[int, int]
+
+
+class SpatialGridIndex:
+    """
+    Chỉ mục không gian dạng lưới đều (cell theo độ lat/lon).
+    Truy vấn chỉ duyệt các cell lân cận thay vì toàn bộ sự kiện.
+    """
+
+    def __init__(self, cell_size_deg: float = None, ttl_seconds: Optional[float] = None):
+        self.cell_size = cell_size_deg or Config.SPATIAL_GRID_CELL_SIZE_DEG
+        self.ttl_seconds = ttl_seconds
+        self._cells: Dict[Cell, Dict[str, Tuple[float, float, Any]]] = {}
+        self._items: Dict[str, Tuple[Cell, float]] = {} # item_id -> (cell, expires_at)
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._items
+
+    def cell_of(self, lat: float, lon: float) -> Cell:
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def cell_id(self, lat: float, lon: float) -> str:
+        """Khóa dạng chuỗi của cell, dùng cho các key Redis"""
+        i, j = self.cell_of(lat, lon)
+        return f"{i}:{j}"
+
+    def cells_around(self, lat: float, lon: float, radius_deg: float) -> List[Cell]:
+        """Các cell giao với hộp [lat ± radius, lon ± radius]"""
+        return self.cells_in_box(lat - radius_deg, lon - radius_deg, lat + radius_deg, lon + radius_deg)
+
+    def cells_in_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Cell]:
+        """Các cell giao với hộp [min_lat, max_lat] x [min_lon, max_lon] (vd. khung nhìn bản đồ)"""
+        min_i, min_j = self.cell_of(min_lat, min_lon)
+        max_i, max_j = self.cell_of(max_lat, max_lon)
+        return [(i, j) for i in range(min_i, max_i + 1) for j in range(min_j, max_j + 1)]
+
+    def insert(self, item_id: str, lat: float, lon: float, payload: Any = None, now: float = None):
+        if item_id in self._items:
+            self.remove(item_id)
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else math.inf
+        cell = self.cell_of(lat, lon)
+        self._cells.setdefault(cell, {})[item_id] = (lat, lon, payload)
+        self._items[item_id] = (cell, expires_at)
+        if expires_at != math.inf:
+            heapq.heappush(self._expiry_heap, (expires_at, item_id))
+
+    def remove(self, item_id: str) -> bool:
+        entry = self._items.pop(item_id, None)
+        if entry is None:
+            return False
+        cell = entry[0]
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(item_id, None)
+            if not bucket:
+                del self._cells[cell]
+        # Mục trong heap sẽ được bỏ qua khi expire() gặp lại (lazy deletion)
+        return True
+
+    def expire(self, now: float = None) -> List[str]:
+        """Xóa các mục đã hết hạn, trả về danh sách id bị xóa"""
+        now = time.time() if now is None else now
+        expired = []
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, item_id = heapq.heappop(self._expiry_heap)
+            entry = self._items.get(item_id)
+            # Bỏ qua mục đã bị xóa hoặc đã được chèn lại với hạn mới
+            if entry is not None and entry[1] == expires_at:
+                self.remove(item_id)
+                expired.append(item_id)
+        return expired
+
+    def query(self, lat: float, lon: float, radius_deg: float) -> Iterator[Tuple[str, Any]]:
+        """Trả về (item_id, payload) nằm trong hộp |Δlat| < radius và |Δlon| < radius"""
+        for cell in self.cells_around(lat, lon, radius_deg):
+            bucket = self._cells.get(cell)
+            if not bucket:
+                continue
+            for item_id, (item_lat, item_lon, payload) in bucket.items():
+                if abs(item_lat - lat) < radius_deg and abs(item_lon - lon) < radius_deg:
+                    yield item_id, payload
@@ -1,6 +1,8 @@
 from datetime import datetime
-from typing import Dict, Optional
-from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+
+from utils.text_utils import NormalizedText
 
 @dataclass
 class CommunityReport:
@@ -19,3 +21,18 @@ class ValidationResult:
     reason: str
     filtered_content: Optional[str] = None
     extracted_info: Optional[Dict] = None
+    normalized_text: Optional[NormalizedText] = None # Dạng chuẩn hóa dùng chung cho bước NLP
+
+@dataclass
+class RateLimitResult:
+    """Kết quả kiểm tra giới hạn tần suất"""
+    allowed: bool
+    remaining: int # Số lượt còn lại của bucket chặt nhất
+    retry_after_seconds: float = 0.0
+    limited_by: Optional[str] = None # Tên bucket đã chặn (vd. 'user', 'geo_cell')
+
+@dataclass
+class ReportPage:
+    """Một trang kết quả truy vấn báo cáo, mới nhất trước"""
+    reports: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None # Truyền lại để lấy trang tiếp theo; None nếu đã hết
@@ -1,3 +1,5 @@
+import asyncio
+import os
 import uuid
 import time
 import json
@@ -6,32 +8,158 @@ from typing import Dict, Any, List, Tuple
 import numpy as np
 import logging
 
-from utils.redis_utils import RedisClient
+from utils.redis_utils import RedisClient, AsyncRedisClient
+from utils.embedding_codec import encode_embedding, decode_embedding
+from utils.redis_scripts import (REPORT_UPDATE_CONFLICT, REPORT_UPDATE_NOT_FOUND, REPORT_UPDATE_SCRIPT, VOTE_SCRIPT, VOTE_RESULT_NOT_FOUND,
+                                 VOTE_RESULT_SELF_VOTE, VOTE_RESULT_UNCHANGED)
 from utils.nlp_utils import nlp_processor # Vẫn dùng nlp_processor từ utils/
+from utils.metrics import metrics
+from utils.profiler import SamplingProfiler
 from config import Config
 
 # Import từ package community_processing
-from services.community_processing.types import CommunityReport, ValidationResult
-from services.community_processing.core_processor import CommunityReportProcessor
+from services.community_processing.types import CommunityReport, ValidationResult, RateLimitResult, ReportPage
 from services.community_processing.credibility import ReportCredibilityCalculator
+from services.community_processing.incident_clusters import IncidentClusterer, IncidentRemoval, IncidentUpdate, write_snapshot
+from services.community_processing.incident_index import IncidentIndex
+from services.community_processing.map_updates import MapUpdatePublisher
+from services.community_processing.nlp_batcher import NLPRequestCoalescer
+from services.community_processing.executors import ReportValidator, create_nlp_executor
+from services.community_processing.rate_limiter import ReportRateLimiter
+from services.community_processing.report_sweeper import ReportSweeper
+from services.community_processing.report_index import ReportIndex
+from services.community_processing.reputation import ReputationManager
 
 logger = logging.getLogger(__name__)
-redis_conn = RedisClient().get_client()
 
-# Mock storage for existing events to check for duplicates
-# In a real app, this would be a DB query, potentially with vector search capabilities (e.g., PostGIS with pgvector)
-MOCK_EXISTING_EVENTS: List[Dict[str, Any]] = []
+REPORT_STAGE_SECONDS = metrics.histogram("community_report_stage_seconds", "Thời gian từng bước xử lý báo cáo mới", ["stage"])
+REPORT_OUTCOMES = metrics.counter("community_reports_total", "Số báo cáo mới theo kết quả (mã lỗi hoặc ACCEPTED)", ["code"])
 
 class CommunityReportService:
     def __init__(self):
-        self.report_processor = CommunityReportProcessor()
-    self.credibility_calculator = ReportCredibilityCalculator()
+        self.redis = AsyncRedisClient()
+        # Lọc ngôn ngữ/độ dài/spam: trên event loop hoặc trong process pool (VALIDATION_EXECUTOR)
+        self.report_validator = ReportValidator()
+        # Uy tín người dùng: cache trong process + ghi dồn xuống Redis
+        self.reputation_manager = ReputationManager(self.redis)
+        self.credibility_calculator = ReportCredibilityCalculator(self.reputation_manager)
+        self.nlp_coalescer = NLPRequestCoalescer(nlp_processor, executor=create_nlp_executor())
+        self._vote_script = None # Bind khi có client async (lần vote đầu tiên)
+        self._report_update_script = None
+        self.rate_limiter = ReportRateLimiter(self.redis)
+        # Chỉ mục phụ theo khu vực/topic/trạng thái cho các truy vấn bản đồ
+        self.report_index = ReportIndex(self.redis)
+        if Config.EMBEDDING_CACHE_USE_REDIS and nlp_processor.embedding_cache is not None:
+            # Các worker dùng chung cache embedding qua Redis. Client đồng bộ vì cache chạy trong worker thread
+            # của NLP; mọi thao tác trên event loop đi qua AsyncRedisClient (connection pool)
+            nlp_processor.embedding_cache.attach_redis(RedisClient().get_binary_client())
+        # Gom báo cáo thành sự cố (tâm cụm theo vị trí + embedding), dùng để kiểm tra trùng lặp;
+        # sự cố được ghi vào Redis cho các truy vấn bản đồ
+        self.incident_clusterer = self._load_incident_clusterer()
+        self.incident_index = IncidentIndex(self.redis)
+        # Cập nhật real-time cho client bản đồ (pub/sub theo cell, gộp theo chu kỳ)
+        self.map_publisher = MapUpdatePublisher(self.redis) if Config.MAP_UPDATES_ENABLED else None
+        # Dọn nền các báo cáo điểm thấp quá hạn (gỡ luôn khỏi sự cố của chúng)
+        self.report_sweeper = ReportSweeper(self.credibility_calculator, self.redis, on_removed=self._remove_from_indexes,
+                                            report_index=self.report_index, incident_index=self.incident_index)
+        self.profiler = SamplingProfiler() if Config.PROFILER_ENABLED else None
+
+    def start_background_tasks(self) -> list:
+        """Khởi chạy các tác vụ nền của service (gọi khi event loop đã chạy)"""
+        tasks = [
+            asyncio.create_task(self.report_sweeper.run_forever()),
+            asyncio.create_task(self.reputation_manager.run_flusher()),
+            asyncio.create_task(self.run_incident_snapshotter()),
+        ]
+        if self.map_publisher is not None:
+            tasks.append(asyncio.create_task(self.map_publisher.run_forever()))
+        if Config.NLP_PRELOAD:
+            tasks.append(asyncio.create_task(self.warm_up()))
+        if self.profiler is not None:
+            self.profiler.start() # Lấy mẫu thread hiện tại (thread của event loop)
+        return tasks
+
+    async def warm_up(self):
+        """
+        Nạp trước model NLP (trong worker thread, không chặn event loop), khởi động các process lọc báo cáo
+        (nếu dùng) và mở kết nối Redis, để báo cáo đầu tiên không phải chịu thời gian khởi động.
+        """
+        started = time.perf_counter()
+        await asyncio.gather(self.nlp_coalescer.warm_up(), self.report_validator.warm_up(), self.redis.get_client())
+        logger.info(f"Community report service warmed up in {time.perf_counter() - started:.2f}s.")
+
+    def _remove_from_indexes(self, report_ids) -> IncidentRemoval:
+        """Gỡ báo cáo bị ReportSweeper xóa khỏi các sự cố; sweeper ghi các sự cố bị ảnh hưởng vào IncidentIndex"""
+        changes = self.incident_clusterer.remove_reports(report_ids)
+        for incident in changes.updated:
+            self._publish_map_update("incident", incident.id, incident.latitude, incident.longitude,
+                                     {"report_count": incident.report_count})
+        for incident in changes.removed:
+            # Client bỏ sự cố không còn báo cáo nào khỏi bản đồ
+            self._publish_map_update("incident", incident.id, incident.latitude, incident.longitude, {"deleted": True})
+        return changes
+
+    def _load_incident_clusterer(self) -> IncidentClusterer:
+        """Nạp lại các sự cố từ snapshot (nếu có)"""
+        path = Config.INCIDENT_SNAPSHOT_PATH
+        if not os.path.exists(path):
+            return IncidentClusterer()
+        try:
+            return IncidentClusterer.load_snapshot(path)
+        except Exception as e:
+            logger.error(f"Could not load incident snapshot {path}: {e}. Starting with no incidents.")
+            return IncidentClusterer()
+
+    def save_incident_snapshot(self):
+        """Ghi snapshot các sự cố ra đĩa (đồng bộ)"""
+        self.incident_clusterer.save_snapshot(Config.INCIDENT_SNAPSHOT_PATH)
+
+    async def run_incident_snapshotter(self, interval_seconds: float = None):
+        """
+        Ghi snapshot sự cố định kỳ và một lần cuối khi task bị hủy (dừng service), để worker khởi động lại
+        tiếp tục gộp báo cáo vào các sự cố đang có thay vì mở sự cố mới bên cạnh sự cố cũ trong Redis.
+        """
+        interval = Config.INCIDENT_SNAPSHOT_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                # Sao chép trạng thái trên event loop, ghi đĩa trong worker thread
+                arrays = self.incident_clusterer.snapshot_arrays()
+                try:
+                    await asyncio.to_thread(write_snapshot, Config.INCIDENT_SNAPSHOT_PATH, arrays)
+                except OSError as e:
+                    logger.error(f"Could not write incident snapshot {Config.INCIDENT_SNAPSHOT_PATH}: {e}")
+        finally:
+            try:
+                self.save_incident_snapshot()
+            except OSError as e:
+                logger.error(f"Could not write incident snapshot {Config.INCIDENT_SNAPSHOT_PATH}: {e}")
 
     async def process_new_report(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Processes a new community report: rate limits, filters, classifies, checks for duplicates,
         and prepares it for storage/verification.
+        Thời gian từng bước và kết quả được ghi vào metrics (xem metrics_prometheus()).
         """
+        started = time.perf_counter()
+        code = "ERROR"
+        try:
+            result = await self._process_new_report(report_data)
+            code = result.get("code", "ACCEPTED")
+            return result
+        finally:
+            REPORT_STAGE_SECONDS.observe(time.perf_counter() - started, "total")
+            REPORT_OUTCOMES.inc(code)
+
+    def metrics_prometheus(self) -> str:
+        """Toàn bộ metrics của process ở dạng văn bản Prometheus (nội dung cho endpoint /metrics)"""
+        return metrics.render_prometheus()
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Metrics dạng dict, kèm p50/p95/p99 ước lượng của từng bước"""
+        return metrics.snapshot()
+
+    async def _process_new_report(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
         user_id = report_data.get("user_id", "anonymous")
         content = report_data.get("description", "")
         location_text = report_data.get("location_text") # If user provides text location
@@ -50,15 +178,27 @@ class CommunityReportService:
 
         # --- Lọc ban đầu và kiểm tra tính hợp lệ ---
 
-        # 1. Rate Limiting (Kiểm tra tần suất gửi báo cáo của người dùng)
-        if not self._check_rate_limit(user_id):
-            logger.warning(f"User {user_id}: Rate limit exceeded for new report.")
-            return {"status": "error", "message": "Giới hạn tần suất báo cáo đã bị vượt quá. Vui lòng thử lại sau.", "code": "RATE_LIMIT_EXCEEDED"}
+        # 1. Rate Limiting (Kiểm tra tần suất gửi báo cáo của người dùng và của khu vực, nếu đã có tọa độ)
+        with REPORT_STAGE_SECONDS.time("rate_limit"):
+            rate_limit = await self.rate_limiter.check_report(user_id, latitude, longitude)
+        if not rate_limit.allowed:
+            return self._rate_limited_response(user_id, rate_limit)
+
+        # Nạp uy tín / trạng thái cấm vào cache (không tốn round trip nếu người dùng đã có trong cache)
+        with REPORT_STAGE_SECONDS.time("reputation"):
+            await self.reputation_manager.load([user_id])
+        ban = self.reputation_manager.get_ban(user_id)
+        if ban is not None:
+            until = "vĩnh viễn" if ban.banned_until < 0 else datetime.fromtimestamp(ban.banned_until).isoformat()
+            logger.warning("User %s: Banned (level %s) until %s.", user_id, ban.ban_level, until)
+            return {"status": "error", "message": f"Tài khoản đang bị cấm gửi báo cáo ({until}).", "code": "USER_BANNED",
+                    "ban_level": ban.ban_level}
 
         # 2. Layered Validation (Lọc theo lớp sử dụng CommunityReportProcessor)
-        validation_result = self.report_processor.process_report(report_obj)
+        with REPORT_STAGE_SECONDS.time("validation"):
+            validation_result = await self.report_validator.validate(report_obj)
         if not validation_result.is_valid:
-            logger.warning(f"User {user_id}: Invalid report - {validation_result.reason}")
+            logger.warning("User %s: Invalid report - %s", user_id, validation_result.reason)
             return {"status": "error", "message": validation_result.reason, "code": "INVALID_REPORT"}
         
         # Nếu hợp lệ, sử dụng nội dung đã lọc và thông tin đã trích xuất
@@ -66,57 +206,64 @@ class CommunityReportService:
         extracted_info = validation_result.extracted_info
         
         # Cập nhật tọa độ từ extracted_info nếu chưa có từ report_data và trích xuất được
+        # (gazetteer offline trong bước lọc, không gọi API geocoding)
         if not (report_obj.latitude and report_obj.longitude) and extracted_info and extracted_info['location']:
-            # Ở đây bạn sẽ gọi Geocoding API (ví dụ: Google Maps Geocoding)
-            # để chuyển `extracted_info['location']` thành lat/lon.
-            # lat, lon = await geocoder_utils.geocode(extracted_info['location'])
-            # report_obj.latitude = lat
-            # report_obj.longitude = lon
-            logger.info(f"DEBUG: Địa điểm trích xuất từ nội dung: {extracted_info['location']}")
-            # Để demo, gán tạm nếu có thể (chỉ khi có mock geocoding hoặc giá trị mặc định)
-            if "Láng Hạ" in extracted_info['location']:
-                report_obj.latitude = 21.0167
-                report_obj.longitude = 105.8163
-            elif "Mỹ Đình" in extracted_info['location']:
-                report_obj.latitude = 21.0177
-                report_obj.longitude = 105.7766
-            elif "Đống Đa" in extracted_info['location']:
-                report_obj.latitude = 21.005
-                report_obj.longitude = 105.815
-            # ... (thêm logic geocoding thực tế ở đây)
+            report_obj.latitude = extracted_info['latitude']
+            report_obj.longitude = extracted_info['longitude']
+            logger.info("User %s: Location resolved from text: %s (%s).", user_id, extracted_info['location'],
+                        extracted_info['location_kind'])
 
         if not (report_obj.latitude is not None and report_obj.longitude is not None):
-            logger.warning(f"User {user_id}: Could not determine precise geolocation for report.")
+            logger.warning("User %s: Could not determine precise geolocation for report.", user_id)
             return {"status": "error", "message": "Không thể xác định tọa độ địa lý chính xác cho báo cáo.", "code": "MISSING_GEOLOCATION"}
 
+        if latitude is None or longitude is None:
+            # Tọa độ lấy từ nội dung: giới hạn theo khu vực chưa được kiểm tra ở bước 1
+            with REPORT_STAGE_SECONDS.time("rate_limit_cell"):
+                cell_limit = await self.rate_limiter.check_cell(report_obj.latitude, report_obj.longitude)
+            if not cell_limit.allowed:
+                return self._rate_limited_response(user_id, cell_limit)
+
         # --- Xử lý NLP và Phân loại ---
 
         # 3. NLP Processing: Embedding, Topic/Urgency Classification
-        embedding = nlp_processor.get_embedding(processed_content)
-        
+        # Các báo cáo đến đồng thời được gom lô và chạy model trong worker thread
+        with REPORT_STAGE_SECONDS.time("nlp"):
+            embedding, topic, urgency = await self.nlp_coalescer.submit(validation_result.normalized_text or processed_content)
+
         if np.all(embedding == 0):
-             logger.warning(f"User {user_id}: Report content too generic for NLP embedding.")
+             logger.warning("User %s: Report content too generic for NLP embedding.", user_id)
              return {"status": "error", "message": "Nội dung báo cáo không đủ thông tin để xử lý bằng AI.", "code": "INSUFFICIENT_NLP_INFO"}
 
-        topic, urgency = nlp_processor.classify_topic_and_urgency(embedding)
-
         # --- Kiểm tra trùng lặp ---
 
-        # 4. Duplicate Checking (Kiểm tra xem có báo cáo/sự kiện nào trùng lặp không)
+        # 4. Duplicate Checking (So với tâm cụm của các sự cố gần đó)
         current_location_dict = {"lat": report_obj.latitude, "lon": report_obj.longitude}
-        existing_event_id, similarity = self._check_for_duplicates(embedding, topic, current_location_dict)
-        
-        if existing_event_id:
-            if similarity >= Config.COSINE_SIMILARITY_THRESHOLD_DUPLICATE:
-                logger.info(f"User {user_id}: Report is a duplicate of {existing_event_id} (similarity: {similarity:.2f}). Discarding new report.")
-                return {"status": "success", "message": "Báo cáo này có vẻ là trùng lặp với một sự kiện đã có và sẽ không được tạo mới.", "code": "DUPLICATE_REPORT", "event_id": existing_event_id}
-            elif similarity >= Config.COSINE_SIMILARITY_THRESHOLD_REFERENCE:
-                logger.info(f"User {user_id}: Report similar to {existing_event_id} (similarity: {similarity:.2f}). Could be a reference.")
+        with REPORT_STAGE_SECONDS.time("duplicate_check"):
+            incident_id, similarity = self._check_for_duplicates(embedding, topic, current_location_dict)
+
+        if incident_id and similarity >= Config.COSINE_SIMILARITY_THRESHOLD_DUPLICATE:
+            # Báo cáo trùng không được lưu riêng, chỉ tính thêm vào sự cố (xác nhận sự cố vẫn đang diễn ra)
+            update = self.incident_clusterer.attach(incident_id, embedding, report_obj.latitude, report_obj.longitude)
+            with REPORT_STAGE_SECONDS.time("storage"):
+                await self._save_incident(update)
+            self._publish_incident_update(update)
+            logger.info("User %s: Report is a duplicate of incident %s (similarity: %.2f). Counted, not stored.", user_id,
+                        update.incident.id, similarity)
+            return {"status": "success", "message": "Báo cáo này có vẻ là trùng lặp với một sự kiện đã có và sẽ không được tạo mới.", "code": "DUPLICATE_REPORT",
+                    "event_id": update.incident.id, "incident_id": update.incident.id, "incident_report_count": update.incident.report_count}
 
         # --- Lưu trữ và phản hồi ---
 
         # 5. Store Report (Lưu báo cáo vào cơ sở dữ liệu hoặc hàng đợi)
         report_id = str(uuid.uuid4())
+
+        # Gộp vào sự cố giống nhất (trên ngưỡng tham chiếu) hoặc tạo sự cố mới
+        if incident_id:
+            update = self.incident_clusterer.attach(incident_id, embedding, report_obj.latitude, report_obj.longitude, report_id=report_id)
+            logger.info("User %s: Report attached to incident %s (similarity: %.2f).", user_id, update.incident.id, similarity)
+        else:
+            update = self.incident_clusterer.create(topic, embedding, report_obj.latitude, report_obj.longitude, report_id=report_id)
         
         # Lấy uy tín người dùng tại thời điểm đăng
         user_reputation_at_submit = self.reputation_manager.get_reputation(user_id)
@@ -128,7 +275,6 @@ class CommunityReportService:
             "location_text": report_obj.location,
             "latitude": report_obj.latitude,
             "longitude": report_obj.longitude,
-            "embedding": embedding.tolist(), # Lưu embedding để so sánh sau
             "topic": topic,
             "urgency": urgency,
             "status": "pending_verification", # Trạng thái ban đầu
@@ -138,100 +284,127 @@ class CommunityReportService:
             "votes_up": 0,
             "votes_down": 0,
             "official_sources": [],
-            "user_reputation_at_submit": user_reputation_at_submit
+            "user_reputation_at_submit": user_reputation_at_submit,
+            "incident_id": update.incident.id
         }
 
         # Lưu vào Redis Hash để dễ dàng truy cập và cập nhật bởi các chức năng vote/xác thực
         # Chuyển đổi các giá trị không phải string sang JSON string trước khi hset
         hset_data = {k: json.dumps(v) if isinstance(v, (list, dict)) else str(v) for k,v in new_report_data.items()}
-        redis_conn.hset(f"report:{report_id}", mapping=hset_data)
-        redis_conn.expire(f"report:{report_id}", Config.REPORT_EXPIRE_SECONDS_FOR_UNVERIFIED) # Đặt thời gian hết hạn
-
-        # Thêm vào danh sách mock để demo kiểm tra trùng lặp
-        MOCK_EXISTING_EVENTS.append({"id": report_id, "embedding": embedding, "topic": topic, "location": current_location_dict, "source_type": "community"})
-
-        logger.info(f"User {user_id}: New report {report_id} processed successfully. Status: {new_report_data['status']}.")
-
-        return {"status": "success", "message": "Báo cáo đã được gửi thành công và đang chờ xác thực cộng đồng.", "report_id": report_id, "data": new_report_data}
-
-    def _check_rate_limit(self, user_id: str) -> bool:
-        key = f"rate_limit:community_report:{user_id}"
-        count = redis_conn.incr(key)
-        if count == 1:
-            redis_conn.expire(key, 60)
-        return count <= Config.RATE_LIMIT_REPORTS_PER_MINUTE
+        with REPORT_STAGE_SECONDS.time("storage"):
+            redis_conn = await self.redis.get_client()
+            pipe = redis_conn.pipeline(transaction=False)
+            pipe.hset(f"report:{report_id}", mapping=hset_data)
+            pipe.expire(f"report:{report_id}", Config.REPORT_EXPIRE_SECONDS_FOR_UNVERIFIED) # Đặt thời gian hết hạn
+            self.report_index.add(pipe, report_id, topic, new_report_data["status"], report_obj.latitude, report_obj.longitude,
+                                  report_obj.timestamp.timestamp())
+            self.incident_index.save(pipe, update)
+            await pipe.execute()
+            # Embedding lưu dạng bytes nhị phân ở key riêng để luồng vote không phải đọc/parse nó
+            binary_conn = await self.redis.get_binary_client()
+            await binary_conn.set(f"report_embedding:{report_id}", encode_embedding(embedding), ex=Config.REPORT_EXPIRE_SECONDS_FOR_UNVERIFIED)
+
+        self._publish_map_update("report", report_id, report_obj.latitude, report_obj.longitude, {
+            key: new_report_data[key] for key in ("topic", "urgency", "status", "reliability_score", "latitude", "longitude",
+                                                  "incident_id", "created_at")
+        })
+        self._publish_incident_update(update)
+
+        logger.info("User %s: New report %s processed successfully. Status: %s.", user_id, report_id, new_report_data['status'])
+
+        return {"status": "success", "message": "Báo cáo đã được gửi thành công và đang chờ xác thực cộng đồng.", "report_id": report_id, "data": new_report_data,
+                "incident_id": update.incident.id, "rate_limit_remaining": rate_limit.remaining}
+
+    async def _save_incident(self, update: IncidentUpdate):
+        redis_conn = await self.redis.get_client()
+        pipe = redis_conn.pipeline(transaction=False)
+        self.incident_index.save(pipe, update)
+        await pipe.execute()
+
+    def _publish_incident_update(self, update: IncidentUpdate):
+        incident = update.incident
+        fields = {key: incident.to_dict()[key] for key in ("latitude", "longitude", "report_count", "last_seen")}
+        if update.created:
+            fields.update(topic=incident.topic, first_seen=incident.first_seen)
+        full_fields = None
+        if update.previous_location is not None:
+            # Nếu tâm cụm sang cell khác, subscriber của cell mới cần toàn bộ thông tin sự cố
+            full_fields = {key: value for key, value in incident.to_dict().items() if key != "id"}
+        self._publish_map_update("incident", incident.id, incident.latitude, incident.longitude, fields,
+                                 previous_location=update.previous_location, full_fields=full_fields)
+        for absorbed in update.merged:
+            # Client bỏ sự cố đã bị gộp khỏi bản đồ
+            self._publish_map_update("incident", absorbed.id, absorbed.latitude, absorbed.longitude, {"merged_into": incident.id})
+
+    def _publish_map_update(self, kind: str, item_id: str, latitude, longitude, fields: Dict[str, Any], **kwargs):
+        """Gửi delta của một báo cáo/sự cố tới kênh của cell chứa nó (gộp và gửi theo chu kỳ của MapUpdatePublisher)"""
+        if self.map_publisher is None or latitude in (None, "") or longitude in (None, ""):
+            return
+        self.map_publisher.publish(kind, item_id, float(latitude), float(longitude), fields, **kwargs)
+
+    async def get_report_embedding(self, report_id: str) -> np.ndarray | None:
+        """Đọc embedding đã lưu của một báo cáo (None nếu không có hoặc đã hết hạn)"""
+        binary_conn = await self.redis.get_binary_client()
+        data = await binary_conn.get(f"report_embedding:{report_id}")
+        return decode_embedding(data) if data is not None else None
+
+    async def query_reports_in_area(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float, **filters) -> ReportPage:
+        """Báo cáo trong khung nhìn bản đồ (xem ReportIndex.query_area cho các bộ lọc và phân trang)"""
+        return await self.report_index.query_area(min_lat, min_lon, max_lat, max_lon, **filters)
+
+    async def query_incidents_in_area(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float, **filters) -> List[Dict[str, Any]]:
+        """Sự cố trong khung nhìn bản đồ, mỗi sự cố gộp nhiều báo cáo (xem IncidentIndex.query_area)"""
+        return await self.incident_index.query_area(min_lat, min_lon, max_lat, max_lon, **filters)
+
+    async def get_incident(self, incident_id: str) -> Dict[str, Any] | None:
+        return await self.incident_index.get(incident_id)
+
+    def _rate_limited_response(self, user_id: str, result: RateLimitResult) -> Dict[str, Any]:
+        logger.warning("User %s: Rate limit exceeded for new report (%s, retry after %.1fs).", user_id, result.limited_by, result.retry_after_seconds)
+        return {"status": "error", "message": "Giới hạn tần suất báo cáo đã bị vượt quá. Vui lòng thử lại sau.", "code": "RATE_LIMIT_EXCEEDED",
+                "limited_by": result.limited_by, "retry_after_seconds": result.retry_after_seconds, "remaining": result.remaining}
 
     def _check_for_duplicates(self, new_embedding: np.ndarray, topic: str, location: Dict[str, float]) -> Tuple[str | None, float]:
         """
-        Kiểm tra trùng lặp với các sự kiện/báo cáo đã có.
+        Kiểm tra trùng lặp với các sự cố đã có: so với tâm cụm của các sự cố cùng topic trong các cell lân cận (~2km).
+        Trả về (incident_id, similarity) nếu similarity >= ngưỡng tham chiếu, ngược lại (None, 0.0).
         """
-        closest_event_id = None
-        highest_similarity = 0.0
-
-        for event in MOCK_EXISTING_EVENTS:
-            # Kiểm tra vị trí địa lý gần nhau
-            dist_lat = abs(event["location"]["lat"] - location["lat"])
-            dist_lon = abs(event["location"]["lon"] - location["lon"])
-            
-            if dist_lat < 0.02 and dist_lon < 0.02: # Giả định khoảng cách ~2km
-                similarity = nlp_processor.calculate_cosine_similarity(new_embedding, event["embedding"])
-                
-                if similarity > highest_similarity:
-                    highest_similarity = similarity
-                    closest_event_id = event["id"]
-        
-        if highest_similarity >= Config.COSINE_SIMILARITY_THRESHOLD_REFERENCE:
-            return closest_event_id, highest_similarity
-        return None, 0.0
+        return self.incident_clusterer.match(new_embedding, topic, location["lat"], location["lon"])
 
     async def update_report_status_after_vote(self, report_id: str, voter_id: str, vote_type: str):
         """
         Cập nhật số lượt vote và tính toán lại điểm tin cậy cho báo cáo.
         """
-        # --- Lấy thông tin báo cáo từ Redis ---
-        report_data_raw = redis_conn.hgetall(f"report:{report_id}")
-        if not report_data_raw:
-            logger.error(f"Report {report_id} not found for voting.")
+        # --- Cập nhật vote nguyên tử phía Redis (một round trip) ---
+        # Script kiểm tra tự vote, bỏ qua vote trùng, tăng/giảm số vote, ghi dấu vote và trả về số vote mới
+        vote_key = f"user_vote:{voter_id}:{report_id}"
+        if self._vote_script is None:
+            redis_conn = await self.redis.get_client()
+            self._vote_script = VOTE_SCRIPT.bind(redis_conn)
+            self._report_update_script = REPORT_UPDATE_SCRIPT.bind(redis_conn)
+        code, votes_up, votes_down, owner_id, old_status, latitude, longitude, topic, created_at = await self._vote_script(
+            [f"report:{report_id}", vote_key], [voter_id, vote_type])
+
+        if code == VOTE_RESULT_NOT_FOUND:
+            logger.error("Report %s not found for voting.", report_id)
             raise ValueError(f"Report {report_id} not found.")
 
-        # Decode values from Redis (hset stores everything as strings)
-        # Handle fields that were stored as JSON strings
-        current_report = {
-            k.decode('utf-8'): json.loads(v.decode('utf-8')) if k.decode('utf-8') in ["embedding"] else v.decode('utf-8')
-            for k,v in report_data_raw.items()
-        }
-        current_report["votes_up"] = int(current_report.get("votes_up", 0))
-        current_report["votes_down"] = int(current_report.get("votes_down", 0))
-        current_report["reliability_score"] = float(current_report.get("reliability_score", 0.0))
-        current_report["user_reputation_at_submit"] = float(current_report.get("user_reputation_at_submit", 0.5))
-        current_report["status"] = current_report.get("status", "pending_verification")
-        current_report["user_id"] = current_report.get("user_id", "anonymous")
-
         # Ngăn không cho người đăng tự vote
-        if voter_id == current_report["user_id"]:
-            logger.warning(f"User {voter_id} attempted to vote on their own report {report_id}.")
+        if code == VOTE_RESULT_SELF_VOTE:
+            logger.warning("User %s attempted to vote on their own report %s.", voter_id, report_id)
             raise ValueError("Cannot vote on your own report.")
 
-        # Kiểm tra xem người dùng đã vote cho báo cáo này chưa
-        vote_key = f"user_vote:{voter_id}:{report_id}"
-        previous_vote = redis_conn.get(vote_key)
-        
-        if previous_vote == vote_type:
-            logger.info(f"User {voter_id} already voted '{vote_type}' for report {report_id}. No change.")
+        if code == VOTE_RESULT_UNCHANGED:
+            logger.info("User %s already voted '%s' for report %s. No change.", voter_id, vote_type, report_id)
             return # Không làm gì thêm
 
-        # --- Cập nhật lượt vote ---
-        if vote_type == "up":
-            current_report["votes_up"] += 1
-            if previous_vote == "down": # Nếu trước đó đã vote 'down', thì hủy vote 'down' cũ
-                current_report["votes_down"] = max(0, current_report["votes_down"] - 1)
-        elif vote_type == "down":
-            current_report["votes_down"] += 1
-            if previous_vote == "up": # Nếu trước đó đã vote 'up', thì hủy vote 'up' cũ
-                current_report["votes_up"] = max(0, current_report["votes_up"] - 1)
-        
-        # Lưu vote mới vào Redis
-        redis_conn.set(vote_key, vote_type)
+        await self.reputation_manager.load([owner_id])
+        current_report = {
+            "user_id": owner_id,
+            "votes_up": int(votes_up),
+            "votes_down": int(votes_down),
+            "status": old_status,
+        }
 
         # --- Tính toán lại điểm tin cậy ---
         credibility_result = self.credibility_calculator.calculate_credibility(
@@ -243,47 +416,88 @@ class CommunityReportService:
         current_report["reliability_score"] = credibility_result['credibility_score']
         
         # --- Cập nhật trạng thái và uy tín người dùng ---
-        old_status = current_report["status"]
         new_status = old_status
+        reputation_update = None # Chỉ áp dụng khi ghi trạng thái thành công (xem bên dưới)
 
         # Logic cập nhật trạng thái
         if current_report["reliability_score"] >= Config.CREDIBILITY_THRESHOLD_HIGH and old_status == "pending_verification":
             new_status = "verified_community"
-            logger.info(f"Report {report_id} status changed to 'verified_community' (score: {current_report['reliability_score']:.2f}).")
-            self.reputation_manager.update_reputation(current_report["user_id"], is_correct=True)
+            reputation_update = {"is_correct": True}
         elif current_report["reliability_score"] < Config.CREDIBILITY_THRESHOLD_MEDIUM and old_status == "verified_community":
             new_status = "pending_verification" # Trở lại chờ xác thực
-            logger.info(f"Report {report_id} status changed to 'pending_verification' (score: {current_report['reliability_score']:.2f}).")
-            self.reputation_manager.update_reputation(current_report["user_id"], is_correct=False) # Giảm uy tín
-        elif current_report["reliability_score"] < Config.CREDIBILITY_THRESHOLD_LOW_REMOVE and old_status not in ["unverified_low_score", "deleted"]:
+            reputation_update = {"is_correct": False} # Giảm uy tín
+        elif (current_report["reliability_score"] < Config.CREDIBILITY_THRESHOLD_LOW_REMOVE and old_status not in ["unverified_low_score", "deleted"]
+              and current_report["votes_up"] + current_report["votes_down"] >= Config.MIN_VOTES_THRESHOLD):
+            # Chờ đủ số vote tối thiểu: báo cáo mới có điểm sát ngưỡng, một downvote không đủ để đánh dấu và phạt
             new_status = "unverified_low_score" # Đánh dấu là không xác thực, điểm thấp
-            logger.info(f"Report {report_id} status changed to 'unverified_low_score' (score: {current_report['reliability_score']:.2f}).")
-            self.reputation_manager.update_reputation(current_report["user_id"], is_correct=False) # Giảm uy tín
+            # Giảm uy tín; điểm dưới ngưỡng phạt (khi đã đủ số vote tối thiểu) tính là một lần vi phạm (dẫn tới cấm)
+            reputation_update = {"is_correct": False, "credibility_score": current_report["reliability_score"],
+                                 "total_votes": current_report["votes_up"] + current_report["votes_down"]}
 
         current_report["status"] = new_status
         current_report["updated_at"] = datetime.now().isoformat()
 
-        # --- Lưu lại các thay đổi vào Redis ---
-        redis_conn.hset(f"report:{report_id}", mapping={
-            "votes_up": str(current_report["votes_up"]), # Lưu dưới dạng string
-            "votes_down": str(current_report["votes_down"]), # Lưu dưới dạng string
-            "reliability_score": str(current_report["reliability_score"]), # Lưu dưới dạng string
-            "status": current_report["status"],
-            "updated_at": current_report["updated_at"]
-        })
-        logger.info(f"Report {report_id} vote update saved. Up={current_report['votes_up']}, Down={current_report['votes_down']}, Score={current_report['reliability_score']:.2f}, Status={current_report['status']}.")
-
-        # Thông báo cho các client real-time (qua WebSocket) để cập nhật bản đồ
-        # self._publish_report_update(current_report)
-
-
-# Initialize service
-community_report_service = CommunityReportService()
+        # --- Lưu lại các thay đổi vào Redis (số vote đã được script ghi) ---
+        # Compare-and-set: chỉ ghi khi báo cáo còn tồn tại và trạng thái, số vote chưa đổi từ lúc vote.
+        # Hai vote đồng thời cùng vượt ngưỡng chỉ có một vote ghi được (và cộng uy tín), điểm cũ không ghi đè điểm mới.
+        written = await self._report_update_script([f"report:{report_id}"], [
+            old_status,
+            current_report["votes_up"],
+            current_report["votes_down"],
+            str(current_report["reliability_score"]), # Lưu dưới dạng string
+            current_report["status"],
+            current_report["updated_at"],
+        ])
+        if written == REPORT_UPDATE_NOT_FOUND:
+            logger.warning("Report %s disappeared before its vote update was saved; skipping.", report_id)
+            return
+        if written == REPORT_UPDATE_CONFLICT:
+            # Một vote mới hơn đã/đang ghi điểm và trạng thái của nó
+            logger.info("Report %s changed since vote by %s; newer vote's update wins.", report_id, voter_id)
+            return
+        if reputation_update is not None:
+            self.reputation_manager.update_reputation(current_report["user_id"], **reputation_update)
+        if new_status != old_status:
+            logger.info("Report %s status changed to '%s' (score: %.2f).", report_id, new_status, current_report['reliability_score'])
+            # Chuyển báo cáo sang key chỉ mục của trạng thái mới
+            redis_conn = await self.redis.get_client()
+            pipe = redis_conn.pipeline(transaction=False)
+            self.report_index.change_status(pipe, report_id, topic, old_status, new_status, float(latitude), float(longitude),
+                                            datetime.fromisoformat(created_at).timestamp())
+            await pipe.execute()
+        logger.info("Report %s vote update saved. Up=%s, Down=%s, Score=%.2f, Status=%s.", report_id, current_report['votes_up'],
+                    current_report['votes_down'], current_report['reliability_score'], current_report['status'])
+
+        # Thông báo cho các client real-time để cập nhật bản đồ: chỉ gửi các trường vừa đổi,
+        # nhiều vote liên tiếp trên cùng báo cáo được gộp thành một cập nhật mỗi chu kỳ
+        delta = {"votes_up": current_report["votes_up"], "votes_down": current_report["votes_down"],
+                 "reliability_score": round(current_report["reliability_score"], 3)}
+        if new_status != old_status:
+            delta["status"] = new_status
+        self._publish_map_update("report", report_id, latitude, longitude, delta)
+
+
+# Service được tạo ở lần dùng đầu tiên: import module này không kết nối Redis hay nạp model
+_community_report_service = None
+
+def get_community_report_service() -> CommunityReportService:
+    global _community_report_service
+    if _community_report_service is None:
+        _community_report_service = CommunityReportService()
+    return _community_report_service
+
+def __getattr__(name):
+    # Giữ tương thích với `from services.community_report_service import community_report_service`
+    if name == "community_report_service":
+        return get_community_report_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Hàm khởi tạo các báo cáo mẫu cho demo ---
 async def initialize_mock_reports():
+    community_report_service = get_community_report_service()
     # Only initialize if reports don't exist in Redis to avoid overwriting
-    if not redis_conn.keys("report:*"):
+    redis_conn = await community_report_service.redis.get_client()
+    if not await redis_conn.keys("report:*"):
         logger.info("Initializing mock reports in Redis...")
         
         sample_report_id_1 = str(uuid.uuid4())
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from utils.embedding_codec import decode_embedding, encode_embedding
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Cache LRU cho embedding, khóa là hash của văn bản đã làm sạch + tách từ.
+    Giới hạn theo tổng số byte và TTL; có thể gắn thêm tầng Redis dùng chung giữa các worker.
+    An toàn khi gọi từ nhiều thread (worker NLP và event loop).
+    """
+
+    def __init__(self, max_bytes: int = None, ttl_seconds: float = None, redis_client=None):
+        self.max_bytes = Config.EMBEDDING_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl_seconds = Config.EMBEDDING_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.redis_client = redis_client
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict() # key -> (embedding, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(normalized_text: str) -> str:
+        return hashlib.blake2b(normalized_text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def attach_redis(self, redis_client):
+        """Gắn tầng Redis dùng chung (client nhị phân, decode_responses=False)"""
+        self.redis_client = redis_client
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        now = time.time()
+        results: List[Optional[np.ndarray]] = []
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[0])
+                    continue
+                if entry is not None:
+                    self._evict(key)
+                results.append(None)
+                missing.append(i)
+
+        if missing and self.redis_client is not None:
+            found = self._get_from_redis([keys[i] for i in missing])
+            still_missing = []
+            for i, embedding in zip(missing, found):
+                if embedding is None:
+                    still_missing.append(i)
+                else:
+                    results[i] = embedding
+            with self._lock:
+                self.redis_hits += len(missing) - len(still_missing)
+            self._put_local({keys[i]: results[i] for i in missing if results[i] is not None})
+            missing = still_missing
+
+        with self._lock:
+            self.misses += len(missing)
+        return results
+
+    def put_many(self, embeddings: Dict[str, np.ndarray]):
+        if not embeddings:
+            return
+        self._put_local(embeddings)
+        if self.redis_client is not None:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, embedding in embeddings.items():
+                    pipe.set(f"embedding_cache:{key}", encode_embedding(embedding), ex=int(self.ttl_seconds))
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Embedding cache: could not write to Redis: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.redis_hits + self.misses
+            return {
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.redis_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _put_local(self, embeddings: Dict[str, np.ndarray]):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            for key, embedding in embeddings.items():
+                embedding = np.array(embedding, dtype=np.float32) # Bản sao riêng, chỉ đọc
+                embedding.flags.writeable = False
+                if embedding.nbytes > self.max_bytes:
+                    continue
+                if key in self._entries:
+                    self._evict(key)
+                self._entries[key] = (embedding, expires_at)
+                self._bytes += embedding.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str):
+        embedding, _ = self._entries.pop(key)
+        self._bytes -= embedding.nbytes
+
+    def _get_from_redis(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        try:
+            values = self.redis_client.mget([f"embedding_cache:{key}" for key in keys])
+        except Exception as e:
+            logger.warning(f"Embedding cache: could not read from Redis: {e}")
+            return [None] * len(keys)
+        return [decode_embedding(value) if value is not None else None for value in values]
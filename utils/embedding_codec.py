@@ -0,0 +1,43 @@
+import struct
+
+import numpy as np
+
+from config import Config
+
+# Định dạng nhị phân: 4 byte header (magic, mã kiểu, 2 byte đệm) để dữ liệu float32 được căn lề 4 byte.
+# int8 có thêm 4 byte hệ số scale (float32) ngay sau header.
+_MAGIC = b"E"
+_CODES = {"float32": 0, "float16": 1, "int8": 2}
+_DTYPES = {0: np.float32, 1: np.float16, 2: np.int8}
+_HEADER_SIZE = 4
+_SCALE_SIZE = 4
+
+
+def encode_embedding(embedding: np.ndarray, dtype: str = None) -> bytes:
+    """Mã hóa embedding thành bytes thô (float32, float16 hoặc int8 lượng tử hóa đối xứng)"""
+    dtype = dtype or Config.EMBEDDING_STORAGE_DTYPE
+    if dtype not in _CODES:
+        raise ValueError(f"Unsupported embedding storage dtype: {dtype}")
+    header = _MAGIC + bytes([_CODES[dtype], 0, 0])
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    if dtype == "int8":
+        max_abs = float(np.max(np.abs(vector))) if vector.size else 0.0
+        scale = max_abs / 127.0 if max_abs > 0 else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        return header + struct.pack("<f", scale) + quantized.tobytes()
+    return header + vector.astype(_DTYPES[_CODES[dtype]]).tobytes()
+
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    """
+    Giải mã bytes từ encode_embedding.
+    float32/float16 trả về view chỉ đọc trên buffer (không sao chép); int8 được giải lượng tử thành float32.
+    """
+    if len(data) < _HEADER_SIZE or data[:1] != _MAGIC or data[1] not in _DTYPES:
+        raise ValueError("Invalid embedding payload")
+    code = data[1]
+    if _DTYPES[code] is np.int8:
+        (scale,) = struct.unpack_from("<f", data, _HEADER_SIZE)
+        quantized = np.frombuffer(data, dtype=np.int8, offset=_HEADER_SIZE + _SCALE_SIZE)
+        return quantized.astype(np.float32) * np.float32(scale)
+    return np.frombuffer(data, dtype=_DTYPES[code], offset=_HEADER_SIZE)
@@ -0,0 +1,177 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import Config
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    """Bộ đếm tăng dần, mỗi tổ hợp nhãn một giá trị"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(label_values) or "total": value for label_values, value in self._values.items()}
+
+
+class Histogram:
+    """
+    Histogram với các bucket cố định (giống Prometheus): ghi một giá trị tốn một lần bisect + cộng dồn,
+    không lưu từng mẫu nên bộ nhớ không tăng theo lưu lượng. Phân vị được ước lượng từ bucket.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets or Config.METRICS_LATENCY_BUCKETS_SECONDS))
+        # nhãn -> [số mẫu theo bucket (bucket cuối là +Inf), tổng, số mẫu]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def quantile(self, q: float, *label_values: str) -> Optional[float]:
+        """Ước lượng phân vị q (0..1) bằng nội suy tuyến tính trong bucket chứa nó"""
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None or series[2] == 0:
+                return None
+            counts, total = list(series[0]), series[2]
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1] # Vượt bucket lớn nhất: chỉ biết cận dưới
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for label_values, (counts, total_sum, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _labels(self.label_names + ("le",), label_values + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            label_sets = list(self._series)
+        result = {}
+        for label_values in label_sets:
+            _, total_sum, count = self._series[label_values]
+            result[",".join(label_values) or "total"] = {
+                "count": count,
+                "mean": total_sum / count if count else 0.0,
+                "p50": self.quantile(0.5, *label_values),
+                "p95": self.quantile(0.95, *label_values),
+                "p99": self.quantile(0.99, *label_values),
+            }
+        return result
+
+
+class MetricsRegistry:
+    """
+    Nơi đăng ký metric trong process (singleton). Xuất dạng văn bản Prometheus (`render_prometheus`)
+    cho endpoint /metrics, hoặc dạng dict (`snapshot`) để log/debug.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MetricsRegistry, cls).__new__(cls)
+            cls._instance._metrics = {}
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = None) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def _get_or_create(self, cls, name, help_text, label_names, **kwargs):
+        # Nhiều module có thể khai báo cùng một metric: trả về đối tượng đã có
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, label_names, **kwargs)
+            elif not isinstance(metric, cls) or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+metrics = MetricsRegistry()
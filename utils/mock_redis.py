@@ -0,0 +1,797 @@
+import bisect
+import fnmatch
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+_WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+def _encode(value) -> bytes:
+    # Giống redis-py: str mã hóa UTF-8, số chuyển qua repr, bytes giữ nguyên
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    if isinstance(value, bool):
+        raise ResponseError("Invalid input of type: 'bool'. Convert to a bytes, string, int or float first.")
+    if isinstance(value, (int, float)):
+        return repr(value).encode("utf-8")
+    raise ResponseError(f"Invalid input of type: '{type(value).__name__}'. Convert to a bytes, string, int or float first.")
+
+
+class _SortedSet:
+    """Sorted set: member -> score, kèm danh sách (score, member) đã sắp xếp cho truy vấn theo khoảng"""
+    __slots__ = ("scores", "ordered")
+
+    def __init__(self):
+        self.scores: Dict[bytes, float] = {}
+        self.ordered: List[Tuple[float, bytes]] = []
+
+    def add(self, member: bytes, score: float) -> bool:
+        old = self.scores.get(member)
+        if old is not None:
+            if old == score:
+                return False
+            del self.ordered[bisect.bisect_left(self.ordered, (old, member))]
+        self.scores[member] = score
+        bisect.insort(self.ordered, (score, member))
+        return old is None
+
+    def remove(self, member: bytes) -> bool:
+        score = self.scores.pop(member, None)
+        if score is None:
+            return False
+        del self.ordered[bisect.bisect_left(self.ordered, (score, member))]
+        return True
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+
+class MockRedisServer:
+    """
+    Dữ liệu dùng chung của các client giả lập (như một Redis server): mọi kiểu key cùng một keyspace,
+    TTL áp dụng cho mọi kiểu. Key hết hạn bị xóa khi được truy cập (lazy) và định kỳ bởi lượt quét
+    theo heap thời điểm hết hạn (chạy tối đa mỗi `sweep_interval` giây, trong lệnh bất kỳ).
+    """
+
+    def __init__(self, sweep_interval: float = 0.1):
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.lock = threading.RLock()
+        self.sweep_interval = sweep_interval
+        self._expiry_heap: List[Tuple[float, bytes]] = []
+        self._next_sweep = 0.0
+        # Thứ tự tạo key cho SCAN: cursor là số thứ tự, nên xóa key giữa hai lần SCAN không làm bỏ sót key khác
+        self._key_seq: Dict[bytes, int] = {}
+        self._scan_order: List[Tuple[int, bytes]] = []
+        self._next_seq = 1
+        # Pub/sub: kênh/pattern -> các MockPubSub đang đăng ký
+        self.subscribers: Dict[bytes, Set["MockPubSub"]] = {}
+        self.pattern_subscribers: Dict[bytes, Set["MockPubSub"]] = {}
+
+    def store(self, key: bytes, value):
+        if key not in self.data:
+            self._key_seq[key] = self._next_seq
+            self._scan_order.append((self._next_seq, key))
+            self._next_seq += 1
+        self.data[key] = value
+
+    def set_expiry(self, key: bytes, deadline: float):
+        self.expires[key] = deadline
+        heapq.heappush(self._expiry_heap, (deadline, key))
+        if len(self._expiry_heap) > 2 * len(self.expires) + 1024:
+            # Bỏ các mục cũ (TTL đã bị đặt lại) để heap không phình
+            self._expiry_heap = [(d, k) for k, d in self.expires.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def delete(self, key: bytes) -> bool:
+        self.expires.pop(key, None)
+        self._key_seq.pop(key, None)
+        if len(self._scan_order) > 2 * len(self._key_seq) + 1024:
+            # Dict giữ thứ tự chèn nên vẫn tăng dần theo số thứ tự
+            self._scan_order = [(seq, k) for k, seq in self._key_seq.items()]
+        return self.data.pop(key, None) is not None
+
+    def clear(self):
+        self.data.clear()
+        self.expires.clear()
+        self._key_seq.clear()
+        self._scan_order = []
+        self._expiry_heap = []
+
+    def scan_batch(self, cursor: int, count: int) -> Tuple[int, List[bytes]]:
+        order = self._scan_order
+        start = bisect.bisect_left(order, (cursor,))
+        batch = order[start:start + count]
+        keys = [key for seq, key in batch if self._key_seq.get(key) == seq]
+        next_cursor = batch[-1][0] + 1 if start + count < len(order) else 0
+        return next_cursor, keys
+
+    def alive(self, key: bytes, now: float) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= now:
+            self.delete(key)
+            return False
+        return key in self.data
+
+    def sweep(self, now: float):
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            deadline, key = heapq.heappop(heap)
+            if self.expires.get(key) == deadline:
+                self.delete(key)
+
+
+def _command(method):
+    """Chạy lệnh dưới khóa của server, sau khi quét các key đã hết hạn"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._server.lock:
+            self._server.sweep(time.time())
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class MockRedis:
+    """
+    Client Redis giả lập trong bộ nhớ, dùng khi không có Redis server (demo, benchmark, kiểm thử tải).
+    Hỗ trợ string, hash, set, sorted set, list; TTL; KEYS/SCAN; pipeline; pub/sub; khối lệnh nguyên tử thay cho Lua (run_atomic).
+    Như redis-py, giá trị được lưu dạng bytes và chỉ decode khi `decode_responses=True`;
+    `view()` tạo client khác cấu hình decode trên cùng dữ liệu.
+    """
+    is_mock = True
+
+    def __init__(self, decode_responses: bool = False, server: MockRedisServer = None):
+        self.decode_responses = decode_responses
+        self._server = server or MockRedisServer()
+
+    def view(self, decode_responses: bool) -> "MockRedis":
+        return MockRedis(decode_responses=decode_responses, server=self._server)
+
+    # --- Tiện ích nội bộ ---
+
+    def _out(self, value: Optional[bytes]):
+        if value is None or not self.decode_responses:
+            return value
+        return value.decode("utf-8")
+
+    def _lookup(self, key, kind: type, create: bool = False):
+        key = _encode(key)
+        server = self._server
+        if not server.alive(key, time.time()):
+            if not create:
+                return None
+            server.store(key, kind())
+        value = server.data[key]
+        if not isinstance(value, kind):
+            raise ResponseError(_WRONGTYPE)
+        return value
+
+    def _drop_if_empty(self, key, container):
+        if not container:
+            self._server.delete(_encode(key))
+
+    @staticmethod
+    def _score_bound(bound, default: float) -> Tuple[float, bool]:
+        # Trả về (giá trị, có loại trừ hay không) cho các cận dạng "-inf", "+inf", "(1.5"
+        if bound is None:
+            return default, False
+        if isinstance(bound, (int, float)):
+            return float(bound), False
+        if isinstance(bound, bytes):
+            bound = bound.decode()
+        if bound.startswith("("):
+            return float(bound[1:]), True
+        return float(bound), False
+
+    # --- Chung ---
+
+    @_command
+    def ping(self) -> bool:
+        return True
+
+    def run_atomic(self, fn, keys, args):
+        # Thay cho Lua script: chạy hàm Python tương đương dưới khóa của server
+        with self._server.lock:
+            return fn(self, keys, args)
+
+    def atomic(self) -> threading.RLock:
+        """`with client.atomic(): ...` — các lệnh trong khối không xen kẽ với luồng khác"""
+        return self._server.lock
+
+    def pipeline(self, transaction: bool = True) -> "MockPipeline":
+        return MockPipeline(self, transaction)
+
+    @_command
+    def delete(self, *keys) -> int:
+        now = time.time()
+        removed = 0
+        for key in keys:
+            key = _encode(key)
+            if self._server.alive(key, now):
+                self._server.delete(key)
+                removed += 1
+        return removed
+
+    unlink = delete
+
+    @_command
+    def exists(self, *keys) -> int:
+        now = time.time()
+        return sum(1 for key in keys if self._server.alive(_encode(key), now))
+
+    @_command
+    def type(self, key):
+        value = self._lookup(key, object)
+        names = {bytes: b"string", dict: b"hash", set: b"set", _SortedSet: b"zset", list: b"list"}
+        return self._out(b"none" if value is None else names[type(value)])
+
+    @_command
+    def expire(self, key, seconds) -> bool:
+        return self._pexpire_at(key, time.time() + float(seconds))
+
+    @_command
+    def pexpire(self, key, milliseconds) -> bool:
+        return self._pexpire_at(key, time.time() + float(milliseconds) / 1000)
+
+    @_command
+    def expireat(self, key, when) -> bool:
+        return self._pexpire_at(key, float(when))
+
+    def _pexpire_at(self, key, deadline: float) -> bool:
+        key = _encode(key)
+        if not self._server.alive(key, time.time()):
+            return False
+        self._server.set_expiry(key, deadline)
+        return True
+
+    @_command
+    def persist(self, key) -> bool:
+        key = _encode(key)
+        return self._server.alive(key, time.time()) and self._server.expires.pop(key, None) is not None
+
+    @_command
+    def ttl(self, key) -> int:
+        ms = self._pttl(key)
+        return ms if ms < 0 else int(round(ms / 1000))
+
+    @_command
+    def pttl(self, key) -> int:
+        return self._pttl(key)
+
+    def _pttl(self, key) -> int:
+        key = _encode(key)
+        now = time.time()
+        if not self._server.alive(key, now):
+            return -2
+        deadline = self._server.expires.get(key)
+        return -1 if deadline is None else int((deadline - now) * 1000)
+
+    @_command
+    def keys(self, pattern="*") -> List:
+        now = time.time()
+        pattern = _encode(pattern)
+        return [self._out(key) for key in list(self._server.data)
+                if fnmatch.fnmatchcase(key, pattern) and self._server.alive(key, now)]
+
+    @_command
+    def scan(self, cursor: int = 0, match=None, count: int = None, _type: str = None) -> Tuple[int, List]:
+        """
+        Duyệt keyspace theo lô. Như SCAN thật: key tồn tại suốt quá trình duyệt luôn được trả về,
+        key tạo trong lúc duyệt có thể có hoặc không.
+        """
+        now = time.time()
+        next_cursor, batch = self._server.scan_batch(int(cursor), count or 10)
+        pattern = _encode(match) if match is not None else None
+        result = []
+        for key in batch:
+            if pattern is not None and not fnmatch.fnmatchcase(key, pattern):
+                continue
+            if not self._server.alive(key, now):
+                continue
+            if _type is not None and self.type(key) != self._out(_encode(_type)):
+                continue
+            result.append(self._out(key))
+        return next_cursor, result
+
+    def scan_iter(self, match=None, count: int = None, _type: str = None) -> Iterator:
+        cursor = 0
+        while True:
+            cursor, keys = self.scan(cursor, match=match, count=count, _type=_type)
+            yield from keys
+            if cursor == 0:
+                return
+
+    @_command
+    def dbsize(self) -> int:
+        now = time.time()
+        return sum(1 for key in list(self._server.data) if self._server.alive(key, now))
+
+    @_command
+    def flushdb(self) -> bool:
+        self._server.clear()
+        return True
+
+    flushall = flushdb
+
+    @_command
+    def publish(self, channel, message) -> int:
+        """Gửi message tới các MockPubSub đã đăng ký kênh (hoặc pattern khớp kênh), trả về số người nhận"""
+        channel, message = _encode(channel), _encode(message)
+        receivers = 0
+        for pubsub in self._server.subscribers.get(channel, ()):
+            pubsub._deliver("message", None, channel, message)
+            receivers += 1
+        for pattern, pubsubs in self._server.pattern_subscribers.items():
+            if fnmatch.fnmatchcase(channel, pattern):
+                for pubsub in pubsubs:
+                    pubsub._deliver("pmessage", pattern, channel, message)
+                    receivers += 1
+        return receivers
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "MockPubSub":
+        return MockPubSub(self, ignore_subscribe_messages)
+
+    def close(self):
+        pass
+
+    # --- String ---
+
+    @_command
+    def get(self, key):
+        return self._out(self._lookup(key, bytes))
+
+    @_command
+    def set(self, key, value, ex=None, px=None, nx: bool = False, xx: bool = False, keepttl: bool = False):
+        encoded_key = _encode(key)
+        exists = self._server.alive(encoded_key, time.time())
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._server.store(encoded_key, _encode(value))
+        if not keepttl:
+            self._server.expires.pop(encoded_key, None)
+        if ex is not None:
+            self._pexpire_at(key, time.time() + float(ex))
+        elif px is not None:
+            self._pexpire_at(key, time.time() + float(px) / 1000)
+        return True
+
+    @_command
+    def setex(self, key, seconds, value):
+        return self.set(key, value, ex=seconds)
+
+    @_command
+    def mget(self, keys, *args) -> List:
+        keys = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        return [self.get(key) for key in keys + list(args)]
+
+    @_command
+    def mset(self, mapping) -> bool:
+        for key, value in mapping.items():
+            self.set(key, value)
+        return True
+
+    @_command
+    def incrby(self, key, amount: int = 1) -> int:
+        value = self._lookup(key, bytes)
+        try:
+            number = int(value or 0) + int(amount)
+        except ValueError:
+            raise ResponseError("value is not an integer or out of range")
+        self._server.store(_encode(key), _encode(number))
+        return number
+
+    def incr(self, key, amount: int = 1) -> int:
+        return self.incrby(key, amount)
+
+    def decr(self, key, amount: int = 1) -> int:
+        return self.incrby(key, -amount)
+
+    @_command
+    def incrbyfloat(self, key, amount: float = 1.0) -> float:
+        number = float(self._lookup(key, bytes) or 0) + float(amount)
+        self._server.store(_encode(key), _encode(number))
+        return number
+
+    # --- Hash ---
+
+    @_command
+    def hset(self, name, key=None, value=None, mapping: dict = None, items: list = None) -> int:
+        fields = {}
+        if key is not None:
+            fields[key] = value
+        if mapping:
+            fields.update(mapping)
+        if items:
+            fields.update(zip(items[::2], items[1::2]))
+        if not fields:
+            raise ResponseError("'hset' with no key value pairs")
+        hash_value = self._lookup(name, dict, create=True)
+        added = 0
+        for field, field_value in fields.items():
+            field = _encode(field)
+            added += field not in hash_value
+            hash_value[field] = _encode(field_value)
+        return added
+
+    @_command
+    def hget(self, name, key):
+        hash_value = self._lookup(name, dict)
+        return self._out(hash_value.get(_encode(key))) if hash_value else None
+
+    @_command
+    def hmget(self, name, keys, *args) -> List:
+        keys = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        hash_value = self._lookup(name, dict) or {}
+        return [self._out(hash_value.get(_encode(field))) for field in keys + list(args)]
+
+    @_command
+    def hgetall(self, name) -> Dict:
+        hash_value = self._lookup(name, dict) or {}
+        return {self._out(field): self._out(value) for field, value in hash_value.items()}
+
+    @_command
+    def hdel(self, name, *keys) -> int:
+        hash_value = self._lookup(name, dict)
+        if not hash_value:
+            return 0
+        removed = sum(1 for field in keys if hash_value.pop(_encode(field), None) is not None)
+        self._drop_if_empty(name, hash_value)
+        return removed
+
+    @_command
+    def hexists(self, name, key) -> bool:
+        return _encode(key) in (self._lookup(name, dict) or {})
+
+    @_command
+    def hlen(self, name) -> int:
+        return len(self._lookup(name, dict) or {})
+
+    @_command
+    def hkeys(self, name) -> List:
+        return [self._out(field) for field in (self._lookup(name, dict) or {})]
+
+    @_command
+    def hincrby(self, name, key, amount: int = 1) -> int:
+        hash_value = self._lookup(name, dict, create=True)
+        field = _encode(key)
+        number = int(hash_value.get(field, 0)) + int(amount)
+        hash_value[field] = _encode(number)
+        return number
+
+    @_command
+    def hincrbyfloat(self, name, key, amount: float = 1.0) -> float:
+        hash_value = self._lookup(name, dict, create=True)
+        field = _encode(key)
+        number = float(hash_value.get(field, 0)) + float(amount)
+        hash_value[field] = _encode(number)
+        return number
+
+    # --- Set ---
+
+    @_command
+    def sadd(self, name, *values) -> int:
+        members = self._lookup(name, set, create=True)
+        before = len(members)
+        members.update(_encode(value) for value in values)
+        return len(members) - before
+
+    @_command
+    def srem(self, name, *values) -> int:
+        members = self._lookup(name, set)
+        if not members:
+            return 0
+        before = len(members)
+        members.difference_update(_encode(value) for value in values)
+        self._drop_if_empty(name, members)
+        return before - len(members)
+
+    @_command
+    def smembers(self, name) -> set:
+        return {self._out(member) for member in (self._lookup(name, set) or ())}
+
+    @_command
+    def sismember(self, name, value) -> bool:
+        return _encode(value) in (self._lookup(name, set) or ())
+
+    @_command
+    def scard(self, name) -> int:
+        return len(self._lookup(name, set) or ())
+
+    # --- Sorted set ---
+
+    @_command
+    def zadd(self, name, mapping: dict, nx: bool = False, xx: bool = False, gt: bool = False, lt: bool = False) -> int:
+        zset = self._lookup(name, _SortedSet, create=True)
+        added = 0
+        for member, score in mapping.items():
+            member, score = _encode(member), float(score)
+            old = zset.scores.get(member)
+            if (nx and old is not None) or (xx and old is None):
+                continue
+            if old is not None and ((gt and score <= old) or (lt and score >= old)):
+                continue
+            added += zset.add(member, score)
+        self._drop_if_empty(name, zset)
+        return added
+
+    @_command
+    def zincrby(self, name, amount: float, value) -> float:
+        zset = self._lookup(name, _SortedSet, create=True)
+        member = _encode(value)
+        score = zset.scores.get(member, 0.0) + float(amount)
+        zset.add(member, score)
+        return score
+
+    @_command
+    def zrem(self, name, *values) -> int:
+        zset = self._lookup(name, _SortedSet)
+        if not zset:
+            return 0
+        removed = sum(zset.remove(_encode(value)) for value in values)
+        self._drop_if_empty(name, zset)
+        return removed
+
+    @_command
+    def zscore(self, name, value) -> Optional[float]:
+        zset = self._lookup(name, _SortedSet)
+        return zset.scores.get(_encode(value)) if zset else None
+
+    @_command
+    def zcard(self, name) -> int:
+        return len(self._lookup(name, _SortedSet) or ())
+
+    def _zslice(self, zset: _SortedSet, min_score, max_score) -> List[Tuple[float, bytes]]:
+        low, low_open = self._score_bound(min_score, -math.inf)
+        high, high_open = self._score_bound(max_score, math.inf)
+        ordered = zset.ordered
+        # (score,) đứng trước mọi (score, member) nên bisect theo tuple một phần tử tìm được ranh giới theo điểm
+        start = bisect.bisect_left(ordered, (math.nextafter(low, math.inf) if low_open else low,))
+        if high == math.inf and not high_open:
+            end = len(ordered)
+        else:
+            end = bisect.bisect_left(ordered, (high if high_open else math.nextafter(high, math.inf),))
+        return ordered[start:end]
+
+    def _zresult(self, entries, withscores: bool) -> List:
+        if withscores:
+            return [(self._out(member), score) for score, member in entries]
+        return [self._out(member) for _, member in entries]
+
+    @_command
+    def zrange(self, name, start: int, end: int, desc: bool = False, withscores: bool = False) -> List:
+        zset = self._lookup(name, _SortedSet)
+        if not zset:
+            return []
+        ordered = zset.ordered[::-1] if desc else zset.ordered
+        end = len(ordered) if end == -1 else end + 1
+        return self._zresult(ordered[start:end], withscores)
+
+    def zrevrange(self, name, start: int, end: int, withscores: bool = False) -> List:
+        return self.zrange(name, start, end, desc=True, withscores=withscores)
+
+    @_command
+    def zrangebyscore(self, name, min, max, start: int = None, num: int = None, withscores: bool = False) -> List:
+        zset = self._lookup(name, _SortedSet)
+        if not zset:
+            return []
+        entries = self._zslice(zset, min, max)
+        if start is not None and num is not None:
+            entries = entries[start:start + num] if num >= 0 else entries[start:]
+        return self._zresult(entries, withscores)
+
+    @_command
+    def zrevrangebyscore(self, name, max, min, start: int = None, num: int = None, withscores: bool = False) -> List:
+        zset = self._lookup(name, _SortedSet)
+        if not zset:
+            return []
+        entries = self._zslice(zset, min, max)[::-1]
+        if start is not None and num is not None:
+            entries = entries[start:start + num] if num >= 0 else entries[start:]
+        return self._zresult(entries, withscores)
+
+    @_command
+    def zcount(self, name, min, max) -> int:
+        zset = self._lookup(name, _SortedSet)
+        return len(self._zslice(zset, min, max)) if zset else 0
+
+    @_command
+    def zremrangebyscore(self, name, min, max) -> int:
+        zset = self._lookup(name, _SortedSet)
+        if not zset:
+            return 0
+        entries = self._zslice(zset, min, max)
+        for _, member in entries:
+            zset.remove(member)
+        self._drop_if_empty(name, zset)
+        return len(entries)
+
+    # --- List ---
+
+    @_command
+    def lpush(self, name, *values) -> int:
+        items = self._lookup(name, list, create=True)
+        for value in values:
+            items.insert(0, _encode(value))
+        return len(items)
+
+    @_command
+    def rpush(self, name, *values) -> int:
+        items = self._lookup(name, list, create=True)
+        items.extend(_encode(value) for value in values)
+        return len(items)
+
+    @_command
+    def lrange(self, name, start: int, end: int) -> List:
+        items = self._lookup(name, list) or []
+        end = len(items) if end == -1 else end + 1
+        return [self._out(item) for item in items[start:end]]
+
+    @_command
+    def ltrim(self, name, start: int, end: int) -> bool:
+        items = self._lookup(name, list)
+        if items is not None:
+            end = len(items) if end == -1 else end + 1
+            items[:] = items[start:end]
+            self._drop_if_empty(name, items)
+        return True
+
+    @_command
+    def llen(self, name) -> int:
+        return len(self._lookup(name, list) or [])
+
+
+class MockPubSub:
+    """
+    PubSub giả lập theo giao diện redis-py (subscribe/psubscribe, get_message, listen):
+    nhận các message PUBLISH trên cùng MockRedisServer. Message được xếp hàng trong bộ nhớ, an toàn giữa các luồng.
+    """
+
+    def __init__(self, client: MockRedis, ignore_subscribe_messages: bool = False):
+        self._client = client
+        self._server = client._server
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels: Set[bytes] = set()
+        self.patterns: Set[bytes] = set()
+        self._queue = deque()
+        self._ready = threading.Condition()
+        self.on_deliver: Optional[Callable[[], None]] = None # Gọi sau mỗi message (vd. đánh thức event loop)
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.channels or self.patterns)
+
+    def subscribe(self, *channels):
+        self._change(self.channels, self._server.subscribers, channels, "subscribe", add=True)
+
+    def unsubscribe(self, *channels):
+        self._change(self.channels, self._server.subscribers, channels or list(self.channels), "unsubscribe", add=False)
+
+    def psubscribe(self, *patterns):
+        self._change(self.patterns, self._server.pattern_subscribers, patterns, "psubscribe", add=True)
+
+    def punsubscribe(self, *patterns):
+        self._change(self.patterns, self._server.pattern_subscribers, patterns or list(self.patterns), "punsubscribe", add=False)
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: Optional[float] = 0.0) -> Optional[Dict[str, Any]]:
+        """Message tiếp theo, chờ tối đa `timeout` giây (None = chờ tới khi có), hoặc None"""
+        ignore = ignore_subscribe_messages or self.ignore_subscribe_messages
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while True:
+                while self._queue:
+                    message = self._queue.popleft()
+                    if not (ignore and message["type"] not in ("message", "pmessage")):
+                        return message
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._ready.wait(remaining)
+
+    def listen(self) -> Iterator[Dict[str, Any]]:
+        while self.subscribed:
+            message = self.get_message(timeout=None)
+            if message is not None:
+                yield message
+
+    def close(self):
+        with self._server.lock:
+            for channel in self.channels:
+                self._server.subscribers.get(channel, set()).discard(self)
+            for pattern in self.patterns:
+                self._server.pattern_subscribers.get(pattern, set()).discard(self)
+        self.channels, self.patterns = set(), set()
+
+    reset = close
+
+    def _change(self, mine: Set[bytes], registry: Dict[bytes, Set["MockPubSub"]], names, kind: str, add: bool):
+        with self._server.lock:
+            for name in names:
+                name = _encode(name)
+                if add:
+                    mine.add(name)
+                    registry.setdefault(name, set()).add(self)
+                else:
+                    mine.discard(name)
+                    subscribers = registry.get(name)
+                    if subscribers is not None:
+                        subscribers.discard(self)
+                        if not subscribers:
+                            del registry[name]
+                self._deliver(kind, None, name, len(self.channels) + len(self.patterns))
+
+    def _deliver(self, kind: str, pattern: Optional[bytes], channel: bytes, data):
+        out = self._client._out
+        message = {"type": kind, "pattern": out(pattern), "channel": out(channel),
+                   "data": out(data) if isinstance(data, bytes) else data}
+        with self._ready:
+            self._queue.append(message)
+            self._ready.notify_all()
+        if self.on_deliver is not None:
+            self.on_deliver()
+
+
+class MockPipeline:
+    """Pipeline giả: ghi lại các lệnh, chạy khi execute() (dưới khóa của server nếu là transaction)"""
+
+    def __init__(self, client: MockRedis, transaction: bool = True):
+        self._client = client
+        self._transaction = transaction
+        self._commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+    def reset(self):
+        self._commands = []
+
+    def execute(self, raise_on_error: bool = True) -> List:
+        commands, self._commands = self._commands, []
+        with self._client._server.lock if self._transaction else _NO_LOCK:
+            results = []
+            for method, args, kwargs in commands:
+                try:
+                    results.append(method(*args, **kwargs))
+                except ResponseError as e:
+                    if raise_on_error:
+                        raise
+                    results.append(e)
+            return results
+
+
+class _NoLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_LOCK = _NoLock()
@@ -1,39 +1,94 @@
-import torch
+# torch/transformers chỉ được import khi model được nạp lần đầu (xem NLPProcessor.load)
 # from transformers import AutoModel, AutoTokenizer # Không dùng nếu không có file model
 # from underthesea import word_tokenize # Không dùng nếu không có thư viện
+import logging
 import numpy as np
 import os
-import joblib # Dùng để mock việc tải model
+import threading
 from config import Config
-import re # Cho clean_text mock
+from utils.vector_utils import batch_cosine_similarity, normalize_embedding
+from utils.embedding_cache import EmbeddingCache
+from utils.text_utils import NormalizedText, clean_text, tokenize_vietnamese
+
+logger = logging.getLogger(__name__)
 
 class NLPProcessor:
+    """
+    Singleton tạo rẻ: import module này không import torch và không nạp model.
+    Model và classifier được nạp ở lần dùng đầu tiên (hoặc khi gọi load()/warm_up() lúc khởi động worker).
+    """
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(NLPProcessor, cls).__new__(cls)
-            cls._instance._load_models()
+            cls._instance._loaded = False
+            cls._instance._load_lock = threading.Lock()
+            cls._instance.embedding_cache = EmbeddingCache() if Config.EMBEDDING_CACHE_ENABLED else None
         return cls._instance
 
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def load(self):
+        """Nạp model và classifier nếu chưa nạp (an toàn khi nhiều thread gọi cùng lúc)"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load_models()
+                self._load_classifiers()
+                self._loaded = True
+
+    def warm_up(self):
+        """Nạp model và chạy thử một lô nhỏ (khởi tạo kernel/bộ nhớ) để báo cáo đầu tiên không chịu độ trễ này"""
+        self.load()
+        self._encode_batch(["khởi động mô hình"])
+
     def _load_models(self):
+        import torch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if os.path.isdir(Config.PHOBERT_MODEL_PATH) and self._load_pretrained_model(Config.PHOBERT_MODEL_PATH):
+            logger.info(f"Loaded NLP model from {Config.PHOBERT_MODEL_PATH}.")
+        else:
+            self._load_mock_model()
+
+    def _load_pretrained_model(self, path: str) -> bool:
+        # Chỉ dùng model thật khi có thư mục model và thư viện transformers
+        try:
+            from transformers import AutoModel, AutoTokenizer
+        except ImportError:
+            logger.warning("transformers is not installed. Falling back to mock NLP models.")
+            return False
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.phobert_model = AutoModel.from_pretrained(path).to(self.device).eval()
+        return True
+
+    def _load_mock_model(self):
         # Đây là MOCK để tránh lỗi import Transformer khi không có thư viện/model
         print("DEBUG: Loading Mock NLP models. Real models not loaded.")
+        import torch
         class MockTokenizer:
-            def __call__(self, text, return_tensors, padding, truncation, max_length):
-                # Mock tokenization
-                return {"input_ids": torch.tensor([[0, 1, 2, 3]])} # Dummy tensor
+            def __call__(self, texts, return_tensors, padding, truncation, max_length):
+                # Mock tokenization: mỗi từ một token, pad theo câu dài nhất trong lô
+                lengths = [min(max(len(t.split()), 1), max_length) for t in texts]
+                width = max(lengths)
+                attention_mask = torch.tensor([[1] * n + [0] * (width - n) for n in lengths])
+                return {"input_ids": attention_mask.clone(), "attention_mask": attention_mask}
         self.tokenizer = MockTokenizer()
-        
+
         class MockPhoBERTModel:
             def __init__(self):
                 self.config = type('obj', (object,), {'hidden_size': 768})() # Mock config
-            def __call__(self, input_ids):
-                # Mock output
-                return type('obj', (object,), {'last_hidden_state': torch.rand(1, 4, 768)})()
+            def __call__(self, input_ids, attention_mask=None):
+                # Mock output: một vector ngẫu nhiên cho mỗi câu, lặp lại ở mọi token
+                batch_size, seq_len = input_ids.shape
+                hidden = torch.rand(batch_size, 1, self.config.hidden_size).expand(batch_size, seq_len, self.config.hidden_size)
+                return type('obj', (object,), {'last_hidden_state': hidden})()
         self.phobert_model = MockPhoBERTModel()
-        self.device = "cpu"
 
+    def _load_classifiers(self):
         # Load custom classification heads (these need to be trained and saved separately)
         self.spam_classifier = self._load_mock_classifier(Config.SPAM_CLASSIFIER_PATH, "spam_classifier")
         self.topic_classifier = self._load_mock_classifier(Config.TOPIC_CLASSIFIER_PATH, "topic_classifier")
@@ -46,8 +101,8 @@ class NLPProcessor:
                 if model_name == "spam_classifier":
                     return np.random.choice(["spam", "not_spam"], len(embeddings))
                 else: # topic_classifier
-                    return np.random.choice([["giao_thong"], ["chay_no"], ["toi_pham"]], len(embeddings)), \
-                           np.random.choice([["nguy_hiem"], ["trung_binh"]], len(embeddings))
+                    return np.random.choice(["giao_thong", "chay_no", "toi_pham"], len(embeddings)), \
+                           np.random.choice(["nguy_hiem", "trung_binh"], len(embeddings))
 
             def predict_proba(self, embeddings):
                 if model_name == "spam_classifier":
@@ -58,41 +113,94 @@ class NLPProcessor:
         return MockClassifier()
 
     def clean_text(self, text: str) -> str:
-        # Basic cleaning: lowercase, remove extra spaces, etc.
-        text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
-        text = re.sub(r'<.*?>', '', text) 
-        text = re.sub(r'[^a-zA-ZÀ-ỹ0-9\s.,?!]', '', text) 
-        text = text.lower().strip()
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        # Regex đã biên dịch sẵn trong utils.text_utils
+        return clean_text(text)
 
     def tokenize_vietnamese(self, text: str) -> str:
-        # Mock tokenization for demo
-        return " ".join(text.split())
+        return tokenize_vietnamese(text)
 
-    def get_embedding(self, text: str) -> np.ndarray:
-        if not text.strip():
-            return np.zeros(self.phobert_model.config.hidden_size)
+    def get_embedding(self, text: str | NormalizedText) -> np.ndarray:
+        return self.get_embeddings([text])[0]
 
-        cleaned_text = self.tokenize_vietnamese(self.clean_text(text))
-        # Mock embedding
-        return np.random.rand(self.phobert_model.config.hidden_size)
+    def get_embeddings(self, texts: list[str | NormalizedText], batch_size: int = None) -> np.ndarray:
+        """
+        Tính embedding cho nhiều văn bản, trả về ma trận (len(texts), hidden_size) float32.
+        Nhận str hoặc NormalizedText (dùng lại dạng đã tách từ, không làm sạch lại).
+        Văn bản được sắp theo độ dài trước khi chia lô để giảm padding, rồi trả về đúng thứ tự đầu vào.
+        Văn bản rỗng cho vector 0. Văn bản đã gặp (sau chuẩn hóa) được lấy từ cache, không chạy lại model.
+        """
+        self.load()
+        batch_size = batch_size or Config.NLP_MAX_BATCH_SIZE
+        embeddings = np.zeros((len(texts), self.phobert_model.config.hidden_size), dtype=np.float32)
+        # Gom các vị trí có cùng văn bản chuẩn hóa để mỗi văn bản chỉ tính một lần
+        positions: dict[str, list[int]] = {}
+        for i, text in enumerate(texts):
+            if not isinstance(text, NormalizedText):
+                text = NormalizedText(text)
+            if text.stripped:
+                positions.setdefault(text.tokenized, []).append(i)
+
+        pending = list(positions)
+        if self.embedding_cache is not None and pending:
+            keys = [EmbeddingCache.make_key(text) for text in pending]
+            cached = self.embedding_cache.get_many(keys)
+            for text, embedding in zip(pending, cached):
+                if embedding is not None:
+                    embeddings[positions[text]] = embedding
+            pending = [text for text, embedding in zip(pending, cached) if embedding is None]
+
+        pending.sort(key=len)
+        computed = {}
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            for text, embedding in zip(batch, self._encode_batch(batch)):
+                embeddings[positions[text]] = embedding
+                computed[EmbeddingCache.make_key(text)] = embedding
+        if self.embedding_cache is not None:
+            self.embedding_cache.put_many(computed)
+        return embeddings
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        import torch
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True, truncation=True, max_length=Config.NLP_MAX_SEQ_LENGTH)
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        with torch.inference_mode():
+            hidden = self.phobert_model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).last_hidden_state
+            # Mean pooling, bỏ qua các token padding
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return pooled.float().cpu().numpy()
 
     def classify_spam(self, embedding: np.ndarray) -> str:
-        if embedding.ndim == 1:
-            embedding = embedding.reshape(1, -1)
-        prediction = self.spam_classifier.predict(embedding)[0]
-        return prediction
+        return self.classify_spam_batch(embedding)[0]
+
+    def classify_spam_batch(self, embeddings: np.ndarray) -> list[str]:
+        self.load()
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        return list(self.spam_classifier.predict(embeddings))
 
     def classify_topic_and_urgency(self, embedding: np.ndarray) -> tuple[str, str]:
-        if embedding.ndim == 1:
-            embedding = embedding.reshape(1, -1)
-        topic, urgency = self.topic_classifier.predict(embedding)
-        return topic[0], urgency[0]
+        return self.classify_topic_and_urgency_batch(embedding)[0]
+
+    def classify_topic_and_urgency_batch(self, embeddings: np.ndarray) -> list[tuple[str, str]]:
+        self.load()
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        topics, urgencies = self.topic_classifier.predict(embeddings)
+        return [(str(topic), str(urgency)) for topic, urgency in zip(topics, urgencies)]
 
     def calculate_cosine_similarity(self, emb1: np.ndarray, emb2: np.ndarray) -> float:
         # Mock similarity
         return np.random.rand() # Return a random float for similarity for demo purposes
 
-# Initialize NLP processor as a singleton
+    def normalize_embedding(self, embedding: np.ndarray) -> np.ndarray:
+        # Chuẩn hóa một lần khi chèn để so sánh theo lô chỉ còn là tích vô hướng
+        return normalize_embedding(embedding)
+
+    def batch_cosine_similarity(self, embedding: np.ndarray, candidates: np.ndarray, normalized: bool = True) -> tuple[np.ndarray, int]:
+        # Một phép nhân ma trận-vector (BLAS) cho toàn bộ ứng viên
+        return batch_cosine_similarity(embedding, candidates, normalized=normalized)
+
+# Initialize NLP processor as a singleton (chưa nạp model)
 nlp_processor = NLPProcessor()
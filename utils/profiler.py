@@ -0,0 +1,74 @@
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Profiler lấy mẫu (bật khi cần, PROFILER_ENABLED): một daemon thread đọc stack hiện tại của thread mục tiêu
+    (mặc định thread gọi start(), thường là thread của event loop) mỗi `interval_ms` và đếm theo stack.
+    Không gắn hook vào từng lời gọi hàm như cProfile nên chi phí gần như cố định theo tần suất lấy mẫu.
+    Kết quả dạng "collapsed stack" (mỗi dòng "a;b;c số_mẫu"), dùng trực tiếp với flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, interval_ms: float = None, max_stacks: int = None):
+        self.interval = (Config.PROFILER_INTERVAL_MS if interval_ms is None else interval_ms) / 1000
+        self.max_stacks = max_stacks or Config.PROFILER_MAX_STACKS
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._target_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self, thread_id: int = None):
+        if self._thread is not None:
+            return
+        self._target_thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started ({self.interval * 1000:.0f} ms interval).")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def reset(self):
+        self._stacks.clear()
+        self.samples = 0
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def top_functions(self, n: int = 20) -> List[Tuple[str, float]]:
+        """Các hàm ở đỉnh stack (đang thực thi) nhiều nhất, kèm tỉ lệ mẫu"""
+        leaf_counts: Counter = Counter()
+        for stack, count in self._stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        return [(frame, count / self.samples) for frame, count in leaf_counts.most_common(n)] if self.samples else []
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            # Giới hạn số stack khác nhau để bộ nhớ không tăng mãi; stack mới sau đó bị bỏ qua
+            if key in self._stacks or len(self._stacks) < self.max_stacks:
+                self._stacks[key] += 1
+            self.samples += 1
@@ -0,0 +1,278 @@
+import math
+import time
+from typing import Any, Callable, List
+
+# Hàm Python tương đương với Lua script, dùng khi chạy với mock Redis: fallback(client, keys, args)
+ScriptFallback = Callable[[Any, List[str], List[Any]], Any]
+
+
+class AtomicScript:
+    """
+    Lua script chạy nguyên tử phía Redis server (một round trip).
+    Với mock client (không chạy được Lua), hàm Python tương đương được chạy dưới khóa của mock.
+    """
+
+    def __init__(self, lua: str, fallback: ScriptFallback):
+        self.lua = lua
+        self.fallback = fallback
+
+    def bind(self, client) -> Callable[[List[str], List[Any]], Any]:
+        if getattr(client, "is_mock", False):
+            return lambda keys, args: client.run_atomic(self.fallback, keys, args)
+        script = client.register_script(self.lua)
+        return lambda keys, args: script(keys=keys, args=args)
+
+
+# --- Cập nhật vote ---
+# KEYS: report:{id}, user_vote:{voter}:{id}; ARGV: voter_id, vote_type
+# Trả về {code, votes_up, votes_down, owner_user_id, status, latitude, longitude, topic, created_at}
+# (tọa độ để phát cập nhật theo cell bản đồ; topic, created_at để chuyển key chỉ mục khi đổi trạng thái)
+# code: 1 = đã cập nhật, 0 = vote trùng (không đổi), -1 = không tìm thấy báo cáo, -2 = tự vote báo cáo của mình
+VOTE_RESULT_APPLIED = 1
+VOTE_RESULT_UNCHANGED = 0
+VOTE_RESULT_NOT_FOUND = -1
+VOTE_RESULT_SELF_VOTE = -2
+
+_VOTE_LUA = """
+local report = redis.call('HMGET', KEYS[1], 'user_id', 'votes_up', 'votes_down', 'status', 'latitude', 'longitude', 'topic', 'created_at')
+if not report[1] then
+    return {-1, 0, 0, '', '', '', '', '', ''}
+end
+local owner = report[1]
+local up = tonumber(report[2]) or 0
+local down = tonumber(report[3]) or 0
+local status = report[4] or 'pending_verification'
+local lat = report[5] or ''
+local lon = report[6] or ''
+local topic = report[7] or ''
+local created_at = report[8] or ''
+if owner == ARGV[1] then
+    return {-2, up, down, owner, status, lat, lon, topic, created_at}
+end
+local previous = redis.call('GET', KEYS[2])
+if previous == ARGV[2] then
+    return {0, up, down, owner, status, lat, lon, topic, created_at}
+end
+if ARGV[2] == 'up' then
+    up = up + 1
+    if previous == 'down' then down = math.max(0, down - 1) end
+elseif ARGV[2] == 'down' then
+    down = down + 1
+    if previous == 'up' then up = math.max(0, up - 1) end
+end
+redis.call('HSET', KEYS[1], 'votes_up', up, 'votes_down', down)
+redis.call('SET', KEYS[2], ARGV[2])
+return {1, up, down, owner, status, lat, lon, topic, created_at}
+"""
+
+
+def _vote_fallback(client, keys, args):
+    report_key, vote_key = keys
+    voter_id, vote_type = args
+    owner, up, down, status, lat, lon, topic, created_at = client.hmget(
+        report_key, ["user_id", "votes_up", "votes_down", "status", "latitude", "longitude", "topic", "created_at"])
+    if owner is None:
+        return [VOTE_RESULT_NOT_FOUND, 0, 0, "", "", "", "", "", ""]
+    up, down = int(up or 0), int(down or 0)
+    status = status or "pending_verification"
+    lat, lon, topic, created_at = lat or "", lon or "", topic or "", created_at or ""
+    if owner == voter_id:
+        return [VOTE_RESULT_SELF_VOTE, up, down, owner, status, lat, lon, topic, created_at]
+    previous = client.get(vote_key)
+    if previous == vote_type:
+        return [VOTE_RESULT_UNCHANGED, up, down, owner, status, lat, lon, topic, created_at]
+    if vote_type == "up":
+        up += 1
+        if previous == "down":
+            down = max(0, down - 1)
+    elif vote_type == "down":
+        down += 1
+        if previous == "up":
+            up = max(0, up - 1)
+    client.hset(report_key, mapping={"votes_up": str(up), "votes_down": str(down)})
+    client.set(vote_key, vote_type)
+    return [VOTE_RESULT_APPLIED, up, down, owner, status, lat, lon, topic, created_at]
+
+
+VOTE_SCRIPT = AtomicScript(_VOTE_LUA, _vote_fallback)
+
+
+# --- Ghi điểm tin cậy/trạng thái sau vote (compare-and-set) ---
+# KEYS: report:{id}; ARGV: status, votes_up, votes_down mà VOTE_SCRIPT trả về, rồi reliability_score, status mới, updated_at
+# Chỉ ghi khi hash báo cáo còn tồn tại (báo cáo có thể hết hạn hoặc bị ReportSweeper xóa giữa lúc vote và lúc ghi,
+# HSET vô điều kiện sẽ tạo lại một hash thiếu trường và không có TTL) và khi trạng thái, số vote vẫn như lúc vote:
+# nếu đã có vote mới hơn, vote đó tự ghi điểm của nó, nên điểm cũ không ghi đè điểm mới và mỗi lần chuyển trạng thái
+# chỉ một vote thắng (caller chỉ cập nhật uy tín khi ghi thành công).
+# Trả về 1 = đã ghi, 0 = báo cáo đã thay đổi (bỏ qua), -1 = không tìm thấy báo cáo
+REPORT_UPDATE_APPLIED = 1
+REPORT_UPDATE_CONFLICT = 0
+REPORT_UPDATE_NOT_FOUND = -1
+
+_REPORT_UPDATE_LUA = """
+local report = redis.call('HMGET', KEYS[1], 'user_id', 'status', 'votes_up', 'votes_down')
+if not report[1] then
+    return -1
+end
+local status = report[2] or 'pending_verification'
+if status ~= ARGV[1] or (tonumber(report[3]) or 0) ~= tonumber(ARGV[2]) or (tonumber(report[4]) or 0) ~= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'reliability_score', ARGV[4], 'status', ARGV[5], 'updated_at', ARGV[6])
+return 1
+"""
+
+
+def _report_update_fallback(client, keys, args):
+    report_key, = keys
+    expected_status, expected_up, expected_down, score, status, updated_at = args
+    owner, current_status, up, down = client.hmget(report_key, ["user_id", "status", "votes_up", "votes_down"])
+    if owner is None:
+        return REPORT_UPDATE_NOT_FOUND
+    if ((current_status or "pending_verification") != expected_status
+            or int(up or 0) != int(expected_up) or int(down or 0) != int(expected_down)):
+        return REPORT_UPDATE_CONFLICT
+    client.hset(report_key, mapping={"reliability_score": score, "status": status, "updated_at": updated_at})
+    return REPORT_UPDATE_APPLIED
+
+
+REPORT_UPDATE_SCRIPT = AtomicScript(_REPORT_UPDATE_LUA, _report_update_fallback)
+
+
+# --- Token bucket (giới hạn tần suất) ---
+# KEYS: các bucket cần trừ cùng lúc; ARGV: cost, rồi (capacity, refill_per_ms) cho từng key
+# Chỉ trừ token khi mọi bucket đều đủ. Thời gian lấy từ Redis (TIME) để các worker dùng chung một đồng hồ.
+# Trả về {denied, remaining, retry_after_ms}: denied = 0 nếu cho phép, ngược lại là vị trí (từ 1) của bucket đã chặn
+_TOKEN_BUCKET_LUA = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local levels = {}
+local denied = 0
+local retry_ms = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        local wait = math.ceil((cost - tokens) / rate)
+        if wait > retry_ms then
+            retry_ms = wait
+            denied = i
+        end
+    end
+end
+local remaining = -1
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    local tokens = levels[i]
+    if denied == 0 then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate))
+    local whole = math.floor(tokens)
+    if remaining < 0 or whole < remaining then
+        remaining = whole
+    end
+end
+return {denied, remaining, retry_ms}
+"""
+
+
+def _token_bucket_fallback(client, keys, args):
+    now = int(time.time() * 1000)
+    cost = float(args[0])
+    rules = [(float(args[2 * i + 1]), float(args[2 * i + 2])) for i in range(len(keys))]
+    levels = []
+    denied, retry_ms = 0, 0
+    for i, (key, (capacity, rate)) in enumerate(zip(keys, rules), start=1):
+        tokens, ts = client.hmget(key, ["tokens", "ts"])
+        tokens = capacity if tokens is None else float(tokens)
+        ts = now if ts is None else int(ts)
+        tokens = min(capacity, tokens + max(0, now - ts) * rate)
+        levels.append(tokens)
+        if tokens < cost:
+            wait = math.ceil((cost - tokens) / rate)
+            if wait > retry_ms:
+                retry_ms, denied = wait, i
+    remaining = -1
+    for key, (capacity, rate), tokens in zip(keys, rules, levels):
+        if denied == 0:
+            tokens -= cost
+        client.hset(key, mapping={"tokens": str(tokens), "ts": str(now)})
+        client.expire(key, math.ceil(capacity / rate / 1000))
+        if remaining < 0 or math.floor(tokens) < remaining:
+            remaining = math.floor(tokens)
+    return [denied, remaining, retry_ms]
+
+
+TOKEN_BUCKET_SCRIPT = AtomicScript(_TOKEN_BUCKET_LUA, _token_bucket_fallback)
+
+
+# --- Cập nhật uy tín người dùng (ghi dồn) ---
+# KEYS: user_reputation:{user} cho từng người dùng
+# ARGV: now, uy tín mặc định, 3 ngưỡng cấm, 3 thời hạn cấm (giây, -1 = vĩnh viễn),
+#       rồi (score_delta, correct, incorrect, strikes) cho từng key; strikes đã được lọc theo MIN_VOTES_THRESHOLD
+#       ở ReputationManager.update_reputation (script không biết số vote của từng báo cáo)
+# Uy tín được kẹp trong [0, 1]; khi số lần vi phạm đạt ngưỡng mức cấm cao hơn, ghi ban_level và banned_until.
+# Trả về uy tín mới (dạng chuỗi) theo thứ tự KEYS
+_REPUTATION_LUA = """
+local now = tonumber(ARGV[1])
+local default = tonumber(ARGV[2])
+local results = {}
+for i, key in ipairs(KEYS) do
+    local base = 8 + (i - 1) * 4
+    local score = tonumber(redis.call('HGET', key, 'score')) or default
+    score = math.max(0, math.min(1, score + tonumber(ARGV[base + 1])))
+    redis.call('HSET', key, 'score', tostring(score))
+    redis.call('HINCRBY', key, 'correct', ARGV[base + 2])
+    redis.call('HINCRBY', key, 'incorrect', ARGV[base + 3])
+    local strikes = redis.call('HINCRBY', key, 'strikes', ARGV[base + 4])
+    local level = tonumber(redis.call('HGET', key, 'ban_level')) or 0
+    for new_level = 3, level + 1, -1 do
+        if strikes >= tonumber(ARGV[2 + new_level]) then
+            local duration = tonumber(ARGV[5 + new_level])
+            local banned_until = -1
+            if duration >= 0 then
+                banned_until = now + duration
+            end
+            redis.call('HSET', key, 'ban_level', new_level, 'banned_until', banned_until)
+            break
+        end
+    end
+    results[i] = tostring(score)
+end
+return results
+"""
+
+
+def _reputation_fallback(client, keys, args):
+    now, default = int(args[0]), float(args[1])
+    thresholds = [int(value) for value in args[2:5]]
+    durations = [int(value) for value in args[5:8]]
+    results = []
+    for i, key in enumerate(keys):
+        score_delta, correct, incorrect, strikes = args[8 + i * 4:12 + i * 4]
+        score = client.hget(key, "score")
+        score = max(0.0, min(1.0, (default if score is None else float(score)) + float(score_delta)))
+        client.hset(key, mapping={"score": str(score)})
+        client.hincrby(key, "correct", int(correct))
+        client.hincrby(key, "incorrect", int(incorrect))
+        strikes = client.hincrby(key, "strikes", int(strikes))
+        level = int(client.hget(key, "ban_level") or 0)
+        for new_level in range(3, level, -1):
+            if strikes >= thresholds[new_level - 1]:
+                duration = durations[new_level - 1]
+                banned_until = now + duration if duration >= 0 else -1
+                client.hset(key, mapping={"ban_level": new_level, "banned_until": banned_until})
+                break
+        results.append(str(score))
+    return results
+
+
+REPUTATION_SCRIPT = AtomicScript(_REPUTATION_LUA, _reputation_fallback)
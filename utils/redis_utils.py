@@ -1,81 +1,249 @@
+import asyncio
 import redis
+import redis.asyncio
 from config import Config
 import logging
+import threading
+import time
+
+from utils.mock_redis import MockRedis
 
 logger = logging.getLogger(__name__)
 
 class RedisClient:
+    """Client Redis đồng bộ dùng chung; chỉ kết nối ở lần get_client()/get_binary_client() đầu tiên"""
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(RedisClient, cls).__new__(cls)
+            cls._instance.client = None
+            cls._instance.binary_client = None
+            cls._instance._connect_lock = threading.Lock()
+        return cls._instance
+
+    def _connect(self):
+        with self._connect_lock:
+            if self.client is not None:
+                return
+            if Config.REDIS_USE_MOCK:
+                self.client = self._create_mock_redis_client()
+                self.binary_client = self.client.view(decode_responses=False)
+                return
             try:
-                cls._instance.client = redis.Redis(
+                client = redis.Redis(
                     host=Config.REDIS_HOST,
                     port=Config.REDIS_PORT,
                     db=Config.REDIS_DB,
                     decode_responses=True # Decodes responses to UTF-8 strings
                 )
                 # Test connection
-                cls._instance.client.ping()
+                client.ping()
+                # Kết nối riêng không decode, dùng cho dữ liệu nhị phân (embedding)
+                self.binary_client = redis.Redis(
+                    host=Config.REDIS_HOST,
+                    port=Config.REDIS_PORT,
+                    db=Config.REDIS_DB,
+                    decode_responses=False
+                )
+                self.client = client
                 logger.info("Connected to Redis successfully.")
             except redis.exceptions.ConnectionError as e:
                 logger.error(f"Could not connect to Redis: {e}. All Redis operations will be mocked.")
-                cls._instance.client = cls._instance._create_mock_redis_client()
+                self.client = self._create_mock_redis_client()
+                self.binary_client = self.client.view(decode_responses=False)
             except Exception as e:
                 logger.error(f"Unexpected error connecting to Redis: {e}. All Redis operations will be mocked.")
-                cls._instance.client = cls._instance._create_mock_redis_client()
-        return cls._instance
+                self.client = self._create_mock_redis_client()
+                self.binary_client = self.client.view(decode_responses=False)
 
     def _create_mock_redis_client(self):
-        # A simple mock for Redis client
-        class MockRedisClient:
-            def __init__(self):
-                self._data = {}
-                self._expires = {}
-                logger.warning("Using Mock Redis client. Data will not be persisted.")
-
-            def hset(self, key, mapping):
-                self._data[key] = {**self._data.get(key, {}), **mapping}
-                logger.debug(f"MockRedis: hset {key} -> {mapping}")
-            
-            def hgetall(self, key):
-                return self._data.get(key, {})
-
-            def incr(self, key):
-                self._data[key] = int(self._data.get(key, 0)) + 1
-                logger.debug(f"MockRedis: incr {key} -> {self._data[key]}")
-                return self._data[key]
-
-            def expire(self, key, seconds):
-                self._expires[key] = datetime.now() + timedelta(seconds=seconds)
-                logger.debug(f"MockRedis: expire {key} in {seconds}s")
-            
-            def get(self, key):
-                if key in self._expires and self._expires[key] < datetime.now():
-                    self._data.pop(key, None)
-                    self._expires.pop(key, None)
-                    return None
-                return self._data.get(key)
-            
-            def set(self, key, value):
-                self._data[key] = value
-
-            # Add other methods as needed for your specific use cases
-            def sadd(self, key, member):
-                if key not in self._data: self._data[key] = set()
-                if member in self._data[key]: return 0
-                self._data[key].add(member)
-                return 1
-
-        from datetime import datetime, timedelta # Import here to avoid circular dependency
-        return MockRedisClient()
-
+        logger.warning("Using Mock Redis client. Data will not be persisted.")
+        return MockRedis(decode_responses=True)
 
     def get_client(self):
+        if self.client is None:
+            self._connect()
+        return self.client
+
+    def get_binary_client(self):
+        # Client trả về bytes thô (decode_responses=False), dùng cho embedding
+        if self.client is None:
+            self._connect()
+        return self.binary_client
+
+
+class AsyncRedisClient:
+    """
+    Client redis.asyncio dùng chung cho tầng service: connection pool giới hạn (chờ khi hết kết nối),
+    timeout và health check định kỳ. Kết nối ở lần dùng đầu tiên (cần event loop đang chạy).
+    Nếu không kết nối được Redis, dùng AsyncMockRedisClient bọc mock đồng bộ (chung dữ liệu với RedisClient).
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncRedisClient, cls).__new__(cls)
+            cls._instance.client = None
+            cls._instance.binary_client = None
+            cls._instance._connect_lock = asyncio.Lock()
+        return cls._instance
+
+    async def get_client(self):
+        if self.client is None:
+            await self._connect()
         return self.client
 
+    async def get_binary_client(self):
+        # Client trả về bytes thô (decode_responses=False), dùng cho embedding
+        if self.binary_client is None:
+            await self._connect()
+        return self.binary_client
+
+    def _create_pool(self, decode_responses: bool):
+        return redis.asyncio.BlockingConnectionPool(
+            host=Config.REDIS_HOST,
+            port=Config.REDIS_PORT,
+            db=Config.REDIS_DB,
+            max_connections=Config.REDIS_POOL_MAX_CONNECTIONS,
+            timeout=Config.REDIS_POOL_TIMEOUT_SECONDS, # Thời gian tối đa chờ lấy kết nối từ pool
+            socket_timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS,
+            health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+            decode_responses=decode_responses
+        )
+
+    async def _connect(self):
+        async with self._connect_lock: # Nhiều coroutine cùng gọi lần đầu chỉ tạo một pool
+            if self.client is None:
+                await self._open()
+
+    async def _open(self):
+        if Config.REDIS_USE_MOCK:
+            self._use_mock()
+            return
+        client = redis.asyncio.Redis(connection_pool=self._create_pool(decode_responses=True))
+        try:
+            await client.ping()
+        except Exception as e:
+            logger.error(f"Could not connect to Redis (async): {e}. All Redis operations will be mocked.")
+            await client.aclose()
+            self._use_mock()
+            return
+        self.client = client
+        self.binary_client = redis.asyncio.Redis(connection_pool=self._create_pool(decode_responses=False))
+        logger.info(f"Connected to Redis (async, pool size {Config.REDIS_POOL_MAX_CONNECTIONS}).")
+
+    def _use_mock(self):
+        sync_client = RedisClient()
+        mock = sync_client.get_client()
+        if not getattr(mock, "is_mock", False):
+            # Client đồng bộ kết nối được nhưng client async thì không: vẫn dùng mock để không chặn event loop
+            mock = sync_client._create_mock_redis_client()
+        self.client = AsyncMockRedisClient(mock)
+        self.binary_client = AsyncMockRedisClient(mock.view(decode_responses=False))
+
+    async def close(self):
+        for client in {id(c): c for c in (self.client, self.binary_client) if c is not None}.values():
+            await client.aclose()
+        self.client = self.binary_client = None
+
+
+class AsyncMockRedisClient:
+    """Bản async của mock Redis: mọi lệnh của mock đồng bộ đều có thể `await`"""
+    is_mock = True
+
+    def __init__(self, sync_client):
+        self._sync = sync_client
+
+    def __getattr__(self, name):
+        method = getattr(self._sync, name)
+        async def command(*args, **kwargs):
+            return method(*args, **kwargs)
+        return command
+
+    async def run_atomic(self, fn, keys, args):
+        return self._sync.run_atomic(fn, keys, args)
+
+    async def scan_iter(self, match=None, count: int = None, _type: str = None):
+        for key in self._sync.scan_iter(match=match, count=count, _type=_type):
+            yield key
+
+    def pipeline(self, transaction=True):
+        sync_pipeline = self._sync.pipeline(transaction=transaction)
+        class AsyncMockPipeline:
+            def __getattr__(self, name):
+                queue = getattr(sync_pipeline, name)
+                def command(*args, **kwargs):
+                    queue(*args, **kwargs)
+                    return self
+                return command
+            async def execute(self, raise_on_error: bool = True):
+                return sync_pipeline.execute(raise_on_error=raise_on_error)
+        return AsyncMockPipeline()
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "AsyncMockPubSub":
+        return AsyncMockPubSub(self._sync.pubsub(ignore_subscribe_messages))
+
+    async def aclose(self):
+        pass
+
+
+class AsyncMockPubSub:
+    """Bản async của MockPubSub: chờ message bằng asyncio (không chặn event loop)"""
+
+    def __init__(self, sync_pubsub):
+        self._sync = sync_pubsub
+        self._event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Message có thể được publish từ luồng khác (client đồng bộ)
+        self._sync.on_deliver = lambda: loop.call_soon_threadsafe(self._event.set)
+
+    @property
+    def subscribed(self) -> bool:
+        return self._sync.subscribed
+
+    async def subscribe(self, *channels):
+        self._sync.subscribe(*channels)
+
+    async def unsubscribe(self, *channels):
+        self._sync.unsubscribe(*channels)
+
+    async def psubscribe(self, *patterns):
+        self._sync.psubscribe(*patterns)
+
+    async def punsubscribe(self, *patterns):
+        self._sync.punsubscribe(*patterns)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._event.clear()
+            message = self._sync.get_message(ignore_subscribe_messages, timeout=0.0)
+            if message is not None:
+                return message
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    async def listen(self):
+        while self.subscribed:
+            message = await self.get_message(timeout=None)
+            if message is not None:
+                yield message
+
+    async def aclose(self):
+        self._sync.close()
+
+    reset = aclose
+
 # Example usage:
 # redis_conn = RedisClient().get_client()
-# redis_conn.hset("myhash", {"field": "value"})
\ No newline at end of file
+# redis_conn.hset("myhash", mapping={"field": "value"})
+#
+# redis_conn = await AsyncRedisClient().get_client()
+# await redis_conn.hset("myhash", mapping={"field": "value"})
\ No newline at end of file
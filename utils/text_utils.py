@@ -0,0 +1,57 @@
+import re
+from functools import cached_property
+
+# Biên dịch một lần khi import thay vì mỗi lần gọi clean_text
+_URL_RE = re.compile(r"http\S+|www\S+|https\S+")
+_HTML_TAG_RE = re.compile(r"<.*?>")
+_DISALLOWED_CHARS_RE = re.compile(r"[^a-zA-ZÀ-ỹ0-9\s.,?!]+")
+
+
+def clean_text(text: str) -> str:
+    """
+    Làm sạch văn bản: bỏ URL, thẻ HTML, ký tự không hợp lệ; chuyển chữ thường; gộp khoảng trắng.
+    Các bước URL/HTML chỉ chạy khi văn bản có dấu hiệu tương ứng.
+    """
+    if "http" in text or "www" in text:
+        text = _URL_RE.sub("", text)
+    if "<" in text:
+        text = _HTML_TAG_RE.sub("", text)
+    text = _DISALLOWED_CHARS_RE.sub("", text)
+    return " ".join(text.lower().split())
+
+
+def tokenize_vietnamese(text: str) -> str:
+    # Mock tokenization for demo (thay bằng underthesea.word_tokenize khi có thư viện)
+    return " ".join(text.split())
+
+
+class NormalizedText:
+    """
+    Các dạng chuẩn hóa của nội dung một báo cáo, mỗi dạng chỉ tính một lần (khi cần lần đầu)
+    rồi dùng chung cho mọi bộ lọc và cho NLPProcessor.
+    """
+
+    def __init__(self, raw: str):
+        self.raw = raw
+
+    @cached_property
+    def stripped(self) -> str:
+        return self.raw.strip()
+
+    @cached_property
+    def lower(self) -> str:
+        return self.stripped.lower()
+
+    @cached_property
+    def cleaned(self) -> str:
+        return clean_text(self.raw)
+
+    @cached_property
+    def tokenized(self) -> str:
+        return tokenize_vietnamese(self.cleaned)
+
+    def __str__(self) -> str:
+        return self.stripped
+
+    def __repr__(self) -> str:
+        return f"NormalizedText({self.raw!r})"
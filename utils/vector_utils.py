@@ -0,0 +1,35 @@
+import numpy as np
+
+EMBEDDING_DTYPE = np.float32
+
+
+def normalize_embedding(embedding: np.ndarray) -> np.ndarray:
+    """Chuẩn hóa L2 một vector (float32, liên tục trong bộ nhớ)"""
+    vector = np.ascontiguousarray(embedding, dtype=EMBEDDING_DTYPE)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return vector
+    return vector / norm
+
+
+def normalize_embeddings(matrix: np.ndarray) -> np.ndarray:
+    """Chuẩn hóa L2 từng hàng của ma trận (float32, liên tục trong bộ nhớ)"""
+    matrix = np.ascontiguousarray(matrix, dtype=EMBEDDING_DTYPE)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def batch_cosine_similarity(query: np.ndarray, candidates: np.ndarray, normalized: bool = True) -> tuple[np.ndarray, int]:
+    """
+    Tính cosine similarity giữa `query` và mọi hàng của `candidates` bằng một phép nhân ma trận-vector.
+    Trả về (mảng điểm, chỉ số hàng có điểm cao nhất); chỉ số là -1 nếu không có ứng viên.
+    `normalized=True` nghĩa là cả query và candidates đã được chuẩn hóa L2 từ trước.
+    """
+    if len(candidates) == 0:
+        return np.empty(0, dtype=EMBEDDING_DTYPE), -1
+    if not normalized:
+        query = normalize_embedding(query)
+        candidates = normalize_embeddings(candidates)
+    scores = candidates @ np.asarray(query, dtype=candidates.dtype)
+    return scores, int(np.argmax(scores))